@@ -0,0 +1,180 @@
+"""Batch price analytics over stored price observations.
+
+All products are computed together on a (products x days) matrix of daily
+closing prices, so refreshing the whole catalogue costs a handful of NumPy
+passes rather than a Python loop per product. app.py loads the
+observations, calls compute_summaries() and stores one summary per product
+for the trends view to read.
+"""
+import numpy as np
+
+DAY = 86400
+HISTORY_DAYS = 90
+WINDOWS = (7, 30, 90)
+VOLATILITY_DAYS = 30
+DROP_HORIZON = 7        # days ahead the drop probability looks
+DROP_THRESHOLD = 0.01   # a drop is a price at least 1% under the day's price
+MIN_CONDITIONAL_DAYS = 5
+MIN_SEASONAL_DAYS = 14
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def daily_closes(product_index, timestamps, prices, n_products, end, days=HISTORY_DAYS):
+    """Each product's last observed price per day over the `days` days ending at epoch second `end`.
+
+    Returns (closes, observed): closes carries prices forward over days without
+    an observation (NaN before a product's first one); observed marks the days
+    that had a real observation. Observations before the window seed day 0.
+    """
+    closes = np.full((n_products, days), np.nan)
+    observed = np.zeros((n_products, days), dtype=bool)
+    day = np.floor((timestamps - (end - days * DAY)) / DAY).astype(np.int64)
+    keep = day < days
+    product_index, day, prices, timestamps = product_index[keep], day[keep], prices[keep], timestamps[keep]
+    in_window = day >= 0
+    day = np.maximum(day, 0)
+
+    # Last observation of each (product, day) wins
+    order = np.lexsort((timestamps, day, product_index))
+    key = product_index[order] * days + day[order]
+    last = np.append(key[1:] != key[:-1], True)
+    rows, cols = product_index[order][last], day[order][last]
+    closes[rows, cols] = prices[order][last]
+    observed[product_index[in_window], day[in_window]] = True
+
+    # Forward fill: index of the latest non-NaN column at or before each column
+    filled = np.where(np.isnan(closes), 0, np.arange(days))
+    np.maximum.accumulate(filled, axis=1, out=filled)
+    closes = closes[np.arange(n_products)[:, None], filled]
+    return closes, observed
+
+
+def _nan_reduce(values, fill, reduce):
+    """reduce() along the last axis ignoring NaN; all-NaN rows give NaN"""
+    result = reduce(np.where(np.isnan(values), fill, values), axis=-1)
+    return np.where(np.isinf(result), np.nan, result)
+
+
+def _nan_mean(values, axis=-1):
+    counts = (~np.isnan(values)).sum(axis=axis)
+    totals = np.nansum(values, axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def moving_average(closes, window):
+    """Trailing mean over `window` days, averaging only the days that have a price"""
+    valid = ~np.isnan(closes)
+    sums = np.cumsum(np.where(valid, closes, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    counts[:, window:] = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(valid & (counts > 0), sums / counts, np.nan)
+
+
+def volatility(closes, days=VOLATILITY_DAYS):
+    """Sample standard deviation of daily log returns over the last `days` days"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.diff(np.log(closes[:, -(days + 1):]), axis=1)
+    counts = (~np.isnan(returns)).sum(axis=1)
+    means = _nan_mean(returns)
+    squares = np.nansum((returns - means[:, None]) ** 2, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 1, np.sqrt(squares / (counts - 1)), np.nan)
+
+
+def weekday_effect(closes, observed, end):
+    """Mean deviation from the 90-day average by weekday; rows without enough history are NaN"""
+    first_day = (end // DAY) - closes.shape[1]
+    weekdays = (np.arange(first_day, first_day + closes.shape[1]) + 3) % 7  # 1970-01-01 was a Thursday
+    relative = closes / _nan_mean(closes)[:, None] - 1
+    effect = np.column_stack([_nan_mean(relative[:, weekdays == weekday]) for weekday in range(7)])
+    effect[observed.sum(axis=1) < MIN_SEASONAL_DAYS] = np.nan
+    return effect
+
+
+def drop_probability(closes, current, horizon=DROP_HORIZON, threshold=DROP_THRESHOLD):
+    """How often the price fell at least `threshold` below a day's price within `horizon` days.
+
+    Counts only past days priced at or above today's price when there are
+    enough of them (how often did it drop from here?), otherwise every day.
+    Laplace-smoothed; returns (probability, days the estimate is based on).
+    """
+    start = closes[:, :-horizon]
+    future = np.lib.stride_tricks.sliding_window_view(closes[:, 1:], horizon, axis=1)
+    future_min = _nan_reduce(future, np.inf, np.min)
+    valid = ~np.isnan(start) & ~np.isnan(future_min)
+    with np.errstate(invalid='ignore'):
+        dropped = valid & (future_min < start * (1 - threshold))
+        similar = valid & (start >= current[:, None] * (1 - 1e-9))
+
+    use_similar = similar.sum(axis=1) >= MIN_CONDITIONAL_DAYS
+    basis = np.where(use_similar[:, None], similar, valid)
+    samples = basis.sum(axis=1)
+    hits = (dropped & basis).sum(axis=1)
+    return (hits + 1) / (samples + 2), samples
+
+
+def _round(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def compute_summaries(product_index, timestamps, prices, n_products, end, days=HISTORY_DAYS):
+    """Summaries for products 0..n_products-1 from flat observation arrays.
+
+    product_index, timestamps (epoch seconds) and prices are parallel arrays;
+    `end` is the epoch second the last day of the series ends at.
+    """
+    closes, observed = daily_closes(product_index, timestamps, prices, n_products, end, days)
+    current = closes[:, -1]
+    averages = moving_average(closes, 7)
+    vols = volatility(closes)
+    seasonal = weekday_effect(closes, observed, end)
+    probabilities, samples = drop_probability(closes, current)
+
+    windows = {}
+    for window in WINDOWS:
+        recent = closes[:, -window:]
+        windows[window] = (
+            _nan_reduce(recent, np.inf, np.min),
+            _nan_reduce(recent, -np.inf, np.max),
+            _nan_mean(recent),
+            current / recent[:, 0] - 1,
+        )
+
+    summaries = []
+    for row in range(n_products):
+        if np.isnan(current[row]):
+            summaries.append(None)
+            continue
+        low_90 = windows[90][0][row] if 90 in windows else np.nan
+        probability = float(probabilities[row])
+        if not np.isnan(low_90) and current[row] <= low_90 * (1 + DROP_THRESHOLD):
+            recommendation = 'buy'
+        elif probability >= 0.6:
+            recommendation = 'wait'
+        elif probability <= 0.3:
+            recommendation = 'buy'
+        else:
+            recommendation = 'watch'
+        best = None
+        if not np.isnan(seasonal[row]).all():
+            weekday = int(np.nanargmin(seasonal[row]))
+            best = {"weekday": WEEKDAYS[weekday], "effect": _round(seasonal[row, weekday] * 100)}
+        summaries.append({
+            "current": _round(current[row]),
+            "observationDays": int(observed[row].sum()),
+            "windows": {f"{window}d": {
+                "min": _round(low[row]), "max": _round(high[row]), "avg": _round(mean[row]),
+                "change": _round(change[row] * 100),
+            } for window, (low, high, mean, change) in windows.items()},
+            "volatility": _round(vols[row] * 100, 3),
+            "bestWeekday": best,
+            "dropProbability": round(probability, 3),
+            "confidence": round(int(samples[row]) / (int(samples[row]) + 10), 3),
+            "recommendation": recommendation,
+            "series": [_round(price) for price in closes[row]],
+            "movingAverage7": [_round(price) for price in averages[row]],
+        })
+    return summaries
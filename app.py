@@ -1,3 +1,5 @@
+import time
+STARTUP_BEGAN = time.perf_counter()  # cold-start timing includes the imports below
 import os
 import re
 import sqlite3
@@ -5,19 +7,42 @@ import random
 import string
 import json
 import secrets
-from concurrent.futures import ThreadPoolExecutor
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template, send_from_directory, make_response
+import csv
+import functools
+import hashlib
+import hmac
+import threading
+import bisect
+import tempfile
+import sys
+import uuid
+import cProfile
+import io
+import socket
+import atexit
+import queue
+import collections
+import logging
+import logging.handlers
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_futures, FIRST_COMPLETED
+from flask import Flask, request, jsonify, session, redirect, url_for, render_template, send_from_directory, make_response, g, has_request_context
 from flask_cors import CORS
 import requests
 from bs4 import BeautifulSoup
+import numpy as np
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import smtplib
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+import analytics
+from tracker_index import TrackerIndex
+from currency import RateCache, FileRateProvider, HttpRateProvider
 
 app = Flask(__name__)
-executor = ThreadPoolExecutor(max_workers=3)
 
 # Use a consistent secret key - generate once and store, or use environment variable
 # This prevents sessions from being invalidated on app restart
@@ -29,17 +54,136 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HT
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)  # 30 days persistent session
+app.config['SESSION_REFRESH_EACH_REQUEST'] = False  # Only send the session cookie when the session changes
 app.config['SESSION_COOKIE_NAME'] = 'price_alerter_session'  # Custom session cookie name
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 CORS(app, supports_credentials=True, origins="*")
 
-# Enable permanent sessions by default
+# X-Forwarded-For hops to trust for the client IP; off by default, since without a proxy in front a
+# client can forge the header. Set to 1 on Render/Heroku, which terminate TLS in front of us
+PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
+if PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_COUNT, x_proto=PROXY_COUNT)
+
+# ==================== LOGGING ====================
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.1))  # share of per-scrape/per-request INFO records kept
+LOG_SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))  # always logged, as warnings
+LOG_QUEUE_SIZE = 10000
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+REQUEST_ID_PATTERN = re.compile(r'^[\w.-]{1,64}$')
+_RECORD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; anything passed via `extra` becomes a top-level field"""
+    
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "requestId": request_id_var.get(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SampleFilter(logging.Filter):
+    """Keep a `rate` share of records below WARNING; warnings and errors always pass"""
+    
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        record.sampleRate = self.rate
+        return random.random() < self.rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Formats on the calling thread (so the request id is captured) and drops records when the queue is full"""
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            inc_counter('price_alerter_log_records_dropped_total', ())
+
+def start_log_listener():
+    """Give the app logger a fresh bounded queue and a listener thread that does the stdout writes"""
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    atexit.register(listener.stop)
+    logging.getLogger('price_alerter').handlers[:] = [queue_handler]
+    return listener
+
+def configure_logging():
+    """Route the app's loggers through a bounded queue and sample the high-volume ones"""
+    logger = logging.getLogger('price_alerter')
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    for name in ('price_alerter.scrape', 'price_alerter.http'):
+        # Replace rather than add, so configuring twice doesn't sample at rate squared
+        sampled = logging.getLogger(name)
+        for existing in [f for f in sampled.filters if isinstance(f, SampleFilter)]:
+            sampled.removeFilter(existing)
+        sampled.addFilter(SampleFilter(LOG_SAMPLE_RATE))
+    return start_log_listener()
+
+log_listener = configure_logging()
+log = logging.getLogger('price_alerter')
+scrape_log = logging.getLogger('price_alerter.scrape')
+http_log = logging.getLogger('price_alerter.http')
+
+def with_request_id(func):
+    """Wrap func so records logged from a worker thread keep the submitting request's id"""
+    request_id = request_id_var.get()
+    
+    def run(*args, **kwargs):
+        token = request_id_var.set(request_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            request_id_var.reset(token)
+    return run
+
 @app.before_request
-def make_session_permanent():
-    # Only set permanent if not already set
-    if not session.get('permanent'):
-        session.permanent = True
+def assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    request_id_var.set(incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex)
+    g.log_started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    response.headers['X-Request-ID'] = request_id_var.get()
+    started = g.pop('log_started', None)
+    if started is not None:
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        fields = {"method": request.method, "path": request.path, "endpoint": request.endpoint,
+                  "status": response.status_code, "durationMs": duration_ms}
+        if duration_ms >= LOG_SLOW_REQUEST_MS:
+            http_log.warning("Slow request", extra=fields)
+        else:
+            http_log.info("Request", extra=fields)
+    return response
+
+@app.teardown_request
+def clear_request_id(error=None):
+    if error is not None:
+        http_log.error("Unhandled request error", exc_info=error,
+                       extra={"method": request.method, "path": request.path, "endpoint": request.endpoint})
+    request_id_var.set(None)
 
 def resolve_database_path():
     # Check for environment variable first - this takes priority
@@ -48,7 +192,7 @@ def resolve_database_path():
         db_dir = os.path.dirname(configured_path) or '.'
         os.makedirs(db_dir, exist_ok=True)
         if os.access(db_dir, os.W_OK):
-            print(f"Using database path from environment: {configured_path}")
+            log.info("Using database path from environment", extra={"path": configured_path})
             return configured_path
 
     # Render persistent disk mount paths - check these FIRST for persistence
@@ -63,7 +207,7 @@ def resolve_database_path():
         try:
             os.makedirs(render_dir, exist_ok=True)
             if os.access(render_dir, os.W_OK):
-                print(f"Using Render persistent database: {render_path}")
+                log.info("Using Render persistent database", extra={"path": render_path})
                 return render_path
         except:
             continue
@@ -74,7 +218,7 @@ def resolve_database_path():
         os.makedirs(data_dir, exist_ok=True)
         if os.access(data_dir, os.W_OK):
             db_path = os.path.join(data_dir, 'database.db')
-            print(f"Using /data directory database: {db_path}")
+            log.info("Using /data directory database", extra={"path": db_path})
             return db_path
     except:
         pass
@@ -83,15 +227,15 @@ def resolve_database_path():
     local_path = os.path.join(os.getcwd(), 'database.db')
     local_dir = os.path.dirname(local_path) or '.'
     if os.access(local_dir, os.W_OK):
-        print(f"Using local database: {local_path}")
+        log.info("Using local database", extra={"path": local_path})
         return local_path
 
     # Last resort: tmp directory (NOT PERSISTENT - data will be lost on restart)
-    print("WARNING: Using tmp directory - data will NOT persist across restarts!")
+    log.warning("Using tmp directory - data will NOT persist across restarts!")
     return '/tmp/database.db'
 
 DATABASE = resolve_database_path()
-print(f"Using SQLite database: {DATABASE}")
+log.info("Using SQLite database path", extra={"path": DATABASE})
 
 # Email Configuration
 def load_email_config():
@@ -111,7 +255,7 @@ def load_email_config():
                 file_config = json.load(f)
                 config.update(file_config)
         except Exception as e:
-            print(f"Error loading email config: {e}")
+            log.warning("Error loading email config", extra={"error": str(e)})
     if os.environ.get('SMTP_ENABLED'):
         config['enabled'] = os.environ.get('SMTP_ENABLED').lower() == 'true'
     if os.environ.get('SMTP_SERVER'):
@@ -137,7 +281,7 @@ def load_json_config(filename, defaults):
                 file_config = json.load(f)
                 config.update(file_config)
         except Exception as e:
-            print(f"Error loading {filename}: {e}")
+            log.warning("Error loading config file", extra={"file": filename, "error": str(e)})
     return config
 
 TWILIO_CONFIG = load_json_config('twilio_config.json', {
@@ -157,16 +301,11 @@ WHATSAPP_CONFIG = load_json_config('whatsapp_config.json', {
 
 def send_mail(to_email, subject, html_body, text_body=None):
     if not EMAIL_CONFIG['enabled']:
-        print(f"\n{'='*60}")
-        print("📧 EMAIL SENT - DEMO MODE")
-        print(f"{'='*60}")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        print(f"{'='*60}\n")
+        log.info("Email sent (demo mode)", extra={"to": to_email, "subject": subject})
         return True
     
     if not EMAIL_CONFIG.get('smtp_email') or not EMAIL_CONFIG.get('smtp_password'):
-        print(f"Email not configured - skipping send to {to_email}")
+        log.warning("Email not configured - skipping send", extra={"to": to_email})
         return False
     
     try:
@@ -192,10 +331,10 @@ def send_mail(to_email, subject, html_body, text_body=None):
             with smtplib.SMTP_SSL(EMAIL_CONFIG['smtp_server'], smtp_port, timeout=30) as server:
                 server.login(EMAIL_CONFIG['smtp_email'], EMAIL_CONFIG['smtp_password'])
                 server.send_message(msg)
-        print(f"✓ Email sent successfully to {to_email}")
+        log.info("Email sent", extra={"to": to_email, "subject": subject})
         return True
-    except Exception as e:
-        print(f"✗ Error sending email to {to_email}: {e}")
+    except Exception:
+        log.exception("Error sending email", extra={"to": to_email, "subject": subject})
         return False
 
 def generate_otp():
@@ -213,16 +352,11 @@ def send_email_otp(email, otp, purpose="verification"):
                 server.login(EMAIL_CONFIG['smtp_email'], EMAIL_CONFIG['smtp_password'])
                 server.send_message(msg)
             return True
-        except Exception as e:
-            print(f"Email send error: {e}")
+        except Exception:
+            log.exception("Error sending email OTP", extra={"to": email, "purpose": purpose})
             return False
     else:
-        print(f"\n{'='*50}")
-        print(f"📧 EMAIL OTP ({purpose.upper()}) - DEMO MODE")
-        print(f"{'='*50}")
-        print(f"To: {email}")
-        print(f"OTP: {otp}")
-        print(f"{'='*50}\n")
+        log.info("Email OTP (demo mode)", extra={"to": email, "purpose": purpose, "otp": otp})
         return True
 
 def send_password_reset_email(email, reset_token):
@@ -245,17 +379,571 @@ def send_password_reset_email(email, reset_token):
 
 # ==================== DATABASE ====================
 
+DATABASE_URL = os.environ.get('DATABASE_URL', '')  # postgres://... stores everything in PostgreSQL instead
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))  # connections per worker process
+DB_POOL_TIMEOUT = 30  # seconds a request waits for a free connection before getting a 503
+PRICE_UPDATE_BATCH = 500
+
+PRICE_UPDATE_SQL = """
+    UPDATE products SET current_price = ?, product_name = COALESCE(product_name, ?),
+        currency = ?, currency_symbol = ?, last_checked = ?
+    WHERE id = ?
+"""
+
+class DatabaseBusyError(Exception):
+    """Every pooled connection stayed in use for DB_POOL_TIMEOUT seconds"""
+
+class ConnectionPool:
+    """Per-process pool of open connections, handed out LIFO so the most recently used ones stay warm"""
+    
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = []
+    
+    def acquire(self):
+        if not self.slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise DatabaseBusyError()
+        with self.lock:
+            raw = self.idle.pop() if self.idle else None
+        if raw is None:
+            try:
+                raw = self.factory()
+            except Exception:
+                self.slots.release()
+                raise
+        return raw
+    
+    def release(self, raw, reusable=True):
+        if reusable:
+            with self.lock:
+                self.idle.append(raw)
+        else:
+            try:
+                raw.close()
+            except Exception:
+                pass
+        self.slots.release()
+
+class TimedCursor:
+    """Cursor wrapper that translates SQL for the active storage and records query time per route"""
+    
+    def __init__(self, cursor, storage):
+        self.cursor = cursor
+        self.storage = storage
+        self.lastrowid = None
+    
+    def execute(self, sql, params=()):
+        sql, returns_id = self.storage.translate(sql)
+        started = time.perf_counter()
+        try:
+            self.cursor.execute(sql, params)
+            if returns_id:
+                row = self.cursor.fetchone()
+                self.lastrowid = row[0] if row else None
+            else:
+                self.lastrowid = getattr(self.cursor, 'lastrowid', None)
+        finally:
+            record_db_time(time.perf_counter() - started)
+        return self
+    
+    def executemany(self, sql, seq_of_params):
+        sql, _ = self.storage.translate(sql, returning=False)
+        started = time.perf_counter()
+        try:
+            self.cursor.executemany(sql, seq_of_params)
+        finally:
+            record_db_time(time.perf_counter() - started)
+        return self
+    
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+    
+    def fetchone(self):
+        return self.cursor.fetchone()
+    
+    def fetchall(self):
+        return self.cursor.fetchall()
+    
+    def __iter__(self):
+        return iter(self.cursor)
+
+class TimedConnection:
+    """Connection handed out by connect_db(); close() rolls back anything uncommitted and returns it to the pool"""
+    
+    def __init__(self, raw, storage, pool=None):
+        self.raw = raw
+        self.storage = storage
+        self.pool = pool
+    
+    def cursor(self):
+        return TimedCursor(self.raw.cursor(), self.storage)
+    
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+    
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+    
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return self.raw.commit()
+        finally:
+            record_db_time(time.perf_counter() - started)
+    
+    def rollback(self):
+        return self.raw.rollback()
+    
+    def close(self):
+        raw, self.raw = self.raw, None
+        if raw is None:
+            return
+        if self.pool is None:
+            raw.close()
+            return
+        try:
+            raw.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+        self.pool.release(raw, reusable)
+    
+    def __del__(self):
+        # A handler that raised before close() must not leak its pool slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class SQLiteStorage:
+    """The app database as a local SQLite file"""
+    
+    dialect = 'sqlite'
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    
+    def __init__(self, path):
+        self.path = path
+        self.pool = ConnectionPool(self.open, DB_POOL_SIZE)
+    
+    def open(self, timeout=5):
+        # Pooled connections move between threads, one at a time
+        return sqlite3.connect(self.path, timeout=timeout, check_same_thread=False)
+    
+    def connect(self, timeout=None):
+        if timeout is not None:
+            # Long-running jobs get their own connection with a longer busy timeout
+            return TimedConnection(self.open(timeout), self)
+        return TimedConnection(self.pool.acquire(), self, self.pool)
+    
+    def after_fork(self):
+        # Connections opened before the fork belong to the parent; never touch them
+        self.pool = ConnectionPool(self.open, DB_POOL_SIZE)
+    
+    def translate(self, sql, returning=True):
+        return sql, False
+    
+    def update_product_prices(self, conn, updates):
+        conn.executemany(PRICE_UPDATE_SQL, updates)
+    
+    def product_match(self, terms):
+        """WHERE fragment and params matching products p whose text has every term as a word prefix"""
+        return "p.id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", \
+            (' '.join(f'"{term}"*' for term in terms),)
+
+# Unique key used when translating INSERT OR REPLACE into PostgreSQL's ON CONFLICT ... DO UPDATE
+POSTGRES_REPLACE_KEYS = {'password_resets': 'reset_token'}
+POSTGRES_ID_TABLES = {'users', 'otp_verification', 'password_resets', 'pending_signups',
+                      'remember_tokens', 'products', 'trackers', 'price_history'}
+POSTGRES_NOW = "to_char(now() AT TIME ZONE 'UTC'{offset}, 'YYYY-MM-DD HH24:MI:SS')"
+# Searchable product text with URL punctuation turned into word breaks, like FTS5's unicode61 tokenizer.
+# Columns are unqualified so the same expression works in idx_products_search and in queries on products.
+POSTGRES_SEARCH_TEXT = ("regexp_replace(lower(coalesce(product_name, '') || ' ' || canonical_url || ' ' "
+                        "|| coalesce(site, '')), '[^[:alnum:]]+', ' ', 'g')")
+
+@functools.lru_cache(maxsize=512)
+def postgres_sql(sql, returning=True):
+    """Rewrite this module's SQLite-flavoured SQL for PostgreSQL; returns (sql, returns_id)"""
+    sql = sql.rstrip().rstrip(';')
+    if '?' in sql:
+        # psycopg2 only un-doubles %% when it interpolates parameters
+        sql = sql.replace('%', '%%')
+    sql = re.sub(r"datetime\('now', '([-+]?\d+ \w+)'\)",
+                 lambda match: POSTGRES_NOW.format(offset=f" + interval '{match.group(1)}'"), sql)
+    sql = re.sub(r"datetime\('now'\)", POSTGRES_NOW.format(offset=''), sql)
+    sql = re.sub(r'\browid\b', 'ctid', sql)
+    
+    replace = re.match(r"\s*INSERT OR REPLACE INTO (\w+) \(([^)]*)\)", sql)
+    if replace:
+        key = POSTGRES_REPLACE_KEYS[replace.group(1)]
+        columns = [column.strip() for column in replace.group(2).split(',')]
+        sql = sql.replace('INSERT OR REPLACE', 'INSERT', 1) + f" ON CONFLICT ({key}) DO UPDATE SET " + \
+            ', '.join(f"{column} = EXCLUDED.{column}" for column in columns if column != key)
+    elif re.match(r"\s*INSERT OR IGNORE", sql):
+        sql = sql.replace('INSERT OR IGNORE', 'INSERT', 1) + " ON CONFLICT DO NOTHING"
+    sql = sql.replace('?', '%s')
+    
+    # psycopg2 has no lastrowid; single-row inserts hand the new id back through RETURNING
+    insert = re.match(r"\s*INSERT INTO (\w+)", sql)
+    returns_id = bool(returning and insert and insert.group(1) in POSTGRES_ID_TABLES
+                      and 'RETURNING' not in sql and 'SELECT' not in sql)
+    if returns_id:
+        sql += " RETURNING id"
+    return sql, returns_id
+
+POSTGRES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        username TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        phone TEXT,
+        email_verified INTEGER DEFAULT 0,
+        phone_verified INTEGER DEFAULT 0,
+        two_factor_enabled INTEGER DEFAULT 0,
+        two_factor_method TEXT DEFAULT 'none',
+        remember_token TEXT,
+        created_at TEXT DEFAULT {now},
+        last_login TEXT
+    );
+    CREATE TABLE IF NOT EXISTS otp_verification (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER REFERENCES users(id),
+        email TEXT,
+        phone TEXT,
+        email_otp TEXT,
+        phone_otp TEXT,
+        email_otp_expiry TEXT,
+        phone_otp_expiry TEXT
+    );
+    CREATE TABLE IF NOT EXISTS password_resets (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        reset_token TEXT NOT NULL UNIQUE,
+        reset_token_expiry TEXT,
+        created_at TEXT DEFAULT {now}
+    );
+    CREATE TABLE IF NOT EXISTS pending_signups (
+        id SERIAL PRIMARY KEY,
+        signup_token TEXT UNIQUE NOT NULL,
+        username TEXT NOT NULL,
+        email TEXT NOT NULL,
+        password TEXT NOT NULL,
+        phone TEXT,
+        email_otp TEXT,
+        email_otp_expiry TEXT,
+        phone_otp TEXT,
+        phone_otp_expiry TEXT,
+        created_at TEXT DEFAULT {now}
+    );
+    CREATE TABLE IF NOT EXISTS remember_tokens (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        token_hash TEXT NOT NULL UNIQUE,
+        expires_at TEXT NOT NULL,
+        created_at TEXT DEFAULT {now}
+    );
+    CREATE INDEX IF NOT EXISTS idx_remember_tokens_user ON remember_tokens (user_id);
+    CREATE INDEX IF NOT EXISTS idx_remember_tokens_expiry ON remember_tokens (expires_at);
+    CREATE INDEX IF NOT EXISTS idx_password_resets_expiry ON password_resets (reset_token_expiry);
+    CREATE INDEX IF NOT EXISTS idx_pending_signups_created ON pending_signups (created_at);
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        job TEXT PRIMARY KEY,
+        last_run TEXT,
+        last_report TEXT
+    );
+    CREATE TABLE IF NOT EXISTS products (
+        id SERIAL PRIMARY KEY,
+        canonical_url TEXT NOT NULL UNIQUE,
+        site TEXT,
+        product_name TEXT,
+        current_price DOUBLE PRECISION,
+        currency TEXT,
+        currency_symbol TEXT,
+        last_checked TEXT,
+        created_at TEXT DEFAULT {now}
+    );
+    CREATE TABLE IF NOT EXISTS trackers (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        target_price DOUBLE PRECISION NOT NULL,
+        created_at TEXT DEFAULT {now}
+    );
+    CREATE INDEX IF NOT EXISTS idx_trackers_user_product ON trackers (user_id, product_id);
+    CREATE INDEX IF NOT EXISTS idx_trackers_product ON trackers (product_id);
+    CREATE TABLE IF NOT EXISTS price_history (
+        id SERIAL PRIMARY KEY,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        price DOUBLE PRECISION NOT NULL,
+        observed_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history (product_id, observed_at);
+    CREATE INDEX IF NOT EXISTS idx_price_history_observed ON price_history (observed_at);
+    CREATE TABLE IF NOT EXISTS price_summaries (
+        product_id INTEGER PRIMARY KEY REFERENCES products(id),
+        computed_at TEXT NOT NULL,
+        summary TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS dashboard_stats (
+        user_id INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        trackers INTEGER NOT NULL DEFAULT 0,
+        reached INTEGER NOT NULL DEFAULT 0,
+        savings DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, currency)
+    );
+    CREATE TABLE IF NOT EXISTS tracker_changes (
+        seq BIGSERIAL PRIMARY KEY,
+        tracker_id INTEGER NOT NULL UNIQUE,
+        user_id INTEGER NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_tracker_changes_user ON tracker_changes (user_id, seq);
+"""
+
+class PostgresStorage:
+    """The app database in PostgreSQL, for deployments where SQLite's single writer becomes the bottleneck.
+
+    Timestamps stay TEXT in the same ISO format SQLite stores, so queries compare them the same way.
+    """
+    
+    dialect = 'postgresql'
+    
+    def __init__(self, url):
+        try:
+            import psycopg2
+            import psycopg2.extras
+        except ImportError:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but psycopg2 is not installed "
+                               "(pip install psycopg2-binary)")
+        self.psycopg2 = psycopg2
+        self.Error = psycopg2.Error
+        self.IntegrityError = psycopg2.IntegrityError
+        self.url = url
+        self.pool = ConnectionPool(self.open, DB_POOL_SIZE)
+    
+    def open(self):
+        return self.psycopg2.connect(self.url)
+    
+    def connect(self, timeout=None):
+        return TimedConnection(self.pool.acquire(), self, self.pool)
+    
+    def after_fork(self):
+        # Sharing a socket with the parent would interleave protocol messages; start with fresh connections
+        self.pool = ConnectionPool(self.open, DB_POOL_SIZE)
+    
+    def translate(self, sql, returning=True):
+        return postgres_sql(sql, returning)
+    
+    def product_match(self, terms):
+        # Same expression as idx_products_search, so the GIN index serves the match
+        return f"to_tsvector('simple', {POSTGRES_SEARCH_TEXT}) @@ to_tsquery('simple', ?)", \
+            (' & '.join(f'{term}:*' for term in terms),)
+    
+    def create_schema(self):
+        conn = self.connect()
+        changes_exist = conn.execute("SELECT to_regclass('tracker_changes') IS NOT NULL").fetchone()[0]
+        conn.execute(POSTGRES_SCHEMA.format(now=POSTGRES_NOW.format(offset='')))
+        conn.execute(POSTGRES_DASHBOARD_TRIGGERS)
+        conn.execute(POSTGRES_CHANGE_TRIGGERS)
+        if not changes_exist:
+            conn.execute(BACKFILL_TRACKER_CHANGES_SQL)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_search ON products USING GIN "
+                     f"(to_tsvector('simple', {POSTGRES_SEARCH_TEXT}))")
+        ensure_dashboard_stats(conn.cursor())
+        conn.commit()
+        conn.close()
+    
+    def update_product_prices(self, conn, updates):
+        # One UPDATE ... FROM (VALUES ...) per page instead of a statement per product
+        cursor = conn.raw.cursor()
+        started = time.perf_counter()
+        try:
+            self.psycopg2.extras.execute_values(cursor, """
+                UPDATE products AS p SET current_price = v.price, product_name = COALESCE(p.product_name, v.name),
+                    currency = v.currency, currency_symbol = v.symbol, last_checked = v.checked
+                FROM (VALUES %s) AS v (price, name, currency, symbol, checked, id)
+                WHERE p.id = v.id
+            """, updates, page_size=PRICE_UPDATE_BATCH)
+        finally:
+            record_db_time(time.perf_counter() - started)
+
+def create_storage():
+    if DATABASE_URL.startswith(('postgres://', 'postgresql://')):
+        return PostgresStorage(DATABASE_URL)
+    return SQLiteStorage(DATABASE)
+
+storage = create_storage()
+
+def connect_db(timeout=None):
+    """Borrow a connection to the app database from the pool; close() gives it back"""
+    return storage.connect(timeout)
+
+@app.errorhandler(DatabaseBusyError)
+def database_busy(error):
+    response = jsonify({"error": "Server is busy, please try again shortly"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+# Per-user, per-currency tracker counts and savings behind /api/dashboard/summary. Triggers add and
+# subtract each tracker's contribution as trackers come and go and as product prices change, so the
+# dashboard header never has to scan a user's trackers. `row` is NEW or OLD, `sign` is '' or '-'.
+DASHBOARD_STATS_UPSERT = """
+    ON CONFLICT (user_id, currency) DO UPDATE SET trackers = dashboard_stats.trackers + excluded.trackers,
+        reached = dashboard_stats.reached + excluded.reached, savings = dashboard_stats.savings + excluded.savings;
+"""
+TRACKER_STATS_SQL = """
+    INSERT INTO dashboard_stats (user_id, currency, trackers, reached, savings)
+    SELECT {row}.user_id, COALESCE(p.currency, ''), {sign}1,
+           {sign}(CASE WHEN p.current_price <= {row}.target_price THEN 1 ELSE 0 END),
+           {sign}(CASE WHEN p.current_price <= {row}.target_price THEN {row}.target_price - p.current_price ELSE 0 END)
+    FROM products p WHERE p.id = {row}.product_id
+""" + DASHBOARD_STATS_UPSERT
+PRODUCT_STATS_SQL = """
+    INSERT INTO dashboard_stats (user_id, currency, trackers, reached, savings)
+    SELECT t.user_id, COALESCE({row}.currency, ''), {sign}COUNT(*),
+           {sign}SUM(CASE WHEN {row}.current_price <= t.target_price THEN 1 ELSE 0 END),
+           {sign}SUM(CASE WHEN {row}.current_price <= t.target_price THEN t.target_price - {row}.current_price ELSE 0 END)
+    FROM trackers t WHERE t.product_id = {row}.id GROUP BY t.user_id
+""" + DASHBOARD_STATS_UPSERT
+PRUNE_STATS_SQL = "DELETE FROM dashboard_stats WHERE user_id = OLD.user_id AND trackers = 0;"
+REBUILD_DASHBOARD_STATS_SQL = """
+    INSERT INTO dashboard_stats (user_id, currency, trackers, reached, savings)
+    SELECT t.user_id, COALESCE(p.currency, ''), COUNT(*),
+           SUM(CASE WHEN p.current_price <= t.target_price THEN 1 ELSE 0 END),
+           SUM(CASE WHEN p.current_price <= t.target_price THEN t.target_price - p.current_price ELSE 0 END)
+    FROM trackers t JOIN products p ON p.id = t.product_id
+    GROUP BY t.user_id, COALESCE(p.currency, '')
+"""
+SQLITE_DASHBOARD_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trackers_stats_insert AFTER INSERT ON trackers BEGIN "
+    + TRACKER_STATS_SQL.format(row='NEW', sign='') + " END",
+    "CREATE TRIGGER IF NOT EXISTS trackers_stats_delete AFTER DELETE ON trackers BEGIN "
+    + TRACKER_STATS_SQL.format(row='OLD', sign='-') + PRUNE_STATS_SQL + " END",
+    "CREATE TRIGGER IF NOT EXISTS trackers_stats_update AFTER UPDATE OF user_id, product_id, target_price ON trackers BEGIN "
+    + TRACKER_STATS_SQL.format(row='OLD', sign='-') + TRACKER_STATS_SQL.format(row='NEW', sign='') + PRUNE_STATS_SQL + " END",
+    "CREATE TRIGGER IF NOT EXISTS products_stats_update AFTER UPDATE OF current_price, currency ON products "
+    "WHEN OLD.current_price IS NOT NEW.current_price OR OLD.currency IS NOT NEW.currency BEGIN "
+    + PRODUCT_STATS_SQL.format(row='OLD', sign='-') + PRODUCT_STATS_SQL.format(row='NEW', sign='') + " END",
+]
+POSTGRES_DASHBOARD_TRIGGERS = f"""
+    CREATE OR REPLACE FUNCTION trackers_dashboard_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            {TRACKER_STATS_SQL.format(row='OLD', sign='-')}
+            {PRUNE_STATS_SQL}
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {TRACKER_STATS_SQL.format(row='NEW', sign='')}
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+    CREATE OR REPLACE FUNCTION products_dashboard_stats() RETURNS trigger AS $$
+    BEGIN
+        {PRODUCT_STATS_SQL.format(row='OLD', sign='-')}
+        {PRODUCT_STATS_SQL.format(row='NEW', sign='')}
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS trackers_stats ON trackers;
+    CREATE TRIGGER trackers_stats AFTER INSERT OR DELETE OR UPDATE OF user_id, product_id, target_price ON trackers
+        FOR EACH ROW EXECUTE FUNCTION trackers_dashboard_stats();
+    DROP TRIGGER IF EXISTS products_stats ON products;
+    CREATE TRIGGER products_stats AFTER UPDATE OF current_price, currency ON products FOR EACH ROW
+        WHEN (OLD.current_price IS DISTINCT FROM NEW.current_price OR OLD.currency IS DISTINCT FROM NEW.currency)
+        EXECUTE FUNCTION products_dashboard_stats();
+"""
+
+# Deleting a tracker's tracker_changes row and inserting it again gives it the next seq, so a client
+# holding cursor N fetches every tracker that changed after N exactly once, however often it changed.
+# Not INSERT OR REPLACE: a trigger statement takes the conflict handling of the statement that fired
+# it, so under an upsert (PRODUCT_UPSERT_SQL) the REPLACE became an abort.
+TRACKER_CHANGE_SQL = ("DELETE FROM tracker_changes WHERE tracker_id = {row}.id; "
+                      "INSERT INTO tracker_changes (tracker_id, user_id, deleted) VALUES ({row}.id, {row}.user_id, {deleted});")
+PRODUCT_CHANGES_SQL = ("DELETE FROM tracker_changes WHERE tracker_id IN (SELECT id FROM trackers WHERE product_id = NEW.id); "
+                       "INSERT INTO tracker_changes (tracker_id, user_id, deleted) "
+                       "SELECT id, user_id, 0 FROM trackers WHERE product_id = NEW.id;")
+BACKFILL_TRACKER_CHANGES_SQL = ("INSERT INTO tracker_changes (tracker_id, user_id, deleted) "
+                                "SELECT id, user_id, 0 FROM trackers ORDER BY id")
+# name -> CREATE TRIGGER statement; init_db() replaces a trigger whose stored SQL differs
+SQLITE_CHANGE_TRIGGERS = {
+    'trackers_changes_insert': "CREATE TRIGGER trackers_changes_insert AFTER INSERT ON trackers BEGIN "
+    + TRACKER_CHANGE_SQL.format(row='NEW', deleted=0) + " END",
+    'trackers_changes_update': "CREATE TRIGGER trackers_changes_update AFTER UPDATE ON trackers BEGIN "
+    + TRACKER_CHANGE_SQL.format(row='NEW', deleted=0) + " END",
+    'trackers_changes_delete': "CREATE TRIGGER trackers_changes_delete AFTER DELETE ON trackers BEGIN "
+    + TRACKER_CHANGE_SQL.format(row='OLD', deleted=1) + " END",
+    'products_changes_update': "CREATE TRIGGER products_changes_update AFTER UPDATE OF product_name, current_price, "
+    "currency, currency_symbol ON products WHEN OLD.product_name IS NOT NEW.product_name OR OLD.current_price IS NOT "
+    "NEW.current_price OR OLD.currency IS NOT NEW.currency OR OLD.currency_symbol IS NOT NEW.currency_symbol BEGIN "
+    + PRODUCT_CHANGES_SQL + " END",
+}
+# PostgreSQL commits can land out of seq order; the advisory lock (held to commit) serializes the
+# writers of tracker_changes so a reader never sees seq N+1 before seq N has committed
+POSTGRES_CHANGE_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION record_tracker_change(tracker INTEGER, owner INTEGER, gone INTEGER) RETURNS void AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('tracker_changes'));
+        INSERT INTO tracker_changes (tracker_id, user_id, deleted) VALUES (tracker, owner, gone)
+        ON CONFLICT (tracker_id) DO UPDATE SET seq = nextval(pg_get_serial_sequence('tracker_changes', 'seq')),
+            user_id = excluded.user_id, deleted = excluded.deleted;
+    END $$ LANGUAGE plpgsql;
+    CREATE OR REPLACE FUNCTION trackers_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM record_tracker_change(OLD.id, OLD.user_id, 1);
+        ELSE
+            PERFORM record_tracker_change(NEW.id, NEW.user_id, 0);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+    CREATE OR REPLACE FUNCTION products_changes() RETURNS trigger AS $$
+    BEGIN
+        PERFORM record_tracker_change(t.id, t.user_id, 0) FROM trackers t WHERE t.product_id = NEW.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS trackers_changes ON trackers;
+    CREATE TRIGGER trackers_changes AFTER INSERT OR UPDATE OR DELETE ON trackers
+        FOR EACH ROW EXECUTE FUNCTION trackers_changes();
+    DROP TRIGGER IF EXISTS products_changes ON products;
+    CREATE TRIGGER products_changes AFTER UPDATE OF product_name, current_price, currency, currency_symbol ON products
+        FOR EACH ROW WHEN (OLD.product_name IS DISTINCT FROM NEW.product_name
+            OR OLD.current_price IS DISTINCT FROM NEW.current_price OR OLD.currency IS DISTINCT FROM NEW.currency
+            OR OLD.currency_symbol IS DISTINCT FROM NEW.currency_symbol)
+        EXECUTE FUNCTION products_changes();
+"""
+
+def ensure_dashboard_stats(cursor):
+    """Fill dashboard_stats from a full scan when it is new (or was emptied) but trackers exist"""
+    cursor.execute("SELECT 1 FROM dashboard_stats LIMIT 1")
+    if cursor.fetchone():
+        return
+    cursor.execute("SELECT 1 FROM trackers LIMIT 1")
+    if cursor.fetchone():
+        log.info("Building dashboard stats from existing trackers")
+        cursor.execute(REBUILD_DASHBOARD_STATS_SQL)
+
 def init_db():
     """Initialize database - uses the already resolved DATABASE path"""
+    if storage.dialect == 'postgresql':
+        storage.create_schema()
+        return
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
     except sqlite3.OperationalError as e:
         # Log the error but don't change the database path
-        print(f"Database connection error: {e}")
+        log.warning("Database connection error, retrying", extra={"error": str(e)})
         # Try once more with the same path before failing
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
     cursor = conn.cursor()
     
+    # Only takes effect on a new database; run_maintenance() converts existing ones
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -314,23 +1002,1264 @@ def init_db():
         )
     ''')
     
+    # Remember-me tokens are stored hashed so a leaked database can't be replayed as cookies
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trackers (
+        CREATE TABLE IF NOT EXISTS remember_tokens (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
-            url TEXT NOT NULL,
+            token_hash TEXT NOT NULL UNIQUE,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_remember_tokens_user ON remember_tokens (user_id)")
+    
+    # Expiry indexes keep the maintenance job's batched deletes off full table scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_remember_tokens_expiry ON remember_tokens (expires_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_password_resets_expiry ON password_resets (reset_token_expiry)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_signups_created ON pending_signups (created_at)")
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_runs (
+            job TEXT PRIMARY KEY,
+            last_run TIMESTAMP,
+            last_report TEXT
+        )
+    ''')
+    
+    # Move plaintext tokens from the legacy users.remember_token column
+    cursor.execute("SELECT id, remember_token FROM users WHERE remember_token IS NOT NULL")
+    legacy_tokens = cursor.fetchall()
+    if legacy_tokens:
+        expires_at = (datetime.now() + REMEMBER_TOKEN_LIFETIME).isoformat()
+        cursor.executemany("INSERT OR IGNORE INTO remember_tokens (user_id, token_hash, expires_at) VALUES (?, ?, ?)",
+                           [(user_id, hash_remember_token(token), expires_at) for user_id, token in legacy_tokens])
+        cursor.execute("UPDATE users SET remember_token = NULL")
+    
+    # One row per distinct product (keyed by canonical URL), shared by every user tracking it
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            canonical_url TEXT NOT NULL UNIQUE,
+            site TEXT,
             product_name TEXT,
-            current_price REAL NOT NULL,
-            target_price REAL NOT NULL,
+            current_price REAL,
             currency TEXT,
             currency_symbol TEXT,
+            last_checked TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Full-text index over the products' name, URL and site for /api/trackers/search, kept in sync by triggers
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+    fts_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            product_name, canonical_url, site, content='products', content_rowid='id', prefix='2 3'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, product_name, canonical_url, site)
+            VALUES (NEW.id, NEW.product_name, NEW.canonical_url, NEW.site);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, product_name, canonical_url, site)
+            VALUES ('delete', OLD.id, OLD.product_name, OLD.canonical_url, OLD.site);
+        END
+    ''')
+    # Price refreshes also write product_name (COALESCE), so only re-index when the text really changed
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF product_name, canonical_url, site ON products
+        WHEN OLD.product_name IS NOT NEW.product_name OR OLD.canonical_url IS NOT NEW.canonical_url
+            OR OLD.site IS NOT NEW.site
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, product_name, canonical_url, site)
+            VALUES ('delete', OLD.id, OLD.product_name, OLD.canonical_url, OLD.site);
+            INSERT INTO products_fts (rowid, product_name, canonical_url, site)
+            VALUES (NEW.id, NEW.product_name, NEW.canonical_url, NEW.site);
+        END
+    ''')
+    if not fts_exists:
+        cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'trackers'")
+    if cursor.fetchone():
+        cursor.execute("PRAGMA table_info(trackers)")
+        if 'product_id' not in [column[1] for column in cursor.fetchall()]:
+            migrate_trackers_to_products(cursor)
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trackers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            target_price REAL NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
         )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trackers_user_product ON trackers (user_id, product_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trackers_product ON trackers (product_id)")
     
+    # Scraped prices over time, and the analytics job's precomputed per-product summaries
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            price REAL NOT NULL,
+            observed_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history (product_id, observed_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_observed ON price_history (observed_at)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_summaries (
+            product_id INTEGER PRIMARY KEY,
+            computed_at TIMESTAMP NOT NULL,
+            summary TEXT NOT NULL,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_stats (
+            user_id INTEGER NOT NULL,
+            currency TEXT NOT NULL,
+            trackers INTEGER NOT NULL DEFAULT 0,
+            reached INTEGER NOT NULL DEFAULT 0,
+            savings REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, currency)
+        )
+    ''')
+    for trigger in SQLITE_DASHBOARD_TRIGGERS:
+        cursor.execute(trigger)
+    ensure_dashboard_stats(cursor)
+    
+    # Change log behind /api/trackers?since=<cursor>: one row per tracker, re-sequenced on every change
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'tracker_changes'")
+    changes_exist = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tracker_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tracker_id INTEGER NOT NULL UNIQUE,
+            user_id INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tracker_changes_user ON tracker_changes (user_id, seq)")
+    for name, trigger in SQLITE_CHANGE_TRIGGERS.items():
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row is None or row[0] != trigger:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(trigger)
+    if not changes_exist:
+        cursor.execute(BACKFILL_TRACKER_CHANGES_SQL)
+    
+    conn.commit()
+    conn.close()
+
+def migrate_trackers_to_products(cursor):
+    """Move per-user url/price columns of the legacy trackers table into products"""
+    log.info("Migrating trackers to the normalized products table")
+    cursor.execute("""
+        SELECT id, user_id, url, product_name, current_price, target_price, currency, currency_symbol, created_at
+        FROM trackers ORDER BY created_at DESC, id DESC
+    """)
+    legacy_rows = cursor.fetchall()
+    
+    # Newest rows first: the upsert keeps the first price it sees, so each product gets the most recent one
+    for _, _, url, product_name, current_price, _, currency, currency_symbol, _ in legacy_rows:
+        cursor.execute(PRODUCT_UPSERT_SQL, product_params(url, product_name, current_price, currency, currency_symbol))
+    
+    cursor.execute('''
+        CREATE TABLE trackers_migrated (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            target_price REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+    cursor.executemany("""
+        INSERT INTO trackers_migrated (id, user_id, product_id, target_price, created_at)
+        SELECT ?, ?, id, ?, ? FROM products WHERE canonical_url = ?
+    """, [(tracker_id, user_id, target_price, created_at, canonicalize_url(url))
+          for tracker_id, user_id, url, _, _, target_price, _, _, created_at in legacy_rows])
+    cursor.execute("DROP TABLE trackers")
+    cursor.execute("ALTER TABLE trackers_migrated RENAME TO trackers")
+    log.info("Migrated trackers", extra={"trackers": len(legacy_rows)})
+
+# ==================== MAINTENANCE ====================
+
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', 6 * 3600))  # seconds between GC runs
+MAINTENANCE_BATCH_SIZE = 500
+MAINTENANCE_BATCH_PAUSE = 0.05  # let other writers in between batches
+VACUUM_PAGES_PER_RUN = 2000
+CONVERT_VACUUM_MAX_BYTES = 50 * 1024 * 1024  # one-time full VACUUM to enable auto_vacuum only below this size
+PRICE_HISTORY_RETENTION_DAYS = int(os.environ.get('PRICE_HISTORY_RETENTION_DAYS', 400))
+
+def expired_row_conditions():
+    """(table, WHERE clause, params) for rows that can no longer be used"""
+    now = datetime.now().isoformat()
+    return [
+        ('password_resets', "reset_token_expiry < ?", (now,)),
+        ('otp_verification',
+         "COALESCE(email_otp_expiry, phone_otp_expiry) IS NOT NULL"
+         " AND COALESCE(email_otp_expiry, '') < ? AND COALESCE(phone_otp_expiry, '') < ?", (now, now)),
+        # created_at is written by SQLite in UTC; signup sessions last 30 minutes
+        ('pending_signups', "created_at < datetime('now', '-30 minutes')", ()),
+        ('remember_tokens', "expires_at < ?", (now,)),
+        ('price_history', "observed_at < ?",
+         ((datetime.now() - timedelta(days=PRICE_HISTORY_RETENTION_DAYS)).isoformat(sep=' ', timespec='seconds'),)),
+    ]
+
+def delete_in_batches(conn, table, condition, params):
+    """Delete matching rows a batch at a time, committing between batches so no write lock is held for long"""
+    removed = 0
+    while True:
+        cursor = conn.execute(f"""
+            DELETE FROM {table} WHERE rowid IN (
+                SELECT rowid FROM {table} WHERE {condition} LIMIT ?
+            )
+        """, params + (MAINTENANCE_BATCH_SIZE,))
+        conn.commit()
+        removed += cursor.rowcount
+        if cursor.rowcount < MAINTENANCE_BATCH_SIZE:
+            return removed
+        time.sleep(MAINTENANCE_BATCH_PAUSE)
+
+def database_size(conn):
+    if storage.dialect == 'postgresql':
+        return conn.execute("SELECT pg_database_size(current_database())").fetchone()[0], 0
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_count * page_size, freelist * page_size
+
+def run_maintenance():
+    """Purge expired tokens/OTPs/signups, reclaim free pages and refresh planner stats"""
+    started = time.monotonic()
+    conn = connect_db(timeout=30)
+    size_before, _ = database_size(conn)
+    
+    removed = {}
+    for table, condition, params in expired_row_conditions():
+        removed[table] = delete_in_batches(conn, table, condition, params)
+    
+    if storage.dialect == 'postgresql':
+        # autovacuum reclaims dead rows; just refresh planner statistics
+        conn.execute("ANALYZE")
+        conn.commit()
+    elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if size_before <= CONVERT_VACUUM_MAX_BYTES:
+            # auto_vacuum can only change on an existing database through a full VACUUM
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            log.warning("Database too large to convert to incremental auto_vacuum online; run VACUUM manually")
+    else:
+        # The pragma frees one page per step, and sqlite3's execute() steps a statement without result
+        # columns only once; executescript() runs it to completion
+        conn.raw.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_RUN})")
+    if storage.dialect == 'sqlite':
+        conn.execute("PRAGMA optimize")
+    
+    size_after, free_after = database_size(conn)
+    conn.close()
+    report = {
+        "rowsRemoved": removed,
+        "sizeBefore": size_before,
+        "sizeAfter": size_after,
+        "freeBytes": free_after,
+        "durationMs": round((time.monotonic() - started) * 1000, 1)
+    }
+    log.info("Maintenance complete", extra=report)
+    return report
+
+def claim_job(job, interval):
+    """Atomically claim a periodic job so only one worker process runs it per interval"""
+    now = datetime.now()
+    conn = connect_db(timeout=30)
+    conn.execute("INSERT OR IGNORE INTO maintenance_runs (job, last_run) VALUES (?, NULL)", (job,))
+    cursor = conn.execute("""
+        UPDATE maintenance_runs SET last_run = ?
+        WHERE job = ? AND (last_run IS NULL OR last_run < ?)
+    """, (now.isoformat(), job, (now - timedelta(seconds=interval)).isoformat()))
     conn.commit()
     conn.close()
+    return cursor.rowcount == 1
+
+def maintenance_loop():
+    while True:
+        time.sleep(60 + random.uniform(0, 60))
+        try:
+            if claim_job('gc', MAINTENANCE_INTERVAL):
+                report = run_maintenance()
+                conn = connect_db(timeout=30)
+                conn.execute("UPDATE maintenance_runs SET last_report = ? WHERE job = 'gc'", (json.dumps(report),))
+                conn.commit()
+                conn.close()
+        except Exception:
+            log.exception("Maintenance error")
+
+def start_maintenance_scheduler():
+    if MAINTENANCE_INTERVAL > 0:
+        threading.Thread(target=maintenance_loop, name='maintenance', daemon=True).start()
+
+@app.cli.command('maintenance')
+def maintenance_command():
+    """Run the expired-row cleanup and vacuum now and print the report"""
+    init_db()
+    print(json.dumps(run_maintenance(), indent=2))
+
+# ==================== METRICS ====================
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # /metrics requires "Authorization: Bearer <token>"; closed while unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # diagnostics endpoints require "Authorization: Bearer <token>"; off while unset
+# Each worker process periodically snapshots its metrics here so /metrics can report all workers
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'price-alerter-metrics'))
+METRICS_FLUSH_INTERVAL = 5
+METRICS_STALE_AFTER = 300  # seconds before a dead worker's snapshot is dropped
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+def inc_counter(name, labels, amount=1):
+    key = (name, labels)
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def add_gauge(name, labels, amount):
+    key = (name, labels)
+    with _metrics_lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+def observe(name, labels, seconds):
+    key = (name, labels)
+    index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _metrics_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        histogram[index] += 1
+        histogram[-1] += seconds
+
+def metrics_endpoint_label():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+def record_db_time(seconds):
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + seconds
+        g.db_queries = g.get('db_queries', 0) + 1
+    else:
+        observe('price_alerter_db_duration_seconds', (('endpoint', 'background'),), seconds)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    add_gauge('price_alerter_http_requests_in_flight', (('endpoint', metrics_endpoint_label()),), 1)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = metrics_endpoint_label()
+    inc_counter('price_alerter_http_requests_total',
+                (('endpoint', endpoint), ('method', request.method), ('status', str(response.status_code))))
+    g.request_counted = True
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    endpoint = metrics_endpoint_label()
+    labels = (('endpoint', endpoint), ('method', request.method))
+    observe('price_alerter_http_request_duration_seconds', labels, time.perf_counter() - started)
+    add_gauge('price_alerter_http_requests_in_flight', (('endpoint', endpoint),), -1)
+    # An unhandled error normally still reaches after_request as a 500; count it here only if it didn't
+    if error is not None and not g.pop('request_counted', False):
+        inc_counter('price_alerter_http_requests_total', labels + (('status', '500'),))
+    if 'db_queries' in g:
+        observe('price_alerter_db_duration_seconds', (('endpoint', endpoint),), g.db_time)
+        inc_counter('price_alerter_db_queries_total', (('endpoint', endpoint),), g.db_queries)
+
+def reset_metrics():
+    with _metrics_lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def metrics_snapshot():
+    with _metrics_lock:
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            "gauges": [[name, list(labels), value] for (name, labels), value in _gauges.items()],
+            "histograms": [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()],
+        }
+
+def flush_metrics():
+    """Write this worker's snapshot atomically into METRICS_DIR"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"worker-{os.getpid()}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(metrics_snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+def metrics_flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            flush_metrics()
+        except OSError as e:
+            log.warning("Metrics flush error", extra={"error": str(e)})
+
+def start_metrics_flusher():
+    threading.Thread(target=metrics_flush_loop, name='metrics-flush', daemon=True).start()
+
+def collect_worker_snapshots():
+    """Own live snapshot plus the latest snapshot of every other live worker"""
+    snapshots = [metrics_snapshot()]
+    own = f"worker-{os.getpid()}.json"
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return snapshots
+    for name in names:
+        path = os.path.join(METRICS_DIR, name)
+        if name == own or not name.endswith('.json'):
+            continue
+        try:
+            if time.time() - os.path.getmtime(path) > METRICS_STALE_AFTER:
+                os.remove(path)
+                continue
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+def merge_snapshots(snapshots):
+    """Sum worker snapshots into (counters, gauges, histograms) keyed by (name, labels)"""
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot["gauges"]:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+        for name, labels, values in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                merged[i] += value
+    return counters, gauges, histograms
+
+def render_metrics(snapshots):
+    """Render merged worker snapshots in the Prometheus text exposition format"""
+    counters, gauges, histograms = merge_snapshots(snapshots)
+    lines = []
+    typed = set()
+    for metrics, kind in ((counters, 'counter'), (gauges, 'gauge')):
+        for (name, labels), value in sorted(metrics.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} {kind}")
+                typed.add(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), values in sorted(histograms.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {values[-1]:.6f}")
+        lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+def token_authorized(token):
+    """Whether the request carries the bearer token; always False when no token is configured"""
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint aggregating all worker processes"""
+    if not token_authorized(METRICS_TOKEN):
+        return "Unauthorized", 401
+    response = make_response(render_metrics(collect_worker_snapshots()))
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+# ==================== PROFILING ====================
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(DATABASE) or '.', 'profiles'))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # fraction of PROFILED_ENDPOINTS requests
+PROFILE_RETENTION = int(os.environ.get('PROFILE_RETENTION', 50))  # newest profiles kept on disk
+PROFILE_INTERVAL = 0.002  # seconds between stack samples
+PROFILED_ENDPOINTS = {'get_price', 'trackers', 'trackers_bulk', 'trackers_export', 'get_user', 'login', 'signup'}
+PROFILE_ID_PATTERN = re.compile(r'^[\w-]+$')
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts identical stacks (collapsed format)"""
+    
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profile-sampler', daemon=True)
+    
+    def start(self):
+        self.thread.start()
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+    
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return '\n'.join(f"{stack} {count}" for stack, count in sorted(self.counts.items())) + '\n'
+
+def requested_profile_mode():
+    """'sample' or 'cprofile' when this request should be profiled, else None"""
+    header = request.headers.get('X-Profile')
+    if header and ADMIN_TOKEN and hmac.compare_digest(request.headers.get('X-Profile-Token', '').encode(),
+                                                      ADMIN_TOKEN.encode()):
+        return 'cprofile' if header.lower() == 'cprofile' else 'sample'
+    if PROFILE_SAMPLE_RATE and request.endpoint in PROFILED_ENDPOINTS and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+@app.before_request
+def start_profiling():
+    mode = requested_profile_mode()
+    if mode is None:
+        return
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    g.profile = (mode, profiler, time.perf_counter())
+
+@app.after_request
+def note_profiled_status(response):
+    if 'profile' in g:
+        g.profile_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_profiling(error=None):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    mode, profiler, started = profile
+    duration = time.perf_counter() - started
+    if mode == 'cprofile':
+        profiler.disable()
+    else:
+        collapsed = profiler.stop()
+    
+    profile_id = f"{int(time.time() * 1000)}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if mode == 'cprofile':
+            profiler.dump_stats(os.path.join(PROFILE_DIR, profile_id + '.prof'))
+        else:
+            with open(os.path.join(PROFILE_DIR, profile_id + '.collapsed'), 'w') as f:
+                f.write(collapsed)
+        with open(os.path.join(PROFILE_DIR, profile_id + '.json'), 'w') as f:
+            json.dump({
+                "id": profile_id, "mode": mode, "endpoint": request.endpoint, "method": request.method,
+                "path": request.path, "status": g.pop('profile_status', 500),
+                "durationMs": round(duration * 1000, 2), "createdAt": datetime.now().isoformat()
+            }, f)
+        prune_profiles()
+    except OSError as e:
+        log.warning("Could not save profile", extra={"error": str(e)})
+
+def prune_profiles():
+    """Ring-buffer retention: drop the oldest profiles beyond PROFILE_RETENTION"""
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    for profile_id in ids[:-PROFILE_RETENTION] if PROFILE_RETENTION else ids:
+        for extension in ('.json', '.collapsed', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + extension))
+            except FileNotFoundError:
+                pass
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Stored request profiles, newest first"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not token_authorized(ADMIN_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(PROFILE_DIR, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    return jsonify(profiles)
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a profile: collapsed stacks (feed to flamegraph.pl / speedscope) or a cProfile .prof"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not token_authorized(ADMIN_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return jsonify({"error": "Invalid profile id"}), 400
+    for extension, mimetype in (('.collapsed', 'text/plain'), ('.prof', 'application/octet-stream')):
+        if os.path.exists(os.path.join(PROFILE_DIR, profile_id + extension)):
+            return send_from_directory(PROFILE_DIR, profile_id + extension, mimetype=mimetype,
+                                       as_attachment=True, max_age=0)
+    return jsonify({"error": "Profile not found"}), 404
+
+# ==================== PASSWORD HASHING ====================
+
+# Full werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Changing it rehashes each user's password on their next successful login.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', 2))
+HASH_QUEUE_LIMIT = int(os.environ.get('HASH_QUEUE_LIMIT', 8))  # running + waiting hashes before we shed load
+HASH_WAIT_TIMEOUT = 10
+
+hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+_hash_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+_hash_method_label = None
+
+class HashingBusyError(Exception):
+    """Raised when the password hashing pool is saturated"""
+
+def run_hash_job(func, *args):
+    """Run a slow hashing call on the bounded pool, refusing work once the queue is full"""
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingBusyError()
+    try:
+        future = hash_executor.submit(func, *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    try:
+        return future.result(timeout=HASH_WAIT_TIMEOUT)
+    except FutureTimeoutError:
+        raise HashingBusyError()
+
+def hash_password(password):
+    return run_hash_job(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return run_hash_job(check_password_hash, password_hash, password)
+
+def password_needs_rehash(password_hash):
+    """True when a stored hash was made with different parameters than PASSWORD_HASH_METHOD"""
+    global _hash_method_label
+    if _hash_method_label is None:
+        # werkzeug expands partial methods ("pbkdf2" -> "pbkdf2:sha256:1000000"), so compare against its output
+        _hash_method_label = generate_password_hash('', method=PASSWORD_HASH_METHOD).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _hash_method_label
+
+@app.errorhandler(HashingBusyError)
+def hashing_busy(error):
+    response = jsonify({"error": "Server is busy, please try again in a moment."})
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
+# ==================== AUTH MIDDLEWARE ====================
+
+REMEMBER_TOKEN_LIFETIME = timedelta(days=365)
+REMEMBER_CACHE_TTL = 300  # seconds; a token revoked on another worker stays valid here for at most this long
+REMEMBER_CACHE_SIZE = 1024
+SESSIONLESS_ENDPOINTS = {'static', 'serve_static'}
+
+# token_hash -> ((user_id, username, email) or None, cache expiry)
+_remember_cache = {}
+_remember_cache_lock = threading.Lock()
+
+def hash_remember_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def issue_remember_token(cursor, user_id):
+    """Create a remember-me token for the user and return the plaintext value for the cookie"""
+    token = secrets.token_urlsafe(32)
+    expires_at = (datetime.now() + REMEMBER_TOKEN_LIFETIME).isoformat()
+    cursor.execute("INSERT INTO remember_tokens (user_id, token_hash, expires_at) VALUES (?, ?, ?)",
+                   (user_id, hash_remember_token(token), expires_at))
+    return token
+
+def revoke_remember_tokens(cursor, user_id=None, token=None):
+    """Delete one token (by plaintext) or all of a user's tokens, and drop them from the cache"""
+    if token:
+        token_hash = hash_remember_token(token)
+        cursor.execute("DELETE FROM remember_tokens WHERE token_hash = ?", (token_hash,))
+        with _remember_cache_lock:
+            _remember_cache.pop(token_hash, None)
+    if user_id is not None:
+        cursor.execute("DELETE FROM remember_tokens WHERE user_id = ?", (user_id,))
+        with _remember_cache_lock:
+            for token_hash, (user, _) in list(_remember_cache.items()):
+                if user and user[0] == user_id:
+                    del _remember_cache[token_hash]
+
+def lookup_remember_token(token):
+    """Resolve a remember-me cookie to (user_id, username, email), consulting the TTL cache first"""
+    token_hash = hash_remember_token(token)
+    now = time.monotonic()
+    with _remember_cache_lock:
+        cached = _remember_cache.get(token_hash)
+        if cached and cached[1] > now:
+            return cached[0]
+    
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT u.id, u.username, u.email, r.expires_at
+        FROM remember_tokens r JOIN users u ON u.id = r.user_id
+        WHERE r.token_hash = ?
+    """, (token_hash,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    user = None
+    if row and datetime.fromisoformat(row[3]) > datetime.now():
+        user = row[:3]
+    
+    # Unknown tokens are cached too, so a stale cookie doesn't cost a query per request
+    with _remember_cache_lock:
+        if len(_remember_cache) >= REMEMBER_CACHE_SIZE:
+            _remember_cache.pop(next(iter(_remember_cache)))
+        _remember_cache[token_hash] = (user, now + REMEMBER_CACHE_TTL)
+    return user
+
+@app.before_request
+def restore_session():
+    """Restore the session from the remember-me cookie; the session is only modified when a login is restored"""
+    if request.endpoint in SESSIONLESS_ENDPOINTS:
+        return
+    if 'user_id' in session:
+        return
+    remember_token = request.cookies.get('remember_token')
+    if not remember_token:
+        return
+    user = lookup_remember_token(remember_token)
+    if user:
+        session['user_id'] = user[0]
+        session['username'] = user[1]
+        session['email'] = user[2]
+        session.permanent = True
+
+# ==================== RATE LIMITING ====================
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# 'sqlite' shares counters between gunicorn workers through a side database; 'memory' is per process
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+RATE_LIMIT_DATABASE = os.environ.get('RATE_LIMIT_DATABASE',
+                                     os.path.join(os.path.dirname(DATABASE) or '.', 'ratelimit.db'))
+
+class MemoryRateLimitStore:
+    """Per-process sliding-window counters"""
+    
+    MAX_KEYS = 50000
+    
+    def __init__(self):
+        self.windows = {}  # key -> [window_start, current, previous]
+        self.lock = threading.Lock()
+    
+    def hit(self, key, window_start, window):
+        """Count one hit and return (current_window_count, previous_window_count)"""
+        with self.lock:
+            entry = self.windows.get(key)
+            if entry is None:
+                if len(self.windows) >= self.MAX_KEYS:
+                    self.evict(window_start - window)
+                entry = self.windows[key] = [window_start, 0, 0]
+            elif entry[0] != window_start:
+                entry[2] = entry[1] if entry[0] == window_start - window else 0
+                entry[1] = 0
+                entry[0] = window_start
+            entry[1] += 1
+            return entry[1], entry[2]
+    
+    def evict(self, oldest_window):
+        for key, entry in list(self.windows.items()):
+            if entry[0] < oldest_window:
+                del self.windows[key]
+
+class SQLiteRateLimitStore:
+    """Sliding-window counters in a shared SQLite file, so limits hold across worker processes"""
+    
+    CLEANUP_EVERY = 1000
+    
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.hits = 0
+    
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # counters are disposable
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    window_start INTEGER NOT NULL,
+                    current INTEGER NOT NULL,
+                    previous INTEGER NOT NULL
+                )
+            """)
+            self.local.conn = conn
+        return conn
+    
+    def hit(self, key, window_start, window):
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Roll the window forward in the same statement that counts the hit
+            conn.execute("""
+                INSERT INTO rate_limits (key, window_start, current, previous) VALUES (?, ?, 1, 0)
+                ON CONFLICT(key) DO UPDATE SET
+                    previous = CASE WHEN window_start = excluded.window_start THEN previous
+                                    WHEN window_start = excluded.window_start - ? THEN current
+                                    ELSE 0 END,
+                    current = CASE WHEN window_start = excluded.window_start THEN current + 1 ELSE 1 END,
+                    window_start = excluded.window_start
+            """, (key, window_start, window))
+            row = conn.execute("SELECT current, previous FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            self.hits += 1
+            if self.hits % self.CLEANUP_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE window_start < ?", (window_start - 86400,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+def create_rate_limit_store(backend):
+    if backend == 'memory':
+        return MemoryRateLimitStore()
+    return SQLiteRateLimitStore(RATE_LIMIT_DATABASE)
+
+rate_limit_store = create_rate_limit_store(RATE_LIMIT_BACKEND)
+
+def check_rate_limit(key, limit, window):
+    """Count a hit against key and return (allowed, retry_after_seconds).
+
+    Uses the sliding-window counter approximation: the previous fixed window's
+    count is weighted by how much of it still overlaps the sliding window.
+    """
+    now = time.time()
+    window_start = int(now // window) * window
+    try:
+        current, previous = rate_limit_store.hit(key, window_start, window)
+    except sqlite3.Error as e:
+        # Fail open: a locked or unavailable counter store must not take logins down
+        log.warning("Rate limit store error", extra={"error": str(e)})
+        return True, 0
+    elapsed = now - window_start
+    estimated = previous * (window - elapsed) / window + current
+    if estimated > limit:
+        return False, max(1, int(window - elapsed))
+    return True, 0
+
+def rate_limit_identity(scope):
+    if scope == 'ip':
+        return request.remote_addr or 'unknown'
+    if scope == 'session':
+        return session.get('user_id')
+    return None
+
+def rate_limit(limit, per, scope='ip', methods=('POST',)):
+    """Limit a view to `limit` requests per `per` seconds for each client IP or logged-in session"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            if RATE_LIMIT_ENABLED and request.method in methods:
+                identity = rate_limit_identity(scope)
+                if identity is not None:
+                    allowed, retry_after = check_rate_limit(f"{request.endpoint}:{scope}:{per}:{identity}", limit, per)
+                    if not allowed:
+                        response = jsonify({"error": "Too many requests. Please slow down and try again shortly."})
+                        response.status_code = 429
+                        response.headers['Retry-After'] = str(retry_after)
+                        return response
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+# ==================== COORDINATION ====================
+
+COORDINATION_BACKEND = os.environ.get('COORDINATION_BACKEND', 'sqlite')  # or 'memory' for a single process
+COORDINATION_DATABASE = os.environ.get('COORDINATION_DATABASE',
+                                       os.path.join(os.path.dirname(DATABASE) or '.', 'coordination.db'))
+NODE_NAME = os.environ.get('NODE_NAME', socket.gethostname())
+PRICE_CACHE_TTL = int(os.environ.get('PRICE_CACHE_TTL', 60))  # seconds /get-price reuses a scraped price; 0 disables
+PRICE_REFRESH_INTERVAL = int(os.environ.get('PRICE_REFRESH_INTERVAL', 0))  # re-scrape tracked products this old; 0 disables
+SCRAPE_POLL_INTERVAL = 5  # seconds between job queue polls
+SCRAPE_JOB_BATCH = 16
+SCRAPE_JOB_LEASE = 120  # seconds before a job claimed by a dead node is handed out again
+SCHEDULER_LEASE = 'price-refresh-scheduler'
+CROSSING_LEASE = 'target-crossings'  # held apart from the scheduler, which PRICE_REFRESH_INTERVAL=0 turns off
+LEASE_TTL = SCRAPE_POLL_INTERVAL * 3  # seconds; renewed every poll and after each batch
+
+scrape_wakeup = threading.Event()
+
+def node_id():
+    """Every worker process is its own node"""
+    return f"{NODE_NAME}:{os.getpid()}"
+
+class MemoryCoordinationBackend:
+    """Price cache, scrape job queue and leases in process memory; only coordinates threads of one process"""
+    
+    MAX_CACHED_PRICES = 10000
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.prices = {}  # url -> (expires_at, payload)
+        self.jobs = {}    # key -> [payload, holder, lease_until, requeued], in queue order
+        self.leases = {}  # name -> (holder, expires_at)
+    
+    def get_price(self, url):
+        entry = self.prices.get(url)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+        return None
+    
+    def set_price(self, url, payload, ttl):
+        now = time.time()
+        with self.lock:
+            if len(self.prices) >= self.MAX_CACHED_PRICES:
+                for key in [key for key, (expires_at, _) in self.prices.items() if expires_at <= now]:
+                    del self.prices[key]
+                if len(self.prices) >= self.MAX_CACHED_PRICES:
+                    del self.prices[next(iter(self.prices))]
+            self.prices[url] = (now + ttl, payload)
+    
+    def enqueue_jobs(self, jobs):
+        """Queue (key, payload) jobs, skipping keys already queued; returns how many were added.
+
+        A key that is claimed right now is marked requeued, so completing it queues it once more.
+        """
+        with self.lock:
+            added = 0
+            for key, payload in jobs:
+                job = self.jobs.get(key)
+                if job is None:
+                    self.jobs[key] = [payload, None, 0, False]
+                    added += 1
+                elif job[1] is not None:
+                    job[0], job[3] = payload, True
+            return added
+    
+    def claim_jobs(self, holder, limit, lease):
+        """Lease up to `limit` unclaimed (or abandoned) jobs to holder; returns [(key, payload)]"""
+        now = time.time()
+        claimed = []
+        with self.lock:
+            for key, job in self.jobs.items():
+                if job[2] < now:
+                    job[1], job[2], job[3] = holder, now + lease, False
+                    claimed.append((key, job[0]))
+                    if len(claimed) == limit:
+                        break
+        return claimed
+    
+    def complete_jobs(self, holder, keys):
+        """Drop holder's finished jobs; one re-enqueued while claimed goes back to the end of the queue"""
+        with self.lock:
+            for key in keys:
+                job = self.jobs.get(key)
+                if job is not None and job[1] == holder:
+                    del self.jobs[key]
+                    if job[3]:
+                        self.jobs[key] = [job[0], None, 0, False]
+    
+    def acquire_lease(self, name, holder, ttl):
+        """Take or renew the named lease; True while holder owns it"""
+        now = time.time()
+        with self.lock:
+            current = self.leases.get(name)
+            if current is None or current[0] == holder or current[1] < now:
+                self.leases[name] = (holder, now + ttl)
+                return True
+            return False
+
+class SQLiteCoordinationBackend:
+    """Price cache, scrape job queue and leases in a SQLite file shared by every worker and node"""
+    
+    CLEANUP_EVERY = 1000
+    
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.writes = 0
+    
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Default rollback journal rather than WAL: WAL needs shared memory, which a file shared between hosts lacks
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS price_cache (
+                    url TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS scrape_jobs (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    holder TEXT,
+                    lease_until REAL NOT NULL DEFAULT 0,
+                    queued_at REAL NOT NULL,
+                    requeued INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_scrape_jobs_lease ON scrape_jobs(lease_until, queued_at);
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            """)
+            if 'requeued' not in [column[1] for column in conn.execute("PRAGMA table_info(scrape_jobs)")]:
+                conn.execute("ALTER TABLE scrape_jobs ADD COLUMN requeued INTEGER NOT NULL DEFAULT 0")
+            self.local.conn = conn
+        return conn
+    
+    def get_price(self, url):
+        row = self.connect().execute("SELECT payload FROM price_cache WHERE url = ? AND expires_at > ?",
+                                     (url, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def set_price(self, url, payload, ttl):
+        conn = self.connect()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO price_cache (url, payload, expires_at) VALUES (?, ?, ?)",
+                     (url, json.dumps(payload), now + ttl))
+        self.writes += 1
+        if self.writes % self.CLEANUP_EVERY == 0:
+            conn.execute("DELETE FROM price_cache WHERE expires_at <= ?", (now,))
+    
+    def enqueue_jobs(self, jobs):
+        """Queue (key, payload) jobs, skipping keys already queued; returns how many were added.
+
+        A key that is claimed right now is marked requeued, so completing it queues it once more.
+        """
+        conn = self.connect()
+        now = time.time()
+        jobs = [(key, json.dumps(payload)) for key, payload in jobs]
+        conn.executemany("UPDATE scrape_jobs SET payload = ?, requeued = 1 WHERE key = ? AND holder IS NOT NULL",
+                         [(payload, key) for key, payload in jobs])
+        cursor = conn.executemany("INSERT OR IGNORE INTO scrape_jobs (key, payload, queued_at) VALUES (?, ?, ?)",
+                                  [(key, payload, now) for key, payload in jobs])
+        return cursor.rowcount
+    
+    def claim_jobs(self, holder, limit, lease):
+        """Lease up to `limit` unclaimed (or abandoned) jobs to holder; returns [(key, payload)]"""
+        conn = self.connect()
+        now = time.time()
+        # IMMEDIATE takes the write lock before the SELECT, so two nodes can't claim the same rows
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT key, payload FROM scrape_jobs WHERE lease_until < ? ORDER BY queued_at LIMIT ?",
+                                (now, limit)).fetchall()
+            conn.executemany("UPDATE scrape_jobs SET holder = ?, lease_until = ?, requeued = 0 WHERE key = ?",
+                             [(holder, now + lease, key) for key, _ in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(key, json.loads(payload)) for key, payload in rows]
+    
+    def complete_jobs(self, holder, keys):
+        """Drop holder's finished jobs; one re-enqueued while claimed goes back to the end of the queue"""
+        conn = self.connect()
+        now = time.time()
+        # In one write transaction, so a concurrent enqueue can't mark a job between the release and the delete
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""
+                UPDATE scrape_jobs SET holder = NULL, lease_until = 0, requeued = 0, queued_at = ?
+                WHERE key = ? AND holder = ? AND requeued = 1
+            """, [(now, key, holder) for key in keys])
+            conn.executemany("DELETE FROM scrape_jobs WHERE key = ? AND holder = ?", [(key, holder) for key in keys])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def acquire_lease(self, name, holder, ttl):
+        """Take or renew the named lease; True while holder owns it"""
+        now = time.time()
+        cursor = self.connect().execute("""
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+        """, (name, holder, now + ttl, now))
+        return cursor.rowcount == 1
+
+def create_coordination_backend(backend):
+    if backend == 'memory':
+        return MemoryCoordinationBackend()
+    return SQLiteCoordinationBackend(COORDINATION_DATABASE)
+
+coordination = create_coordination_backend(COORDINATION_BACKEND)
+
+def cached_price(url):
+    """Cached /get-price payload for a canonical URL, or None; cache errors count as misses"""
+    if not PRICE_CACHE_TTL:
+        return None
+    try:
+        payload = coordination.get_price(url)
+    except sqlite3.Error as e:
+        log.warning("Price cache error", extra={"error": str(e)})
+        return None
+    inc_counter('price_alerter_price_cache_total', (('result', 'hit' if payload is not None else 'miss'),))
+    return payload
+
+def cache_price(url, payload):
+    if not PRICE_CACHE_TTL:
+        return
+    try:
+        coordination.set_price(url, payload, PRICE_CACHE_TTL)
+    except sqlite3.Error as e:
+        log.warning("Price cache error", extra={"error": str(e)})
+
+def enqueue_price_refreshes(product_urls):
+    """Queue (product_id, url) pairs for the scrape workers; a product already queued isn't queued twice"""
+    added = coordination.enqueue_jobs([(f"refresh:{product_id}", {"productId": product_id, "url": url})
+                                       for product_id, url in product_urls])
+    scrape_wakeup.set()
+    return added
+
+def schedule_stale_refreshes():
+    """Queue every tracked product whose price is older than PRICE_REFRESH_INTERVAL"""
+    cutoff = (datetime.now() - timedelta(seconds=PRICE_REFRESH_INTERVAL)).isoformat(sep=' ', timespec='seconds')
+    conn = connect_db()
+    rows = conn.execute("""
+        SELECT id, canonical_url FROM products
+        WHERE (last_checked IS NULL OR last_checked < ?)
+          AND EXISTS (SELECT 1 FROM trackers WHERE trackers.product_id = products.id)
+    """, (cutoff,)).fetchall()
+    conn.close()
+    return enqueue_price_refreshes([(product_id, url) for product_id, url in rows
+                                    if url.startswith(('http://', 'https://'))])
+
+def hold_crossing_lease(holder):
+    """Take or renew the crossing lease; only its holder keeps a tracker index and reports crossings"""
+    return coordination.acquire_lease(CROSSING_LEASE, holder, LEASE_TTL)
+
+def run_scrape_pass(holder, next_schedule):
+    """One poll of the scrape worker; returns the time the next stale-refresh pass is due"""
+    if PRICE_REFRESH_INTERVAL > 0 and coordination.acquire_lease(SCHEDULER_LEASE, holder, LEASE_TTL):
+        if time.time() >= next_schedule:
+            queued = schedule_stale_refreshes()
+            next_schedule = time.time() + PRICE_REFRESH_INTERVAL
+            log.info("Scheduled stale price refreshes", extra={"queued": queued, "node": holder})
+    else:
+        # Another node is scheduling; if leadership comes back, start with a fresh pass
+        next_schedule = 0
+    checker = hold_crossing_lease(holder)
+    while True:
+        jobs = coordination.claim_jobs(holder, SCRAPE_JOB_BATCH, SCRAPE_JOB_LEASE)
+        if not jobs:
+            break
+        refresh_product_prices([(job['productId'], job['url']) for _, job in jobs])
+        coordination.complete_jobs(holder, [key for key, _ in jobs])
+        # Batches can outlast the lease; renew it so another node doesn't take over mid-pass
+        checker = checker and hold_crossing_lease(holder)
+    # Checked again right before the crossing pass, so two nodes never report the same crossing
+    if checker and hold_crossing_lease(holder):
+        check_target_crossings()
+    else:
+        # Another node reports crossings; if the lease comes back, start from a fresh index
+        drop_tracker_index()
+    return next_schedule
+
+def scrape_worker_loop():
+    """Claim batches of refresh jobs until the queue is drained; the lease holder also schedules stale products"""
+    next_schedule = 0
+    while True:
+        scrape_wakeup.wait(SCRAPE_POLL_INTERVAL + random.uniform(0, 1))
+        scrape_wakeup.clear()
+        try:
+            next_schedule = run_scrape_pass(node_id(), next_schedule)
+        except Exception:
+            log.exception("Scrape worker error")
+
+def start_scrape_worker():
+    threading.Thread(target=scrape_worker_loop, name='scrape-worker', daemon=True).start()
+
+# ==================== CURRENCY ====================
+
+FX_PROVIDER = os.environ.get('FX_PROVIDER', 'file')  # 'file' reads FX_RATES_FILE, 'http' fetches FX_RATES_URL
+FX_RATES_FILE = os.environ.get('FX_RATES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fx_rates.json'))
+FX_RATES_URL = os.environ.get('FX_RATES_URL')  # must answer with the same JSON as the rates file
+FX_REFRESH_INTERVAL = int(os.environ.get('FX_REFRESH_INTERVAL', 6 * 3600))  # seconds a loaded rate table is reused
+DISPLAY_CURRENCY = os.environ.get('DISPLAY_CURRENCY', 'INR')  # what dashboard totals are converted to by default
+
+def create_rate_provider(provider):
+    if provider == 'http':
+        return HttpRateProvider(FX_RATES_URL)
+    return FileRateProvider(FX_RATES_FILE)
+
+fx_rates = RateCache(create_rate_provider(FX_PROVIDER), FX_REFRESH_INTERVAL,
+                     on_error=lambda e: log.warning("Could not load FX rates", extra={"error": str(e)}))
+
+def rate_table():
+    """The cached RateTable, or None while no rates could be loaded"""
+    try:
+        return fx_rates.table()
+    except LookupError:
+        return None
+
+def normalized_price_sql(expression, table):
+    """SQL for `expression` (an amount in p.currency) in the table's base currency, and its parameters"""
+    cases = " ".join("WHEN ? THEN ?" for _ in table.codes)
+    params = [value for code, rate in zip(table.codes, table.per_base.tolist()) for value in (code, rate)]
+    # A currency without a rate is left as it is rather than dropped from the order
+    return f"({expression}) / CASE p.currency {cases} ELSE 1 END", params
 
 # ==================== ROUTES ====================
 
@@ -408,21 +2337,21 @@ def signup():
             return jsonify({"error": "Missing data"}), 400
 
         try:
-            conn = sqlite3.connect(DATABASE)
+            conn = connect_db()
             cursor = conn.cursor()
             cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
             if cursor.fetchone():
                 conn.close()
                 return jsonify({"error": "Email already exists"}), 409
 
-            # Generate remember token for lifetime login
-            remember_token = secrets.token_urlsafe(32)
-            
             cursor.execute("""
-                INSERT INTO users (username, email, password, phone, email_verified, remember_token)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (username, email, generate_password_hash(password), phone, 1, remember_token))
+                INSERT INTO users (username, email, password, phone, email_verified)
+                VALUES (?, ?, ?, ?, ?)
+            """, (username, email, hash_password(password), phone, 1))
             user_id = cursor.lastrowid
+            
+            # Generate remember token for lifetime login
+            remember_token = issue_remember_token(cursor, user_id)
             conn.commit()
             conn.close()
 
@@ -442,6 +2371,8 @@ def signup():
             response.set_cookie('remember_token', remember_token, max_age=60*60*24*365, httponly=True, samesite='Lax')
             
             return response
+        except HashingBusyError:
+            raise
         except Exception:
             return jsonify({"error": "Signup failed. Please try again."}), 500
 
@@ -457,7 +2388,7 @@ def signup_complete():
     if not signup_token:
         return jsonify({"error": "Signup token is required"}), 400
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM pending_signups WHERE signup_token = ?", (signup_token,))
     pending = cursor.fetchone()
@@ -508,7 +2439,7 @@ def signup_complete():
         
         cursor.execute("DELETE FROM pending_signups WHERE id = ?", (signup_id,))
         conn.commit()
-    except sqlite3.IntegrityError:
+    except storage.IntegrityError:
         conn.close()
         return jsonify({"error": "Email already exists"}), 409
     finally:
@@ -521,24 +2452,11 @@ def signup_complete():
     }), 201
 
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limit(10, per=60)
+@rate_limit(100, per=3600)
 def login():
     """Login page - redirect to dashboard if already logged in"""
-    # Check for remember_token cookie first
-    remember_token = request.cookies.get('remember_token')
-    if remember_token and 'user_id' not in session:
-        # Try to restore session from remember token
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, username, email FROM users WHERE remember_token = ?", (remember_token,))
-        user = cursor.fetchone()
-        conn.close()
-        if user:
-            # Restore session
-            session['user_id'] = user[0]
-            session['username'] = user[1]
-            session['email'] = user[2]
-            return redirect(url_for('dashboard'))
-    
+    # Sessions are restored from the remember_token cookie by restore_session()
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
     
@@ -552,22 +2470,28 @@ def login():
             return jsonify({"error": "Missing data"}), 400
         
         try:
-            conn = sqlite3.connect(DATABASE)
+            conn = connect_db()
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
             user = cursor.fetchone()
 
-            if user and check_password_hash(user[3], password):
+            if user and verify_password(user[3], password):
                 # Update last login timestamp
                 cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user[0],))
                 
+                # Upgrade the stored hash if the cost profile changed; skipped when the pool is busy
+                if password_needs_rehash(user[3]):
+                    try:
+                        cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hash_password(password), user[0]))
+                    except HashingBusyError:
+                        pass
+                
                 # Generate remember token if "Remember me" is checked
                 if remember:
-                    token = secrets.token_urlsafe(32)
-                    cursor.execute("UPDATE users SET remember_token = ? WHERE id = ?", (token, user[0]))
+                    token = issue_remember_token(cursor, user[0])
                 else:
-                    # Clear remember token if not checked
-                    cursor.execute("UPDATE users SET remember_token = NULL WHERE id = ?", (user[0],))
+                    # Clear remember tokens if not checked
+                    revoke_remember_tokens(cursor, user_id=user[0])
                 
                 conn.commit()
                 conn.close()
@@ -592,6 +2516,8 @@ def login():
             else:
                 conn.close()
                 return jsonify({"error": "Invalid credentials"}), 401
+        except HashingBusyError:
+            raise
         except Exception as e:
             return jsonify({"error": f"Login failed: {str(e)}"}), 500
     
@@ -606,10 +2532,25 @@ def dashboard():
 
 @app.route('/logout')
 def logout():
+    remember_token = request.cookies.get('remember_token')
+    if remember_token:
+        conn = connect_db()
+        cursor = conn.cursor()
+        revoke_remember_tokens(cursor, token=remember_token)
+        conn.commit()
+        conn.close()
     session.pop('user_id', None)
-    return redirect(url_for('home'))
+    session.pop('username', None)
+    session.pop('email', None)
+    response = make_response(redirect(url_for('home')))
+    response.delete_cookie('remember_token')
+    # Drop the service worker's cached dashboard and the IndexedDB copy of this user's trackers
+    response.headers['Clear-Site-Data'] = '"cache", "storage"'
+    return response
 
 @app.route('/forgot-password', methods=['GET', 'POST'])
+@rate_limit(5, per=60)
+@rate_limit(20, per=3600)
 def forgot_password():
     if request.method == 'POST':
         data = request.get_json()
@@ -617,7 +2558,7 @@ def forgot_password():
         if not email:
             return jsonify({"error": "Email is required"}), 400
         
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
         user = cursor.fetchone()
@@ -626,7 +2567,7 @@ def forgot_password():
         if user:
             reset_token = secrets.token_urlsafe(32)
             expiry = datetime.now() + timedelta(minutes=30)
-            conn = sqlite3.connect(DATABASE)
+            conn = connect_db()
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO password_resets (user_id, reset_token, reset_token_expiry)
@@ -646,7 +2587,7 @@ def reset_password():
     if not token:
         return render_template('error.html', error="Invalid reset link")
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT user_id, reset_token_expiry FROM password_resets WHERE reset_token = ?", (token,))
     reset_record = cursor.fetchone()
@@ -668,8 +2609,8 @@ def reset_password():
         if not new_password or len(new_password) < 6:
             return jsonify({"error": "Password must be at least 6 characters"}), 400
         
-        hashed = generate_password_hash(new_password)
-        conn = sqlite3.connect(DATABASE)
+        hashed = hash_password(new_password)
+        conn = connect_db()
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hashed, user_id))
         cursor.execute("DELETE FROM password_resets WHERE user_id = ?", (user_id,))
@@ -692,7 +2633,7 @@ def get_user():
     if 'user_id' not in session:
         return jsonify({"error": "Not logged in"}), 401
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, username, email, phone FROM users WHERE id = ?", (session['user_id'],))
     user = cursor.fetchone()
@@ -702,51 +2643,412 @@ def get_user():
         return jsonify({"id": user[0], "username": user[1], "email": user[2], "phone": user[3]})
     return jsonify({"error": "User not found"}), 404
 
+TRACKER_SELECT_SQL = """
+    SELECT t.id, p.canonical_url, p.product_name, p.current_price, t.target_price,
+           p.currency, p.currency_symbol, t.created_at
+    FROM trackers t JOIN products p ON p.id = t.product_id
+"""
+
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+
+def tracker_changes_since(user_id):
+    """Trackers changed or deleted after the client's sync cursor, one page at a time"""
+    try:
+        since = max(int(request.args.get('since', 0)), 0)
+        limit = min(max(int(request.args.get('limit', SYNC_PAGE_SIZE)), 1), SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    # A client starting from scratch has nothing to delete, so it can skip the tombstones
+    tombstones = "" if since else " AND c.deleted = 0"
+    conn = connect_db()
+    rows = conn.execute(f"""
+        SELECT c.seq, c.tracker_id, c.deleted, p.canonical_url, p.product_name, p.current_price,
+               t.target_price, p.currency, p.currency_symbol, t.created_at
+        FROM tracker_changes c
+        LEFT JOIN trackers t ON t.id = c.tracker_id
+        LEFT JOIN products p ON p.id = t.product_id
+        WHERE c.user_id = ? AND c.seq > ?{tombstones}
+        ORDER BY c.seq LIMIT ?
+    """, (user_id, since, limit + 1)).fetchall()
+    conn.close()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    changed, deleted = [], []
+    for seq, tracker_id, is_deleted, url, name, current, target, currency, symbol, created_at in rows:
+        if is_deleted or url is None:
+            deleted.append(tracker_id)
+        else:
+            changed.append({
+                "id": tracker_id, "url": url, "productName": name or "Product",
+                "currentPrice": current, "targetPrice": target,
+                "currency": currency, "currencySymbol": symbol, "createdAt": created_at
+            })
+    return jsonify({
+        "userId": user_id,
+        "trackers": changed,
+        "deleted": deleted,
+        "cursor": rows[-1][0] if rows else since,
+        "more": more,
+    })
+
 @app.route('/api/trackers', methods=['GET', 'POST', 'DELETE'])
 def trackers():
     if 'user_id' not in session:
         return jsonify({"error": "Not logged in"}), 401
     
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    if request.method == 'GET' and 'since' in request.args:
+        return tracker_changes_since(session['user_id'])
     
-    if request.method == 'GET':
-        cursor.execute("SELECT id, url, product_name, current_price, target_price, currency, currency_symbol, created_at FROM trackers WHERE user_id = ? ORDER BY created_at DESC", (session['user_id'],))
-        trackers_list = cursor.fetchall()
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        
+        if request.method == 'GET':
+            cursor.execute(TRACKER_SELECT_SQL + " WHERE t.user_id = ? ORDER BY t.created_at DESC", (session['user_id'],))
+            trackers_list = cursor.fetchall()
+            result = []
+            for t in trackers_list:
+                result.append({
+                    "id": t[0], "url": t[1], "productName": t[2] or "Product",
+                    "currentPrice": t[3], "targetPrice": t[4],
+                    "currency": t[5], "currencySymbol": t[6], "createdAt": t[7]
+                })
+            return jsonify(result)
+        
+        if request.method == 'POST':
+            data = request.json
+            if not data.get('url') or data.get('targetPrice') is None:
+                return jsonify({"error": "url and targetPrice are required"}), 400
+            product_id, price_seeded = upsert_product(cursor, data.get('url'), data.get('productName'),
+                                                      data.get('currentPrice'), data.get('currency'),
+                                                      data.get('currencySymbol'))
+            if price_seeded and isinstance(data.get('currentPrice'), (int, float)):
+                record_price_observations(cursor, 'id', [(product_id, data['currentPrice'])])
+            cursor.execute("""
+                INSERT INTO trackers (user_id, product_id, target_price)
+                VALUES (?, ?, ?)
+            """, (session['user_id'], product_id, data.get('targetPrice')))
+            tracker_id = cursor.lastrowid
+            conn.commit()
+            return jsonify({"id": tracker_id, "message": "Tracker created"}), 201
+        
+        if request.method == 'DELETE':
+            data = request.json
+            tracker_id = data.get('id')
+            cursor.execute("DELETE FROM trackers WHERE id = ? AND user_id = ?", (tracker_id, session['user_id']))
+            conn.commit()
+            return jsonify({"message": "Tracker deleted"})
+    finally:
         conn.close()
-        result = []
-        for t in trackers_list:
-            result.append({
-                "id": t[0], "url": t[1], "productName": t[2] or "Product",
-                "currentPrice": t[3], "targetPrice": t[4],
-                "currency": t[5], "currencySymbol": t[6], "createdAt": t[7]
-            })
-        return jsonify(result)
+
+# ==================== BULK TRACKER API ROUTES ====================
+
+BULK_TRACKER_LIMIT = 1000
+TRACKER_CSV_FIELDS = ['url', 'productName', 'currentPrice', 'targetPrice', 'currency', 'currencySymbol']
+
+def parse_bulk_trackers():
+    """Read a list of trackers from a JSON array, {"trackers": [...]}, or a CSV body/upload"""
+    upload = request.files.get('file')
+    if upload:
+        text = upload.read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if request.mimetype in ('text/csv', 'text/plain'):
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('trackers')
+    return data if isinstance(data, list) else None
+
+def to_price(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return parse_price(str(value))
+
+@app.route('/api/dashboard/summary', methods=['GET'])
+def dashboard_summary():
+    """Dashboard header counts, read from the trigger-maintained dashboard_stats rows"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    target = request.args.get('currency', DISPLAY_CURRENCY).upper()
+    table = rate_table()
+    if table is not None and target not in table:
+        return jsonify({"error": "Unknown currency: " + target}), 400
+    conn = connect_db()
+    rows = conn.execute("""
+        SELECT currency, trackers, reached, savings FROM dashboard_stats
+        WHERE user_id = ? AND trackers > 0 ORDER BY trackers DESC
+    """, (session['user_id'],)).fetchall()
+    conn.close()
+    total = sum(row[1] for row in rows)
+    reached = sum(row[2] for row in rows)
+    converted = None
+    if table is not None:
+        amounts = table.convert([row[3] for row in rows], [row[0] for row in rows], target)
+        known = ~np.isnan(amounts)
+        converted = {
+            "currency": target,
+            "amount": round(float(amounts[known].sum()), 2),
+            "asOf": table.as_of,
+            # Savings in currencies without a rate stay listed under "savings" only
+            "unconverted": [row[0] or None for row, ok in zip(rows, known) if not ok],
+        }
+    return jsonify({
+        "totalTrackers": total,
+        "active": total - reached,
+        "reached": reached,
+        "savings": [{"currency": currency or None, "trackers": count, "reached": hits, "amount": round(savings, 2)}
+                    for currency, count, hits, savings in rows],
+        "totalSavings": converted,
+    })
+
+@app.route('/api/fx/rates', methods=['GET'])
+def fx_rates_endpoint():
+    """The rate table the server converts with, for the dashboard to convert the same way"""
+    table = rate_table()
+    if table is None:
+        return jsonify({"error": "Exchange rates are unavailable"}), 503
+    response = jsonify(table.to_dict())
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_TERMS = 8
+# sort key -> (ORDER BY expression, default direction); amounts in CONVERTED_SORTS are compared
+# across currencies by normalizing them with the FX rates first
+SEARCH_SORTS = {
+    'date': ("t.created_at", 'DESC'),
+    'name': ("LOWER(COALESCE(p.product_name, ''))", 'ASC'),
+    'price': ("p.current_price", 'ASC'),
+    'target': ("t.target_price", 'ASC'),
+    'savings': ("t.target_price - p.current_price", 'DESC'),
+}
+CONVERTED_SORTS = {'price', 'target', 'savings'}
+SEARCH_STATUSES = {
+    'all': None,
+    # A product not priced yet is still being watched, as the dashboard's reached count has it
+    'active': "(p.current_price IS NULL OR p.current_price > t.target_price)",
+    'reached': "p.current_price <= t.target_price",
+}
+
+@app.route('/api/trackers/search', methods=['GET'])
+def search_trackers():
+    """One page of the user's trackers matching a prefix query over product name, URL and site"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    status = request.args.get('status', 'all')
+    sort = request.args.get('sort', 'date')
+    if status not in SEARCH_STATUSES or sort not in SEARCH_SORTS:
+        return jsonify({"error": "status must be one of " + ', '.join(SEARCH_STATUSES) +
+                                 "; sort must be one of " + ', '.join(SEARCH_SORTS)}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    order_by, direction = SEARCH_SORTS[sort]
+    if request.args.get('order', '').lower() in ('asc', 'desc'):
+        direction = request.args['order'].upper()
+    table = rate_table()
+    currency = request.args.get('currency', '').upper()
+    if currency and (table is None or currency not in table):
+        return jsonify({"error": "Unknown currency: " + currency}), 400
+    order_params = []
+    if sort in CONVERTED_SORTS and table is not None:
+        order_by, order_params = normalized_price_sql(order_by, table)
     
-    if request.method == 'POST':
-        data = request.json
-        cursor.execute("""
-            INSERT INTO trackers (user_id, url, product_name, current_price, target_price, currency, currency_symbol)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (session['user_id'], data.get('url'), data.get('productName'), 
-              data.get('currentPrice'), data.get('targetPrice'), 
-              data.get('currency', 'USD'), data.get('currencySymbol', '$')))
-        tracker_id = cursor.lastrowid
+    conditions, params = ["t.user_id = ?"], [session['user_id']]
+    terms = re.findall(r'[^\W_]+', request.args.get('q', '').lower())[:SEARCH_MAX_TERMS]
+    if terms:
+        match, match_params = storage.product_match(terms)
+        conditions.append(match)
+        params.extend(match_params)
+    if SEARCH_STATUSES[status]:
+        conditions.append(SEARCH_STATUSES[status])
+    where = " WHERE " + " AND ".join(conditions)
+    
+    conn = connect_db()
+    total = conn.execute("SELECT COUNT(*) FROM trackers t JOIN products p ON p.id = t.product_id" + where,
+                         params).fetchone()[0]
+    rows = conn.execute(TRACKER_SELECT_SQL + where + f" ORDER BY {order_by} {direction}, t.id {direction} LIMIT ? OFFSET ?",
+                        params + order_params + [limit, offset]).fetchall()
+    conn.close()
+    results = [{
+        "id": t[0], "url": t[1], "productName": t[2] or "Product",
+        "currentPrice": t[3], "targetPrice": t[4],
+        "currency": t[5], "currencySymbol": t[6], "createdAt": t[7]
+    } for t in rows]
+    if currency and rows:
+        # Prices side by side in one currency, so the same product on different retailers compares directly
+        currencies = [t[5] for t in rows]
+        prices = table.convert([np.nan if t[3] is None else t[3] for t in rows], currencies, currency)
+        targets = table.convert([t[4] for t in rows], currencies, currency)
+        for result, price, target_price in zip(results, prices.tolist(), targets.tolist()):
+            result["convertedPrice"] = None if np.isnan(price) else round(price, 2)
+            result["convertedTarget"] = None if np.isnan(target_price) else round(target_price, 2)
+            result["convertedCurrency"] = currency
+    return jsonify({
+        "trackers": results,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    })
+
+@app.route('/api/trackers/bulk', methods=['POST', 'DELETE'])
+def trackers_bulk():
+    """Create or delete many trackers in a single transaction"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    user_id = session['user_id']
+    
+    if request.method == 'DELETE':
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids') or []
+        urls = data.get('urls') or []
+        if not isinstance(ids, list) or not isinstance(urls, list):
+            return jsonify({"error": "ids and urls must be lists"}), 400
+        conn = connect_db()
+        cursor = conn.cursor()
+        deleted = 0
+        canonical_urls = list({canonicalize_url(u) for u in urls if isinstance(u, str)})
+        for start in range(0, max(len(ids), len(canonical_urls)), 500):
+            id_chunk, url_chunk = ids[start:start + 500], canonical_urls[start:start + 500]
+            if id_chunk:
+                cursor.execute(f"DELETE FROM trackers WHERE user_id = ? AND id IN ({','.join('?' * len(id_chunk))})",
+                               [user_id] + id_chunk)
+                deleted += cursor.rowcount
+            if url_chunk:
+                cursor.execute(f"""
+                    DELETE FROM trackers WHERE user_id = ? AND product_id IN (
+                        SELECT id FROM products WHERE canonical_url IN ({','.join('?' * len(url_chunk))})
+                    )
+                """, [user_id] + url_chunk)
+                deleted += cursor.rowcount
         conn.commit()
         conn.close()
-        return jsonify({"id": tracker_id, "message": "Tracker created"}), 201
+        return jsonify({"deleted": deleted, "message": "Trackers deleted"})
     
-    if request.method == 'DELETE':
-        data = request.json
-        tracker_id = data.get('id')
-        cursor.execute("DELETE FROM trackers WHERE id = ? AND user_id = ?", (tracker_id, session['user_id']))
+    items = parse_bulk_trackers()
+    if items is None:
+        return jsonify({"error": "Expected a JSON list of trackers or a CSV file"}), 400
+    if len(items) > BULK_TRACKER_LIMIT:
+        return jsonify({"error": f"At most {BULK_TRACKER_LIMIT} trackers per request"}), 413
+    
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.canonical_url FROM trackers t JOIN products p ON p.id = t.product_id
+            WHERE t.user_id = ?
+        """, (user_id,))
+        seen = {row[0] for row in cursor.fetchall()}
+        
+        products = []
+        targets = {}
+        skipped = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                skipped.append({"index": index, "reason": "Invalid tracker"})
+                continue
+            url = (item.get('url') or '').strip()
+            target_price = to_price(item.get('targetPrice'))
+            if not url or target_price is None:
+                skipped.append({"index": index, "url": url, "reason": "url and targetPrice are required"})
+                continue
+            params = product_params(url, item.get('productName'), to_price(item.get('currentPrice')),
+                                    item.get('currency'), item.get('currencySymbol'))
+            canonical = params[0]
+            if canonical in seen:
+                skipped.append({"index": index, "url": url, "reason": "Duplicate URL"})
+                continue
+            seen.add(canonical)
+            products.append(params)
+            targets[canonical] = target_price
+        
+        canonical_urls = list(targets)
+        # Like the single create, a supplied price only seeds a product that has none yet
+        priced = set()
+        for start in range(0, len(canonical_urls), 500):
+            chunk = canonical_urls[start:start + 500]
+            cursor.execute(f"""
+                SELECT canonical_url FROM products
+                WHERE current_price IS NOT NULL AND canonical_url IN ({','.join('?' * len(chunk))})
+            """, chunk)
+            priced.update(row[0] for row in cursor.fetchall())
+        cursor.executemany(PRODUCT_UPSERT_SQL, products)
+        record_price_observations(cursor, 'canonical_url', [(params[0], params[3]) for params in products
+                                                             if params[3] is not None and params[0] not in priced])
+        product_rows = []
+        for start in range(0, len(canonical_urls), 500):
+            chunk = canonical_urls[start:start + 500]
+            cursor.execute(f"""
+                SELECT id, canonical_url, last_checked FROM products
+                WHERE canonical_url IN ({','.join('?' * len(chunk))})
+            """, chunk)
+            product_rows.extend(cursor.fetchall())
+        created = []
+        for product_id, canonical, _ in product_rows:
+            cursor.execute("INSERT INTO trackers (user_id, product_id, target_price) VALUES (?, ?, ?)",
+                           (user_id, product_id, targets[canonical]))
+            created.append(cursor.lastrowid)
         conn.commit()
+    finally:
         conn.close()
-        return jsonify({"message": "Tracker deleted"})
+    
+    # Fetch initial prices only for products nobody has priced yet, without holding up the response
+    to_fetch = [(product_id, canonical) for product_id, canonical, last_checked in product_rows
+                if last_checked is None and canonical.startswith(('http://', 'https://'))]
+    if to_fetch:
+        try:
+            enqueue_price_refreshes(to_fetch)
+        except sqlite3.Error as e:
+            # The trackers are saved; the scheduler or the next dashboard refresh will price them
+            log.warning("Could not queue price refreshes", extra={"error": str(e), "products": len(to_fetch)})
+    
+    return jsonify({
+        "created": len(created),
+        "ids": created,
+        "skipped": skipped,
+        "message": f"{len(created)} trackers created"
+    }), 201
+
+@app.route('/api/trackers/export', methods=['GET'])
+def trackers_export():
+    """Export the user's trackers as JSON or CSV"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    
+    conn = connect_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.canonical_url, p.product_name, p.current_price, t.target_price, p.currency, p.currency_symbol
+        FROM trackers t JOIN products p ON p.id = t.product_id
+        WHERE t.user_id = ? ORDER BY t.created_at DESC
+    """, (session['user_id'],))
+    rows = cursor.fetchall()
+    conn.close()
+    
+    if request.args.get('format', 'json').lower() == 'csv':
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(TRACKER_CSV_FIELDS)
+        writer.writerows(rows)
+        response = make_response(output.getvalue())
+        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+        response.headers['Content-Disposition'] = 'attachment; filename=trackers.csv'
+        return response
+    
+    return jsonify([dict(zip(TRACKER_CSV_FIELDS, row)) for row in rows])
 
 # ==================== PASSWORD RESET API ROUTES ====================
 
 @app.route('/api/forgot-password', methods=['POST'])
+@rate_limit(5, per=60)
+@rate_limit(20, per=3600)
 def api_forgot_password():
     """API endpoint for forgot password - handles JSON requests"""
     data = request.get_json()
@@ -757,7 +3059,7 @@ def api_forgot_password():
     if not email:
         return jsonify({"error": "Email is required"}), 400
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
@@ -766,7 +3068,7 @@ def api_forgot_password():
     if user:
         reset_token = secrets.token_urlsafe(32)
         expiry = datetime.now() + timedelta(minutes=30)
-        conn = sqlite3.connect(DATABASE)
+        conn = connect_db()
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR REPLACE INTO password_resets (user_id, reset_token, reset_token_expiry)
@@ -795,7 +3097,7 @@ def api_reset_password():
     if not password or len(password) < 6:
         return jsonify({"error": "Password must be at least 6 characters"}), 400
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT user_id, reset_token_expiry FROM password_resets WHERE reset_token = ?", (token,))
     reset_record = cursor.fetchone()
@@ -810,7 +3112,7 @@ def api_reset_password():
         return jsonify({"error": "Reset link has expired"}), 400
     
     user_id = reset_record[0]
-    hashed = generate_password_hash(password)
+    hashed = hash_password(password)
     cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hashed, user_id))
     cursor.execute("DELETE FROM password_resets WHERE user_id = ?", (user_id,))
     conn.commit()
@@ -829,7 +3131,7 @@ def api_check_email():
     if not email:
         return jsonify({"error": "Email is required"}), 400
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
@@ -841,6 +3143,8 @@ def api_check_email():
         return jsonify({"exists": False, "email": email}), 200
 
 @app.route('/api/direct-reset-password', methods=['POST'])
+@rate_limit(5, per=60)
+@rate_limit(20, per=3600)
 def api_direct_reset_password():
     """API endpoint for direct password reset without token"""
     data = request.get_json()
@@ -856,7 +3160,7 @@ def api_direct_reset_password():
     if not password or len(password) < 6:
         return jsonify({"error": "Password must be at least 6 characters"}), 400
     
-    conn = sqlite3.connect(DATABASE)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
@@ -866,7 +3170,7 @@ def api_direct_reset_password():
         return jsonify({"error": "User not found"}), 404
     
     user_id = user[0]
-    hashed = generate_password_hash(password)
+    hashed = hash_password(password)
     cursor.execute("UPDATE users SET password = ? WHERE id = ?", (hashed, user_id))
     conn.commit()
     conn.close()
@@ -884,168 +3188,527 @@ def parse_price(price_str):
     except ValueError:
         return None
 
+# Query parameters that only carry affiliate/campaign/session state
+TRACKING_PARAMS = {
+    'tag', 'ref', 'ref_', 'psc', 'smid', 'th', 'linkcode', 'linkid', 'camp', 'creative',
+    'creativeasin', 'ascsubtag', 'keywords', 'qid', 'sr', 'sprefix', 'crid', 'dib', 'dib_tag',
+    'content-id', 'lid', 'marketplace', 'store', 'srno', 'otracker', 'otracker1', 'iid',
+    'ssid', 'qh', 'affid', 'affextparam1', 'affextparam2', 'cmpid', 'fm', 'ppt', 'ppn',
+    'gclid', 'fbclid', 'msclkid', 'src', 'source', 'spm'
+}
+TRACKING_PARAM_PREFIXES = ('utm_', 'pf_rd_', 'pd_rd_')
+AMAZON_ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([a-z0-9]{10})(?:[/?]|$)', re.IGNORECASE)
+FLIPKART_ITEM_PATTERN = re.compile(r'/p/(itm[a-z0-9]+)', re.IGNORECASE)
+
+def canonicalize_url(url):
+    """Reduce a product URL to one canonical form so every user tracking it shares a product row"""
+    url = (url or '').strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return url
+    host = parsed.hostname.lower()
+    
+    # Amazon: https://www.amazon.<tld>/dp/<ASIN>
+    if 'amazon.' in host:
+        match = AMAZON_ASIN_PATTERN.search(parsed.path + '/')
+        if match:
+            domain = host[host.index('amazon.'):]
+            return f"https://www.{domain}/dp/{match.group(1).upper()}"
+    
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)]
+    
+    # Flipkart: the pid identifies the product; the slug before /p/ is cosmetic
+    if 'flipkart.com' in host:
+        pid = next((value for key, value in query if key == 'pid'), None)
+        item = FLIPKART_ITEM_PATTERN.search(parsed.path)
+        if pid:
+            path = f"/product/p/{item.group(1).lower()}" if item else parsed.path.rstrip('/')
+            return f"https://www.flipkart.com{path}?pid={pid.upper()}"
+    
+    path = parsed.path.rstrip('/') or '/'
+    return urlunparse(('https', host, path, '', urlencode(sorted(query)), ''))
+
 def get_site_info(url):
-    url_lower = url.lower()
-    if 'amazon' in url_lower:
-        if 'amazon.in' in url_lower:
+    host = (urlparse(url).hostname or '').lower() or url.lower()
+    if 'amazon' in host:
+        if 'amazon.in' in host:
             return 'amazon', 'INR', '₹'
-        elif 'amazon.co.uk' in url_lower:
+        elif 'amazon.co.uk' in host:
             return 'amazon', 'GBP', '£'
         else:
             return 'amazon', 'USD', '$'
-    elif 'flipkart' in url_lower:
+    elif 'flipkart' in host:
         return 'flipkart', 'INR', '₹'
-    elif 'myntra' in url_lower:
+    elif 'myntra' in host:
         return 'myntra', 'INR', '₹'
-    elif 'ajio' in url_lower:
+    elif 'ajio' in host:
         return 'ajio', 'INR', '₹'
-    elif 'meesho' in url_lower:
+    elif 'meesho' in host:
         return 'meesho', 'INR', '₹'
-    elif 'snapdeal' in url_lower:
+    elif 'snapdeal' in host:
         return 'snapdeal', 'INR', '₹'
     else:
         return 'unknown', 'USD', '$'
 
-def scrape_price(soup, site, currency_symbol):
-    """Generic price scraper - improved to handle more cases"""
-    
-    # Try multiple selectors for Amazon
-    if site == 'amazon':
-        # Try new Amazon price structure
-        price_elem = soup.find("span", {"class": "a-price"})
-        if price_elem:
-            whole = price_elem.find("span", {"class": "a-price-whole"})
-            if whole:
-                price = parse_price(whole.get_text())
-                if price:
-                    return price
-        
-        # Try alternative Amazon selectors
-        price_elem = soup.select_one('.a-price-whole')
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
-        
-        # Try product price ID
-        price_elem = soup.find("span", {"id": "priceblock_ourprice"})
+PRODUCT_UPSERT_SQL = """
+    INSERT INTO products (canonical_url, site, product_name, current_price, currency, currency_symbol, last_checked)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(canonical_url) DO UPDATE SET
+        product_name = COALESCE(products.product_name, excluded.product_name),
+        current_price = COALESCE(products.current_price, excluded.current_price),
+        currency = COALESCE(products.currency, excluded.currency),
+        currency_symbol = COALESCE(products.currency_symbol, excluded.currency_symbol),
+        last_checked = COALESCE(products.last_checked, excluded.last_checked)
+"""
+# The product row is shared by every user tracking the URL: a client-supplied price only seeds a
+# product that has none yet, after that only scrapes (update_product_prices, /get-price) move it
+
+def product_params(url, product_name=None, price=None, currency=None, currency_symbol=None):
+    """Build PRODUCT_UPSERT_SQL parameters for a URL, filling currency from the site"""
+    canonical = canonicalize_url(url)
+    site, default_currency, default_symbol = get_site_info(canonical)
+    last_checked = datetime.now().isoformat(sep=' ', timespec='seconds') if price is not None else None
+    return (canonical, site, product_name, price, currency or default_currency,
+            currency_symbol or default_symbol, last_checked)
+
+def upsert_product(cursor, url, product_name=None, price=None, currency=None, currency_symbol=None):
+    """Insert or fill in the shared product row for a URL; returns (product id, whether `price` was stored)"""
+    params = product_params(url, product_name, price, currency, currency_symbol)
+    cursor.execute("SELECT current_price FROM products WHERE canonical_url = ?", (params[0],))
+    existing = cursor.fetchone()
+    cursor.execute(PRODUCT_UPSERT_SQL, params)
+    cursor.execute("SELECT id FROM products WHERE canonical_url = ?", (params[0],))
+    return cursor.fetchone()[0], price is not None and (existing is None or existing[0] is None)
+
+RUPEE_TEXT = re.compile(r'₹\s*[\d,]+')
+RUPEE_AMOUNT = re.compile(r'₹\s*([\d,]+\.?\d*)')
+RUPEE_TEXT_COMPACT = re.compile(r'₹[\d,]+')
+RUPEE_AMOUNT_COMPACT = re.compile(r'₹([\d,]+)')
+RUPEE_AMOUNT_INTEGER = re.compile(r'₹\s*([\d,]+)')
+DOLLAR_TEXT = re.compile(r'\$\s*[\d,]+\.?\d*')
+DOLLAR_AMOUNT = re.compile(r'\$\s*([\d,]+\.?\d*)')
+
+def element_price(name, attrs, minimum=None):
+    """Extractor: price text of the first matching element"""
+    def extract(soup):
+        price_elem = soup.find(name, attrs)
         if price_elem:
             price = parse_price(price_elem.get_text())
-            if price:
+            if price and (minimum is None or price > minimum):
                 return price
-        
-        # Try deal price
-        price_elem = soup.find("span", {"class": "a-price-whole"})
+        return None
+    return extract
+
+def selector_price(css):
+    def extract(soup):
+        price_elem = soup.select_one(css)
         if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
-        
-        # Try to find any element with price text
-        price_elem = soup.find(string=re.compile(r'₹\s*[\d,]+'))
+            return parse_price(price_elem.get_text()) or None
+        return None
+    return extract
+
+def text_price(text_pattern, amount_pattern, low, high):
+    """Extractor: first in-range amount in the first text node matching text_pattern"""
+    def extract(soup):
+        price_elem = soup.find(string=text_pattern)
         if price_elem:
-            nums = re.findall(r'₹\s*([\d,]+\.?\d*)', price_elem)
-            for match in nums:
+            for match in amount_pattern.findall(price_elem):
                 price = parse_price(match.replace(',', ''))
-                if price and 50 < price < 100000:
+                if price and low < price < high:
                     return price
+        return None
+    return extract
+
+def amazon_price_block(soup):
+    # Try new Amazon price structure
+    price_elem = soup.find("span", {"class": "a-price"})
+    if price_elem:
+        whole = price_elem.find("span", {"class": "a-price-whole"})
+        if whole:
+            return parse_price(whole.get_text()) or None
+    return None
+
+def full_text_max_price(soup):
+    # Last resort: search all text for valid price; the highest is usually the current price
+    valid_prices = []
+    for p in RUPEE_AMOUNT_INTEGER.findall(soup.get_text()):
+        price_val = parse_price(p.replace(',', ''))
+        if price_val and 100 < price_val < 100000:  # Valid clothing price range
+            valid_prices.append(price_val)
+    return max(valid_prices) if valid_prices else None
+
+# Ordered (selector name, extractor) pairs per site; names are the labels reported by scraper telemetry
+SITE_EXTRACTORS = {
+    'amazon': [
+        ('span.a-price span.a-price-whole', amazon_price_block),
+        ('.a-price-whole', selector_price('.a-price-whole')),
+        ('span#priceblock_ourprice', element_price("span", {"id": "priceblock_ourprice"})),
+        ('span.a-price-whole', element_price("span", {"class": "a-price-whole"})),
+        ('text:₹', text_price(RUPEE_TEXT, RUPEE_AMOUNT, 50, 100000)),
+    ],
+    'flipkart': [
+        ('div._30jeq3', element_price("div", {"class": "_30jeq3"}, minimum=10)),
+        ('div.Nx9bqj', element_price("div", {"class": "Nx9bqj"}, minimum=10)),
+        ('div[data-id=price]', element_price("div", {"data-id": "price"}, minimum=10)),
+        ('text:₹', text_price(RUPEE_TEXT_COMPACT, RUPEE_AMOUNT_COMPACT, 100, 100000)),
+        ('fulltext:₹max', full_text_max_price),
+    ],
+    'myntra': [('span.pdp-price', element_price("span", {"class": "pdp-price"}))],
+    'ajio': [('span.prod-price', element_price("span", {"class": "prod-price"}))],
+    'meesho': [('h3.Sc-product-price', element_price("h3", {"class": "Sc-product-price"}))],
+    'snapdeal': [('span.product-price', element_price("span", {"class": "product-price"}))],
+}
+
+# Tried for every site once its own selectors miss
+FALLBACK_EXTRACTORS = [
+    ('fallback:₹', text_price(RUPEE_TEXT, RUPEE_AMOUNT, 50, 100000)),
+    ('fallback:$', text_price(DOLLAR_TEXT, DOLLAR_AMOUNT, 1, 10000)),
+]
+
+def record_selector(site, selector, hit, seconds):
+    labels = (('site', site), ('selector', selector))
+    inc_counter('price_alerter_scrape_selector_attempts_total', labels)
+    if hit:
+        inc_counter('price_alerter_scrape_selector_hits_total', labels)
+    observe('price_alerter_scrape_selector_duration_seconds', labels, seconds)
+
+def record_extraction(site, selector):
+    """Count which selector produced the final price for a page ('none' if nothing did)"""
+    inc_counter('price_alerter_scrape_extractions_total', (('site', site), ('selector', selector)))
+
+def scrape_price(soup, site, currency_symbol, telemetry=True):
+    """Generic price scraper - tries the site's selectors in order, then the generic fallbacks"""
+    for selector, extract in SITE_EXTRACTORS.get(site, []) + FALLBACK_EXTRACTORS:
+        started = time.perf_counter()
+        price = extract(soup)
+        if telemetry:
+            record_selector(site, selector, price is not None, time.perf_counter() - started)
+        if price is not None:
+            if telemetry:
+                record_extraction(site, selector)
+            return price
+    return None
+
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0"
+}
+
+def extract_product_info(url, content, encoding=None, deadline=None):
+    """Parse a downloaded product page and extract price, currency and name.
+
+    Returns a (payload, status_code) tuple; payload carries an "error" key on failure.
+    Raises DeadlineExceeded if the perf_counter() deadline passes before the slow full-text fallback.
+    """
+    check_deadline(deadline)
+    started = time.perf_counter()
+    soup = BeautifulSoup(content, "html.parser")
+    parsed = time.perf_counter()
+    observe('price_alerter_scrape_phase_duration_seconds', (('phase', 'parse'),), parsed - started)
     
-    # Flipkart - improved selectors for current website structure
-    if site == 'flipkart':
-        # Try the main price class (current Flipkart structure)
-        price_elem = soup.find("div", {"class": "_30jeq3"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price and price > 10:  # Filter out invalid prices
-                return price
-        
-        # Try alternative Flipkart selectors
-        price_elem = soup.find("div", {"class": "Nx9bqj"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price and price > 10:
-                return price
-        
-        # Try data attributes
-        price_elem = soup.find("div", {"data-id": "price"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price and price > 10:
-                return price
-        
-        # Try finding by style or other attributes
-        price_elem = soup.find(string=re.compile(r'₹[\d,]+'))
-        if price_elem:
-            nums = re.findall(r'₹([\d,]+)', price_elem)
-            for match in nums:
-                price = parse_price(match.replace(',', ''))
-                if price and 100 < price < 100000:  # More specific range for Flipkart
-                    return price
+    site, currency, currency_symbol = get_site_info(url)
+    price = scrape_price(soup, site, currency_symbol)
+    
+    # Try to get product name from title
+    product_name = "Product"
+    if soup.title:
+        title = soup.title.get_text().strip()
+        product_name = re.sub(r'\s*[-|]\s*(Amazon|Flipkart|Myntra|Ajio|Meesho|Snapdeal)\s*$', '', title, flags=re.IGNORECASE).strip()
+    
+    if price is None:
+        check_deadline(deadline)
+        # Last resort: try to find any price-like pattern in the entire HTML
+        fallback_started = time.perf_counter()
+        html_text = content.decode(encoding or 'utf-8', errors='replace') if isinstance(content, bytes) else content
+        # Try to find any currency pattern
+        price_patterns = [
+            r'₹\s*([\d,]+\.?\d*)',
+            r'INR\s*([\d,]+\.?\d*)',
+            r'\$\s*([\d,]+\.?\d*)',
+            r'USD\s*([\d,]+\.?\d*)',
+            r'£\s*([\d,]+\.?\d*)',
+            r'GBP\s*([\d,]+\.?\d*)'
+        ]
+        for pattern in price_patterns:
+            for match in re.findall(pattern, html_text):
+                candidate = parse_price(match.replace(',', ''))
+                if candidate and 50 < candidate < 100000:
+                    price = candidate
+                    break
+            if price is not None:
+                break
+        record_selector(site, 'html:regex', price is not None, time.perf_counter() - fallback_started)
+        record_extraction(site, 'html:regex' if price is not None else 'none')
+    observe('price_alerter_scrape_phase_duration_seconds', (('phase', 'extract'),), time.perf_counter() - parsed)
+    
+    if price is None:
+        scrape_log.warning("No price found", extra={"url": url, "site": site})
+        return {"error": "Could not find price on this page. The website structure may have changed."}, 404
+    
+    scrape_log.info("Price extracted", extra={"url": url, "site": site, "price": price,
+                                              "durationMs": round((time.perf_counter() - started) * 1000, 2)})
+    return {
+        "price": price, "currency": currency, 
+        "currency_symbol": currency_symbol, "productName": product_name
+    }, 200
+
+SCRAPE_TIMEOUT = 10  # seconds a background refresh may spend on one page
+SCRAPE_CONNECT_TIMEOUT = 3.05  # seconds to open the connection; just over a multiple of TCP's 3 s retransmit
+SCRAPE_READ_TIMEOUT = 5  # seconds the server may go quiet, waiting for the headers or between chunks
+SCRAPE_DEADLINE = float(os.environ.get('SCRAPE_DEADLINE', 8))  # seconds /get-price may take, fetch and parse included
+SCRAPE_HEDGE = os.environ.get('SCRAPE_HEDGE', 'true').lower() == 'true'  # race a second request against a slow first
+SCRAPE_HEDGE_PERCENTILE = 95  # a fetch slower than this percentile of the site's recent fetches gets a hedge
+SCRAPE_HEDGE_DEFAULT_DELAY = 2.0  # seconds, until a site has SCRAPE_HEDGE_MIN_SAMPLES fetches on record
+SCRAPE_HEDGE_MIN_DELAY = 0.25
+SCRAPE_HEDGE_MIN_SAMPLES = 20
+SCRAPE_HEDGE_BUDGET = 0.1  # at most this share of recent fetches is hedged, so a struggling site isn't sent double
+STALE_PRICE_MARGIN = 0.5  # seconds before the deadline /get-price answers with the last stored price instead
+SCRAPE_CHUNK_SIZE = 64 * 1024
+SCRAPE_POOL_WORKERS = 32
+
+class DeadlineExceeded(Exception):
+    pass
+
+class FetchCancelled(Exception):
+    pass
+
+def check_deadline(deadline, cancelled=None):
+    if cancelled is not None and cancelled.is_set():
+        raise FetchCancelled()
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise DeadlineExceeded()
+
+def read_body(response, deadline, cancelled=None):
+    """Download a streamed response a chunk at a time, stopping at the deadline or on cancellation"""
+    chunks = []
+    try:
+        for chunk in response.iter_content(SCRAPE_CHUNK_SIZE):
+            check_deadline(deadline, cancelled)
+            chunks.append(chunk)
+    finally:
+        response.close()
+    return b''.join(chunks)
+
+def fetch_product_price(url, deadline=None, cancelled=None):
+    """Fetch a product page and extract its price.
+
+    deadline is a time.perf_counter() value (default SCRAPE_TIMEOUT from now) that bounds the
+    connect, download and parse stages; setting the cancelled event stops the fetch early.
+    Returns a (payload, status_code) tuple; payload carries an "error" key on failure.
+    """
+    if deadline is None:
+        deadline = time.perf_counter() + SCRAPE_TIMEOUT
+    try:
+        check_deadline(deadline, cancelled)
+        # Enhanced headers to avoid being blocked; stream so connect and download are timed separately
+        started = time.perf_counter()
+        remaining = deadline - started
+        response = requests.get(url, headers=SCRAPE_HEADERS, stream=True,
+                                timeout=(min(SCRAPE_CONNECT_TIMEOUT, remaining), min(SCRAPE_READ_TIMEOUT, remaining)))
+        fetched = time.perf_counter()
+        observe('price_alerter_scrape_phase_duration_seconds', (('phase', 'connect'),), fetched - started)
+        if response.status_code != 200:
+            response.close()
+            scrape_log.warning("Product page fetch failed", extra={"url": url, "status": response.status_code})
+            return {"error": f"Failed to fetch page (Status: {response.status_code})"}, response.status_code
         
-        # Last resort: search all text for valid price
-        all_text = soup.get_text()
-        prices = re.findall(r'₹\s*([\d,]+)', all_text)
-        valid_prices = []
-        for p in prices:
-            price_val = parse_price(p.replace(',', ''))
-            if price_val and 100 < price_val < 100000:  # Valid clothing price range
-                valid_prices.append(price_val)
-        if valid_prices:
-            return max(valid_prices)  # Return highest price (usually current price)
-    
-    # Try multiple selectors for Myntra
-    if site == 'myntra':
-        price_elem = soup.find("span", {"class": "pdp-price"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
+        content = read_body(response, deadline, cancelled)
+        observe('price_alerter_scrape_phase_duration_seconds', (('phase', 'download'),), time.perf_counter() - fetched)
+        check_deadline(deadline, cancelled)
+        return extract_product_info(url, content, response.encoding, deadline)
+    except (requests.exceptions.Timeout, DeadlineExceeded):
+        scrape_log.warning("Product page timed out", extra={"url": url})
+        return {"error": "Request timed out. Please try again."}, 504
+    except FetchCancelled:
+        return {"error": "Fetch cancelled"}, 499
+    except requests.exceptions.ConnectionError as e:
+        scrape_log.warning("Could not connect to product page", extra={"url": url, "error": str(e)})
+        return {"error": "Could not connect to the website. Please check the URL."}, 502
+    except Exception as e:
+        scrape_log.exception("Scrape error", extra={"url": url})
+        return {"error": f"Error: {str(e)}"}, 500
+
+class FetchLatencies:
+    """Recent successful fetch times per site, and which recent fetches were hedged"""
     
-    # Try multiple selectors for Ajio
-    if site == 'ajio':
-        price_elem = soup.find("span", {"class": "prod-price"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
+    WINDOW = 200
     
-    # Try multiple selectors for Meesho
-    if site == 'meesho':
-        price_elem = soup.find("h3", {"class": "Sc-product-price"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # site -> deque of seconds
+        self.hedged = collections.deque(maxlen=self.WINDOW)
     
-    # Try multiple selectors for Snapdeal
-    if site == 'snapdeal':
-        price_elem = soup.find("span", {"class": "product-price"})
-        if price_elem:
-            price = parse_price(price_elem.get_text())
-            if price:
-                return price
+    def record(self, site, seconds):
+        with self.lock:
+            self.samples.setdefault(site, collections.deque(maxlen=self.WINDOW)).append(seconds)
     
-    # Fallback: search for currency symbol anywhere in the page
-    price_elem = soup.find(string=re.compile(r'₹\s*[\d,]+'))
-    if price_elem:
-        nums = re.findall(r'₹\s*([\d,]+\.?\d*)', price_elem)
-        for match in nums:
-            price = parse_price(match.replace(',', ''))
-            if price and 50 < price < 100000:
-                return price
+    def hedge_delay(self, site):
+        """Seconds to wait on a fetch before hedging it: the site's SCRAPE_HEDGE_PERCENTILE fetch time"""
+        with self.lock:
+            samples = sorted(self.samples.get(site, ()))
+        if len(samples) < SCRAPE_HEDGE_MIN_SAMPLES:
+            return SCRAPE_HEDGE_DEFAULT_DELAY
+        index = min(len(samples) - 1, int(len(samples) * SCRAPE_HEDGE_PERCENTILE / 100))
+        return max(SCRAPE_HEDGE_MIN_DELAY, samples[index])
     
-    # Try for $ symbol (USD/GBP)
-    price_elem = soup.find(string=re.compile(r'\$\s*[\d,]+\.?\d*'))
-    if price_elem:
-        nums = re.findall(r'\$\s*([\d,]+\.?\d*)', price_elem)
-        for match in nums:
-            price = parse_price(match.replace(',', ''))
-            if price and 1 < price < 10000:
-                return price
+    def note_fetch(self, hedged):
+        with self.lock:
+            self.hedged.append(hedged)
     
-    return None
+    def hedge_allowed(self):
+        with self.lock:
+            return sum(self.hedged) < SCRAPE_HEDGE_BUDGET * max(len(self.hedged), 1 / SCRAPE_HEDGE_BUDGET)
+
+fetch_latencies = FetchLatencies()
+scrape_pool = ThreadPoolExecutor(max_workers=SCRAPE_POOL_WORKERS, thread_name_prefix='scrape')
+
+class HedgedFetch:
+    """fetch_product_price() for one URL, with a second request racing the first once it is slower than usual.
+
+    The first attempt to succeed wins and the other is cancelled; if every attempt fails, the last
+    error is the result. wait() can return before that, and the fetch keeps going until its deadline.
+    """
+    
+    def __init__(self, url, deadline):
+        self.url = url
+        self.deadline = deadline
+        self.site = get_site_info(url)[0]
+        self.attempts = {}  # future -> (kind, started, cancelled event)
+        self.result = None
+        self.hedge_at = time.perf_counter() + fetch_latencies.hedge_delay(self.site)
+        self.hedge_considered = not SCRAPE_HEDGE
+        self.lock = threading.Lock()
+        self.late_callbacks = []
+        self.launch('primary')
+    
+    def launch(self, kind):
+        cancelled = threading.Event()
+        with self.lock:
+            future = scrape_pool.submit(with_request_id(fetch_product_price), self.url, self.deadline, cancelled)
+            self.attempts[future] = (kind, time.perf_counter(), cancelled)
+        future.add_done_callback(self.attempt_done)
+    
+    def attempt_done(self, future):
+        payload, status = future.result()
+        with self.lock:
+            kind, started, _ = self.attempts[future]
+            others = [attempt for other, attempt in self.attempts.items() if other is not future]
+            if self.result is not None:
+                return
+            if status == 200:
+                fetch_latencies.record(self.site, time.perf_counter() - started)
+            elif any(not other.done() for other in self.attempts if other is not future):
+                return
+            self.result = (payload, status)
+            callbacks = self.late_callbacks
+        for _, _, cancelled in others:
+            cancelled.set()
+        if others:
+            inc_counter('price_alerter_scrape_hedges_total', (('winner', kind if status == 200 else 'none'),))
+        for callback in callbacks:
+            callback(payload, status)
+    
+    def wait(self, until):
+        """The (payload, status) result, or None if there is none by perf_counter() time `until`"""
+        until = min(until, self.deadline)
+        while self.result is None:
+            now = time.perf_counter()
+            if now >= until:
+                return None
+            wake = until if self.hedge_considered else min(until, self.hedge_at)
+            with self.lock:
+                pending = [future for future in self.attempts if not future.done()]
+            if pending:
+                wait_futures(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+            else:
+                # Finished, but the done callback hasn't published the result yet
+                time.sleep(0.001)
+            if self.result is None and not self.hedge_considered and time.perf_counter() >= self.hedge_at:
+                self.hedge_considered = True
+                hedged = fetch_latencies.hedge_allowed()
+                if hedged:
+                    self.launch('hedge')
+                fetch_latencies.note_fetch(hedged)
+        if not self.hedge_considered:
+            fetch_latencies.note_fetch(False)
+            self.hedge_considered = True
+        return self.result
+    
+    def on_late_result(self, callback):
+        """Run callback(payload, status) once the fetch finishes, even after wait() has given up"""
+        with self.lock:
+            if self.result is None:
+                self.late_callbacks.append(callback)
+                return
+        callback(*self.result)
+    
+    def cancel(self):
+        with self.lock:
+            attempts = list(self.attempts.values())
+        for _, _, cancelled in attempts:
+            cancelled.set()
+
+def request_deadline():
+    """perf_counter() time this request's scrape must finish by: SCRAPE_DEADLINE after it arrived,
+    or sooner if the client sent a shorter X-Request-Timeout (seconds)"""
+    budget = SCRAPE_DEADLINE
+    try:
+        budget = min(budget, max(float(request.headers.get('X-Request-Timeout', budget)), 0.1))
+    except ValueError:
+        pass
+    return g.get('log_started', time.perf_counter()) + budget
+
+def last_stored_price(canonical):
+    """The product's last scraped price as a /get-price payload flagged stale, or None"""
+    conn = connect_db()
+    row = conn.execute("""
+        SELECT current_price, product_name, currency, currency_symbol, last_checked
+        FROM products WHERE canonical_url = ? AND current_price IS NOT NULL
+    """, (canonical,)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    price, name, currency, symbol, checked_at = row
+    return {"price": price, "currency": currency, "currency_symbol": symbol, "productName": name or "Product",
+            "stale": True, "lastChecked": str(checked_at) if checked_at is not None else None}
+
+def store_scraped_price(canonical, payload):
+    """Cache a fresh /get-price payload and record it as the product's current price"""
+    cache_price(canonical, payload)
+    conn = connect_db()
+    # Every tracker of the product sees the new price (and syncs it through tracker_changes)
+    conn.execute("""
+        UPDATE products SET current_price = ?, product_name = COALESCE(product_name, ?),
+            currency = ?, currency_symbol = ?, last_checked = ?
+        WHERE canonical_url = ?
+    """, (payload['price'], payload['productName'], payload['currency'], payload['currency_symbol'],
+          datetime.now().isoformat(sep=' ', timespec='seconds'), canonical))
+    record_price_observations(conn, 'canonical_url', [(canonical, payload['price'])])
+    conn.commit()
+    conn.close()
+
+def store_late_price(canonical):
+    def store(payload, status):
+        if status == 200:
+            try:
+                store_scraped_price(canonical, payload)
+            except Exception:
+                scrape_log.exception("Could not store late price", extra={"url": canonical})
+    return store
 
 @app.route('/get-price', methods=['POST'])
+@rate_limit(60, per=60)
+@rate_limit(30, per=60, scope='session')  # tighter than the IP limit, which users behind one NAT share
 def get_price():
     data = request.json
     url = data.get('url')
@@ -1063,77 +3726,283 @@ def get_price():
     if not (url.startswith('http://') or url.startswith('https://')):
         return jsonify({"error": "Invalid URL format"}), 400
 
-    # Enhanced headers to avoid being blocked
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "Cache-Control": "max-age=0"
-    }
+    canonical = canonicalize_url(url)
+    cached = cached_price(canonical)
+    if cached is not None:
+        return jsonify(cached)
+    
+    deadline = request_deadline()
+    # The fetch may outlive the request (up to a background refresh's budget), so that a price
+    # arriving after a stale answer still gets stored
+    fetch = HedgedFetch(url, max(deadline, time.perf_counter() + SCRAPE_TIMEOUT))
+    result = fetch.wait(deadline - STALE_PRICE_MARGIN)
+    if result is None:
+        # Out of time: answer with the last price we have and keep whatever the fetch brings back
+        stale = last_stored_price(canonical)
+        if stale is not None:
+            fetch.on_late_result(store_late_price(canonical))
+            inc_counter('price_alerter_stale_prices_total', ())
+            scrape_log.warning("Serving stale price", extra={"url": url, "lastChecked": stale['lastChecked']})
+            return jsonify(stale)
+        result = fetch.wait(deadline)
+    if result is None:
+        fetch.cancel()
+        inc_counter('price_alerter_scrape_deadline_exceeded_total', ())
+        scrape_log.warning("Price fetch missed its deadline", extra={"url": url})
+        return jsonify({"error": "Request timed out. Please try again."}), 504
+    payload, status = result
+    if status == 200:
+        store_scraped_price(canonical, payload)
+    return jsonify(payload), status
+
+@app.route('/api/diagnostics/scraper', methods=['GET'])
+def scraper_diagnostics():
+    """Per-site, per-selector hit ratios and timings across all workers"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not token_authorized(ADMIN_TOKEN):
+        return jsonify({"error": "Unauthorized"}), 401
+    counters, _, histograms = merge_snapshots(collect_worker_snapshots())
+    
+    sites = {}
+    for (name, labels), value in counters.items():
+        if name != 'price_alerter_scrape_extractions_total':
+            continue
+        labels = dict(labels)
+        site = sites.setdefault(labels['site'], {"extractions": 0, "failed": 0, "selectors": {}})
+        site["extractions"] += value
+        if labels['selector'] == 'none':
+            site["failed"] += value
+    
+    for (name, labels), value in counters.items():
+        if name not in ('price_alerter_scrape_selector_attempts_total', 'price_alerter_scrape_selector_hits_total'):
+            continue
+        labels = dict(labels)
+        site = sites.setdefault(labels['site'], {"extractions": 0, "failed": 0, "selectors": {}})
+        stats = site["selectors"].setdefault(labels['selector'], {"attempts": 0, "hits": 0})
+        stats["attempts" if name.endswith('attempts_total') else "hits"] += value
+    
+    for (name, labels), values in histograms.items():
+        if name != 'price_alerter_scrape_selector_duration_seconds':
+            continue
+        labels = dict(labels)
+        stats = sites.get(labels['site'], {}).get("selectors", {}).get(labels['selector'])
+        if stats is not None and stats["attempts"]:
+            stats["meanMs"] = round(values[-1] / stats["attempts"] * 1000, 3)
+            stats["totalMs"] = round(values[-1] * 1000, 1)
+    
+    # Report selectors in the order scrape_price() tries them
+    order = {site_name: {selector: position for position, (selector, _) in enumerate(extractors)}
+             for site_name, extractors in SITE_EXTRACTORS.items()}
+    fallback_order = {selector: 100 + position for position, (selector, _) in enumerate(FALLBACK_EXTRACTORS)}
+    
+    for site_name, site in sites.items():
+        for selector, stats in site["selectors"].items():
+            stats["hitRatio"] = round(stats["hits"] / stats["attempts"], 4) if stats["attempts"] else 0.0
+            # Share of this site's pages whose price came from this selector
+            stats["winShare"] = round(stats["hits"] / site["extractions"], 4) if site["extractions"] else 0.0
+            stats["dead"] = stats["attempts"] > 0 and stats["hits"] == 0
+        slow_paths = ('fulltext:₹max', 'html:regex')
+        site["slowPathShare"] = round(sum(
+            site["selectors"].get(selector, {}).get("hits", 0) for selector in slow_paths
+        ) / site["extractions"], 4) if site["extractions"] else 0.0
+        site["selectors"] = [dict(stats, selector=selector) for selector, stats in sorted(
+            site["selectors"].items(),
+            key=lambda item: order.get(site_name, {}).get(item[0], fallback_order.get(item[0], 200)))]
+    
+    return jsonify({"sites": sites})
+
+BULK_FETCH_WORKERS = 8
+
+def refresh_product_prices(product_urls):
+    """Fetch prices for (product_id, url) pairs concurrently and store them in one transaction"""
+    urls = [url for _, url in product_urls]
+    with ThreadPoolExecutor(max_workers=min(BULK_FETCH_WORKERS, len(urls))) as pool:
+        results = list(pool.map(with_request_id(fetch_product_price), urls))
+    
+    updates = []
+    checked_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+    for (product_id, url), (payload, status) in zip(product_urls, results):
+        if status == 200:
+            updates.append((payload['price'], payload['productName'], payload['currency'],
+                            payload['currency_symbol'], checked_at, product_id))
+            cache_price(url, payload)
+        else:
+            scrape_log.warning("Price refresh failed", extra={"url": url, "status": status, "error": payload.get('error')})
+    
+    if updates:
+        conn = connect_db()
+        storage.update_product_prices(conn, updates)
+        record_price_observations(conn, 'id', [(product_id, price) for price, _, _, _, _, product_id in updates])
+        conn.commit()
+        conn.close()
+    return len(updates)
+
+# Only the node holding the crossing lease keeps a tracker index, so each crossing is reported once.
+# A node taking the lease over builds a fresh one, which reports nothing until prices move again.
+_tracker_index = None
 
+def drop_tracker_index():
+    global _tracker_index
+    _tracker_index = None
+
+def check_target_crossings():
+    """Bring the tracker index up to date and report the trackers whose target a new price reached"""
+    global _tracker_index
+    conn = connect_db(timeout=30)
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return jsonify({"error": f"Failed to fetch page (Status: {response.status_code})"}), response.status_code
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        site, currency, currency_symbol = get_site_info(url)
-        price = scrape_price(soup, site, currency_symbol)
-        
-        # Try to get product name from title
-        product_name = "Product"
-        if soup.title:
-            title = soup.title.get_text().strip()
-            product_name = re.sub(r'\s*[-|]\s*(Amazon|Flipkart|Myntra|Ajio|Meesho|Snapdeal)\s*$', '', title, flags=re.IGNORECASE).strip()
-        
-        if price is None:
-            # Last resort: try to find any price-like pattern in the entire HTML
-            html_text = response.text
-            # Try to find any currency pattern
-            price_patterns = [
-                r'₹\s*([\d,]+\.?\d*)',
-                r'INR\s*([\d,]+\.?\d*)',
-                r'\$\s*([\d,]+\.?\d*)',
-                r'USD\s*([\d,]+\.?\d*)',
-                r'£\s*([\d,]+\.?\d*)',
-                r'GBP\s*([\d,]+\.?\d*)'
-            ]
-            for pattern in price_patterns:
-                matches = re.findall(pattern, html_text)
-                for match in matches:
-                    price = parse_price(match.replace(',', ''))
-                    if price and 50 < price < 100000:
-                        return jsonify({
-                            "price": price, "currency": currency, 
-                            "currency_symbol": currency_symbol, "productName": product_name
-                        })
-            
-            return jsonify({"error": "Could not find price on this page. The website structure may have changed."}), 404
-        
-        return jsonify({
-            "price": price, "currency": currency, 
-            "currency_symbol": currency_symbol, "productName": product_name
-        })
-    except requests.exceptions.Timeout:
-        return jsonify({"error": "Request timed out. Please try again."}), 504
-    except requests.exceptions.ConnectionError:
-        return jsonify({"error": "Could not connect to the website. Please check the URL."}), 502
-    except Exception as e:
-        return jsonify({"error": f"Error: {str(e)}"}), 500
+        if _tracker_index is None:
+            started = time.monotonic()
+            index = TrackerIndex()
+            index.refresh(conn)
+            _tracker_index = index
+            log.info("Built tracker index", extra={
+                "trackers": len(index), "products": len(index.groups), "bytes": index.nbytes,
+                "durationMs": round((time.monotonic() - started) * 1000, 1)})
+            return []
+        crossings = _tracker_index.refresh(conn)
+    finally:
+        conn.close()
+    for crossing in crossings:
+        inc_counter('price_alerter_target_crossings_total', (), len(crossing.tracker_ids))
+        log.info("Price reached tracker targets", extra={
+            "productId": crossing.product_id, "oldPrice": crossing.old_price, "price": crossing.new_price,
+            "trackers": len(crossing.tracker_ids), "users": len(set(crossing.user_ids.tolist()))})
+    return crossings
+
+# ==================== PRICE ANALYTICS ====================
+
+PRICE_HISTORY_INTERVAL = 3600  # an unchanged price is recorded at most once per hour per product
+ANALYTICS_INTERVAL = int(os.environ.get('ANALYTICS_INTERVAL', 3600))  # seconds between summary refreshes; 0 disables
+ANALYTICS_BATCH = 2000  # products per NumPy pass
+
+# Skips the insert while the product's latest observation has the same price and is recent
+RECORD_OBSERVATION_SQL = """
+    INSERT INTO price_history (product_id, price, observed_at)
+    SELECT p.id, ?, ? FROM products p
+    LEFT JOIN price_history h ON h.id = (
+        SELECT id FROM price_history WHERE product_id = p.id ORDER BY observed_at DESC LIMIT 1
+    )
+    WHERE p.{key} = ? AND (h.id IS NULL OR h.price != ? OR h.observed_at <= ?)
+"""
+
+def record_price_observations(conn, key, observations):
+    """Append (key, price) observations to price_history; key is 'id' or 'canonical_url' of products"""
+    observed_at = datetime.now()
+    cutoff = (observed_at - timedelta(seconds=PRICE_HISTORY_INTERVAL)).isoformat(sep=' ', timespec='seconds')
+    observed_at = observed_at.isoformat(sep=' ', timespec='seconds')
+    conn.executemany(RECORD_OBSERVATION_SQL.format(key=key),
+                     [(price, observed_at, value, price, cutoff) for value, price in observations])
+
+def refresh_price_summaries():
+    """Recompute every product's analytics summary from its price history, ANALYTICS_BATCH products at a time"""
+    started = time.monotonic()
+    tomorrow = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+    end = int(np.datetime64(tomorrow, 's').astype(np.int64))
+    window_start = (tomorrow - timedelta(days=analytics.HISTORY_DAYS)).isoformat(sep=' ', timespec='seconds')
+    computed_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+    conn = connect_db(timeout=30)
+    last_id, updated = 0, 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            "SELECT id FROM products WHERE id > ? ORDER BY id LIMIT ?", (last_id, ANALYTICS_BATCH)).fetchall()]
+        if not ids:
+            break
+        last_id = ids[-1]
+        # The window's observations plus each product's last one before it, which seeds the first day
+        rows = conn.execute("""
+            SELECT product_id, price, observed_at FROM price_history
+            WHERE product_id BETWEEN ? AND ? AND observed_at >= ?
+            UNION ALL
+            SELECT product_id, price, observed_at FROM price_history WHERE id IN (
+                SELECT MAX(id) FROM price_history
+                WHERE product_id BETWEEN ? AND ? AND observed_at < ? GROUP BY product_id
+            )
+        """, (ids[0], ids[-1], window_start, ids[0], ids[-1], window_start)).fetchall()
+        if not rows:
+            continue
+        product_ids, prices, observed_at = zip(*rows)
+        positions = {product_id: position for position, product_id in enumerate(ids)}
+        summaries = analytics.compute_summaries(
+            np.array([positions[product_id] for product_id in product_ids]),
+            np.array(observed_at, dtype='datetime64[s]').astype(np.int64),
+            np.array(prices, dtype=float), len(ids), end)
+        conn.executemany("""
+            INSERT INTO price_summaries (product_id, computed_at, summary) VALUES (?, ?, ?)
+            ON CONFLICT(product_id) DO UPDATE SET computed_at = excluded.computed_at, summary = excluded.summary
+        """, [(product_id, computed_at, json.dumps(summary))
+              for product_id, summary in zip(ids, summaries) if summary is not None])
+        conn.commit()
+        updated += sum(1 for summary in summaries if summary is not None)
+    conn.close()
+    report = {"products": updated, "durationMs": round((time.monotonic() - started) * 1000, 1)}
+    log.info("Price summaries refreshed", extra=report)
+    return report
+
+def analytics_loop():
+    while True:
+        time.sleep(60 + random.uniform(0, 60))
+        try:
+            if claim_job('analytics', ANALYTICS_INTERVAL):
+                refresh_price_summaries()
+        except Exception:
+            log.exception("Analytics error")
+
+def start_analytics_scheduler():
+    if ANALYTICS_INTERVAL > 0:
+        threading.Thread(target=analytics_loop, name='analytics', daemon=True).start()
+
+@app.cli.command('analytics')
+def analytics_command():
+    """Recompute the per-product price summaries now"""
+    init_db()
+    print(json.dumps(refresh_price_summaries(), indent=2))
+
+@app.route('/api/analytics/product', methods=['GET'])
+def product_analytics():
+    """Precomputed trend summary for a product URL (see refresh_price_summaries)"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    url = request.args.get('url', '')
+    if not url:
+        return jsonify({"error": "url is required"}), 400
+    conn = connect_db()
+    row = conn.execute("""
+        SELECT s.computed_at, s.summary FROM products p
+        JOIN price_summaries s ON s.product_id = p.id
+        WHERE p.canonical_url = ?
+    """, (canonicalize_url(url),)).fetchone()
+    conn.close()
+    if row is None:
+        return jsonify({"error": "No price history for this product yet"}), 404
+    summary = json.loads(row[1])
+    summary["computedAt"] = row[0]
+    summary["seriesEnd"] = row[0][:10]
+    return jsonify(summary)
 
 # ==================== STATIC FILES ====================
 
+STATIC_IMAGE_MAX_AGE = 7 * 24 * 3600  # images (e.g. the site-logo sprite) are cached; scripts and styles are not
+
+@app.route('/sw.js')
+def service_worker():
+    """The dashboard's service worker, served from the root so its scope covers /dashboard"""
+    response = send_from_directory('static', 'sw.js', max_age=0)
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     return send_from_directory('static', filename, max_age=0)
 
+@app.after_request
+def cache_static_images(response):
+    if request.endpoint in ('static', 'serve_static') and (request.view_args or {}).get('filename', '').startswith('img/'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_IMAGE_MAX_AGE
+    return response
+
 # Catch-all route for SPA-style routing
 # This ensures that any route that doesn't match API or static serves the appropriate page
 @app.route('/<path:path>')
@@ -1179,39 +4048,89 @@ def add_no_cache_headers(response):
 
 # ==================== MAIN ====================
 
+STARTUP_TIMINGS = {}  # phase -> seconds since STARTUP_BEGAN or phase duration, see initialize_app()
+_app_initialized = False
+_services_pid = None  # process whose background threads are running
+
+def warm_caches():
+    """Fill the caches the first requests would otherwise pay for"""
+    # Compile every template up front
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    # Run each site's extractors once so soupsieve compiles and caches every CSS selector
+    soup = BeautifulSoup('<html><head><title></title></head><body></body></html>', 'html.parser')
+    for site in SITE_EXTRACTORS:
+        scrape_price(soup, site, '', telemetry=False)
+    # Load the schema and the first pages of the hot tables into the OS page cache
+    conn = connect_db()
+    for table in ('users', 'remember_tokens', 'products', 'trackers'):
+        conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchall()
+    conn.close()
+
 def initialize_app():
-    """Lazy initialization function - only runs when needed"""
-    print("=" * 50)
-    print("🚀 AI Price Alert - Starting up...")
-    print("=" * 50)
+    """Schema setup and cache warmup; runs once at import, in gunicorn's master when preload_app is on"""
+    global _app_initialized
+    if _app_initialized:
+        return True
+    STARTUP_TIMINGS['import'] = time.perf_counter() - STARTUP_BEGAN
+    log.info("AI Price Alert starting up")
+    started = time.perf_counter()
     try:
         init_db()
-        print("✅ Database initialized successfully")
-    except Exception as e:
-        print(f"⚠️  Database initialization warning: {e}")
-    print("✅ App ready to serve requests")
-    print("=" * 50)
+        log.info("Database initialized")
+    except Exception:
+        log.exception("Database initialization failed")
+    STARTUP_TIMINGS['schema'] = time.perf_counter() - started
+    started = time.perf_counter()
+    try:
+        warm_caches()
+    except Exception:
+        log.exception("Cache warmup failed")
+    STARTUP_TIMINGS['warmup'] = time.perf_counter() - started
+    STARTUP_TIMINGS['total'] = time.perf_counter() - STARTUP_BEGAN
+    _app_initialized = True
+    log.info("App initialized", extra={"startupMs": {phase: round(seconds * 1000, 1)
+                                                     for phase, seconds in STARTUP_TIMINGS.items()}})
     return True
 
-# Initialize lazily - only when first request comes in
-_app_initialized = False
+def reinit_after_fork():
+    """A worker forked from the preloading master inherits its dead log listener and its metrics"""
+    global log_listener
+    atexit.unregister(log_listener.stop)
+    # Levels and filters survive the fork; only the queue and its listener thread need rebuilding
+    log_listener = start_log_listener()
+    reset_metrics()
+    storage.after_fork()
+
+os.register_at_fork(after_in_child=reinit_after_fork)
+
+def start_worker_services():
+    """Start this process's background threads; called from gunicorn's post_fork hook"""
+    global _services_pid
+    if _services_pid == os.getpid():
+        return
+    _services_pid = os.getpid()
+    start_maintenance_scheduler()
+    start_metrics_flusher()
+    start_scrape_worker()
+    start_analytics_scheduler()
+    ready = time.perf_counter() - STARTUP_BEGAN
+    for phase, seconds in list(STARTUP_TIMINGS.items()) + [('worker_ready', ready)]:
+        # Per-worker label: gauges from different workers are summed when merged
+        add_gauge('price_alerter_startup_seconds', (('phase', phase), ('pid', str(os.getpid()))), round(seconds, 6))
+    log.info("App ready to serve requests", extra={"readyMs": round(ready * 1000, 1)})
 
 @app.before_request
-def ensure_app_initialized():
-    """Initialize app on first request to avoid startup delays"""
-    global _app_initialized
-    if not _app_initialized:
-        print("🔄 First request received - initializing app...")
-        initialize_app()
-        _app_initialized = True
+def ensure_worker_services():
+    """Servers without a post_fork hook (flask run, test clients) start the background threads here"""
+    if _services_pid != os.getpid():
+        start_worker_services()
+
+initialize_app()
 
 if __name__ == "__main__":
     # Direct run mode (for local development)
-    initialize_app()
+    start_worker_services()
     port = int(os.environ.get('PORT', 8081))
-    print(f"🌐 Starting server on http://0.0.0.0:{port}")
+    log.info("Starting development server", extra={"port": port})
     app.run(host='0.0.0.0', port=port, debug=False)
-else:
-    # Gunicorn/WSGI mode - initialize lazily via before_request hook
-    # Don't run initialization here to avoid startup delays on Render
-    print("📦 Running under WSGI server (Render) - lazy initialization enabled")
@@ -0,0 +1,326 @@
+"""End-to-end load test of the dashboard refresh pattern.
+
+Starts a stub e-commerce server that serves the recorded pages in
+benchmarks/fixtures (acting as the app's HTTP proxy, so product URLs keep
+their real retailer hostnames), launches the app under gunicorn or the
+werkzeug dev server, and simulates users running autoRefreshAllPrices():
+every --interval seconds each user re-fetches /get-price for each of its
+trackers, one after another, skipping a tick while the previous pass is
+still running.
+
+Reports requests/s, latency percentiles, status codes, upstream fetches
+and worker saturation (in-flight requests from /metrics vs. capacity) for
+each configuration, so worker classes and cache settings can be compared:
+
+    python benchmarks/loadtest.py --users 20 --duration 30 \\
+        --config sync,workers=2 \\
+        --config gthread,workers=2,threads=4 \\
+        --config gthread,workers=2,threads=4,PRICE_CACHE_TTL=0
+
+A config is a worker class (sync, gthread, gevent, werkzeug) followed by
+gunicorn options (workers, threads) and UPPERCASE environment variables
+passed to the app.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+METRICS_TOKEN = 'loadtest'  # the app under test serves /metrics only with a token
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ==================== STUB RETAILER ====================
+
+class StubRetailer:
+    """Forward proxy that answers every product URL with a recorded page for that retailer"""
+
+    def __init__(self, latency, jitter, error_rate):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fetches = 0
+        self.lock = threading.Lock()
+        with open(os.path.join(FIXTURES, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)['fixtures']
+        self.pages = {}
+        for fixture in manifest:
+            host = urlparse(fixture['url']).hostname
+            with open(os.path.join(FIXTURES, fixture['file']), 'rb') as f:
+                self.pages.setdefault(host, []).append(f.read())
+        self.product_urls = [fixture['url'] for fixture in manifest]
+
+    def page_for(self, url):
+        pages = self.pages.get(urlparse(url).hostname)
+        if not pages:
+            return None
+        return pages[hash(urlparse(url).path) % len(pages)]
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.fetches += 1
+                time.sleep(max(0.0, stub.latency + random.uniform(-stub.jitter, stub.jitter)))
+                body = stub.page_for(self.path)
+                if body is None or random.random() < stub.error_rate:
+                    self.send_response(503 if body is not None else 404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.port = free_port()
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def product_pool(self, count):
+        """`count` distinct plain-http product URLs spread across the recorded retailers"""
+        urls = []
+        for i in range(count):
+            base = urlparse(self.product_urls[i % len(self.product_urls)])
+            urls.append(f"http://{base.hostname}{base.path.rstrip('/')}-{i}")
+        return urls
+
+
+# ==================== APP UNDER TEST ====================
+
+def parse_config(text):
+    parts = text.split(',')
+    config = {'name': text, 'worker_class': parts[0], 'workers': 2, 'threads': 1, 'env': {}}
+    for part in parts[1:]:
+        key, _, value = part.partition('=')
+        if key.isupper():
+            config['env'][key] = value
+        else:
+            config[key] = int(value)
+    return config
+
+
+class AppServer:
+    def __init__(self, config, proxy_port, workdir):
+        self.config = config
+        self.port = free_port()
+        self.metrics_dir = os.path.join(workdir, 'metrics')
+        self.env = dict(os.environ, **{
+            'DATABASE_PATH': os.path.join(workdir, 'load.db'),
+            'METRICS_DIR': self.metrics_dir,
+            'METRICS_TOKEN': METRICS_TOKEN,
+            'RATE_LIMIT_ENABLED': 'false',
+            'MAINTENANCE_INTERVAL': '0',
+            'http_proxy': f'http://127.0.0.1:{proxy_port}',
+            'HTTP_PROXY': f'http://127.0.0.1:{proxy_port}',
+            'no_proxy': '127.0.0.1,localhost',
+            'NO_PROXY': '127.0.0.1,localhost',
+        }, **config['env'])
+
+    @property
+    def capacity(self):
+        # Async workers (gevent, eventlet) and the dev server have no fixed request capacity
+        if self.config['worker_class'] == 'gthread':
+            return self.config['workers'] * self.config['threads']
+        if self.config['worker_class'] == 'sync':
+            return self.config['workers']
+        return None
+
+    def start(self):
+        if self.config['worker_class'] == 'werkzeug':
+            command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(self.port), '--with-threads']
+        else:
+            if not shutil.which('gunicorn'):
+                raise SystemExit("gunicorn is not installed; use the 'werkzeug' worker class or pip install gunicorn")
+            command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{self.port}',
+                       '--workers', str(self.config['workers']), '--worker-class', self.config['worker_class'],
+                       '--threads', str(self.config['threads']), '--timeout', '120', '--log-level', 'warning']
+        self.process = subprocess.Popen(command, cwd=ROOT, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        probe = requests.Session()
+        probe.trust_env = False
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if probe.get(self.url('/home'), timeout=2).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise SystemExit(f"app did not start for config {self.config['name']}")
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.port}{path}'
+
+    def in_flight(self, session):
+        """Requests currently being served, excluding this /metrics scrape itself"""
+        response = session.get(self.url('/metrics'), headers={'Authorization': f'Bearer {METRICS_TOKEN}'}, timeout=5)
+        response.raise_for_status()
+        text = response.text
+        total = 0.0
+        for line in text.splitlines():
+            if line.startswith('price_alerter_http_requests_in_flight{'):
+                labels, value = line.rsplit(' ', 1)
+                total += float(value)
+        return max(0.0, total - 1)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# ==================== SIMULATED USERS ====================
+
+def run_user(app_server, trackers, interval, stop, samples, lock):
+    session = requests.Session()
+    session.trust_env = False
+    next_tick = time.monotonic()
+    while not stop.is_set():
+        # autoRefreshAllPrices(): sequential /get-price calls; a tick is skipped while a pass is in progress
+        for url in trackers:
+            if stop.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                status = session.post(app_server.url('/get-price'), json={'url': url}, timeout=60).status_code
+            except requests.RequestException:
+                status = 'error'
+            with lock:
+                samples.append((status, time.perf_counter() - started))
+        next_tick += interval
+        while next_tick < time.monotonic():
+            next_tick += interval
+        stop.wait(next_tick - time.monotonic())
+
+
+def run_config(config, args, stub):
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    app_server = AppServer(config, stub.port, workdir).start()
+    products = stub.product_pool(args.products)
+    rng = random.Random(args.seed)
+    users = [rng.sample(products, min(args.trackers_per_user, len(products))) for _ in range(args.users)]
+
+    samples, lock, stop = [], threading.Lock(), threading.Event()
+    fetches_before = stub.fetches
+    threads = [threading.Thread(target=run_user, args=(app_server, trackers, args.interval, stop, samples, lock),
+                                daemon=True) for trackers in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    in_flight = []
+    metrics_session = requests.Session()
+    metrics_session.trust_env = False
+    while time.perf_counter() - started < args.duration:
+        time.sleep(0.5)
+        try:
+            in_flight.append(app_server.in_flight(metrics_session))
+        except requests.RequestException:
+            pass
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    elapsed = time.perf_counter() - started
+    app_server.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = [latency for _, latency in samples]
+    statuses = {}
+    for status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    capacity = app_server.capacity
+    mean_in_flight = sum(in_flight) / len(in_flight) if in_flight else 0.0
+    return {
+        'config': config['name'],
+        'requests': len(samples),
+        'requests_per_sec': round(len(samples) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'statuses': statuses,
+        'upstream_fetches': stub.fetches - fetches_before,
+        'upstream_per_request': round((stub.fetches - fetches_before) / len(samples), 3) if samples else None,
+        'capacity': capacity,
+        'mean_in_flight': round(mean_in_flight, 2),
+        'max_in_flight': max(in_flight) if in_flight else 0,
+        'saturation': round(mean_in_flight / capacity, 3) if capacity else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', action='append', help='worker configuration to test (repeatable)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--trackers-per-user', type=int, default=5)
+    parser.add_argument('--products', type=int, default=30, help='distinct product URLs shared by all users')
+    parser.add_argument('--interval', type=float, default=5.0, help='dashboard auto-refresh interval in seconds')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run each configuration')
+    parser.add_argument('--upstream-latency', type=float, default=0.3, help='mean stub response delay in seconds')
+    parser.add_argument('--upstream-jitter', type=float, default=0.1)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'loadtest_results.json'))
+    args = parser.parse_args()
+    configs = [parse_config(text) for text in (args.config or ['sync,workers=2'])]
+
+    stub = StubRetailer(args.upstream_latency, args.upstream_jitter, args.upstream_error_rate).start()
+    results = []
+    try:
+        for config in configs:
+            print(f"running {config['name']} for {args.duration:.0f}s with {args.users} users...")
+            results.append(run_config(config, args, stub))
+    finally:
+        stub.stop()
+
+    print(f"\n{'config':40} {'req/s':>8} {'p50':>8} {'p99':>8} {'upstream':>9} {'satur.':>7}")
+    for result in results:
+        saturation = f"{result['saturation']:.0%}" if result['saturation'] is not None else 'n/a'
+        print(f"{result['config']:40} {result['requests_per_sec']:>8} {result['p50_ms']:>6}ms "
+              f"{result['p99_ms']:>6}ms {result['upstream_fetches']:>9} {saturation:>7}")
+    with open(args.output, 'w') as f:
+        json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
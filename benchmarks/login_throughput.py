@@ -0,0 +1,98 @@
+"""Login throughput benchmark.
+
+Fires concurrent logins at the app through Flask's test client while a
+background thread keeps hitting a cheap endpoint, and reports logins/s,
+latency percentiles, load-shed (503) responses and how much the cheap
+endpoint slowed down while hashing was in progress.
+
+    python benchmarks/login_throughput.py --users 8 --logins 200
+    PASSWORD_HASH_METHOD=pbkdf2:sha256:600000 HASH_WORKERS=4 python benchmarks/login_throughput.py
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--logins', type=int, default=100, help='total login attempts')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    import app as price_app
+    price_app.initialize_app()
+    client = price_app.app.test_client()
+    client.post('/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'bench-password'})
+
+    def login(_):
+        started = time.perf_counter()
+        response = price_app.app.test_client().post(
+            '/login', json={'email': 'bench@example.com', 'password': 'bench-password'})
+        return response.status_code, time.perf_counter() - started
+
+    # Cheap requests served alongside the logins show whether hashing stalls other traffic
+    probe_latencies = []
+    stop = threading.Event()
+
+    def probe():
+        probe_client = price_app.app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            probe_client.get('/api/user')
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    probe_thread.join()
+
+    ok = [latency for status, latency in results if status == 200]
+    shed = sum(1 for status, _ in results if status == 503)
+    report = {
+        'hash_method': price_app.PASSWORD_HASH_METHOD,
+        'hash_workers': price_app.HASH_WORKERS,
+        'hash_queue_limit': price_app.HASH_QUEUE_LIMIT,
+        'concurrency': args.users,
+        'attempts': args.logins,
+        'succeeded': len(ok),
+        'shed_503': shed,
+        'logins_per_sec': round(len(ok) / elapsed, 2),
+        'login_p50_ms': round(percentile(ok, 50) * 1000, 1),
+        'login_p99_ms': round(percentile(ok, 99) * 1000, 1),
+        'probe_requests': len(probe_latencies),
+        'probe_p50_ms': round(percentile(probe_latencies, 50) * 1000, 2),
+        'probe_p99_ms': round(percentile(probe_latencies, 99) * 1000, 2),
+        'probe_mean_ms': round(statistics.mean(probe_latencies) * 1000, 2) if probe_latencies else 0.0,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
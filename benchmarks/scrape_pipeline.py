@@ -0,0 +1,154 @@
+"""Offline benchmark of the scrape pipeline over recorded product pages.
+
+Measures get_site_info(), the BeautifulSoup parse, scrape_price() and the
+full parse + extract step (extract_product_info()) against the pages in
+benchmarks/fixtures, then checks each extracted price against the
+manifest's expected price. Results are written as JSON; pass --baseline
+to fail when throughput or accuracy regresses against a previous run.
+
+    python benchmarks/scrape_pipeline.py
+    python benchmarks/scrape_pipeline.py --baseline benchmarks/scrape_results.json --max-slowdown 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    total = sum(latencies)
+    return {
+        'iterations': len(latencies),
+        'per_sec': round(len(latencies) / total, 1) if total else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def timed(func, items, iterations):
+    latencies = []
+    for _ in range(iterations):
+        for item in items:
+            started = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)['fixtures']
+    for fixture in manifest:
+        with open(os.path.join(FIXTURES, fixture['file']), 'rb') as f:
+            fixture['content'] = f.read()
+    return manifest
+
+
+def run(iterations, tolerance):
+    import app as price_app
+    from bs4 import BeautifulSoup
+
+    fixtures = load_fixtures()
+    urls = [fixture['url'] for fixture in fixtures]
+    soups = [(BeautifulSoup(fixture['content'], 'html.parser'), price_app.get_site_info(fixture['url']))
+             for fixture in fixtures]
+
+    stages = {
+        'get_site_info': summarize(timed(price_app.get_site_info, urls, iterations * 100)),
+        'parse': summarize(timed(lambda fixture: BeautifulSoup(fixture['content'], 'html.parser'), fixtures, iterations)),
+        'scrape_price': summarize(timed(
+            lambda item: price_app.scrape_price(item[0], item[1][0], item[1][2], telemetry=False), soups, iterations)),
+        'pipeline': summarize(timed(
+            lambda fixture: price_app.extract_product_info(fixture['url'], fixture['content']), fixtures, iterations)),
+    }
+
+    tracemalloc.start()
+    pages = []
+    for fixture in fixtures:
+        started = time.perf_counter()
+        payload, _ = price_app.extract_product_info(fixture['url'], fixture['content'])
+        elapsed = time.perf_counter() - started
+        price = payload.get('price')
+        expected = fixture['expectedPrice']
+        pages.append({
+            'file': fixture['file'],
+            'site': price_app.get_site_info(fixture['url'])[0],
+            'bytes': len(fixture['content']),
+            'expected': expected,
+            'extracted': price,
+            'correct': price is not None and abs(price - expected) <= expected * tolerance,
+            'ms': round(elapsed * 1000, 2),
+        })
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    correct = sum(1 for page in pages if page['correct'])
+    return {
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'pages': len(pages),
+        'stages': stages,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'accuracy': round(correct / len(pages), 4),
+        'results': pages,
+    }
+
+
+def regressions(report, baseline, max_slowdown):
+    problems = []
+    for stage, stats in report['stages'].items():
+        before = baseline.get('stages', {}).get(stage, {}).get('per_sec')
+        if before and stats['per_sec'] < before * (1 - max_slowdown):
+            problems.append(f"{stage}: {stats['per_sec']}/s vs baseline {before}/s")
+    if report['accuracy'] < baseline.get('accuracy', 0):
+        problems.append(f"accuracy: {report['accuracy']} vs baseline {baseline['accuracy']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5, help='passes over the fixture corpus per stage')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='relative price error still counted as correct')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'scrape_results.json'))
+    parser.add_argument('--baseline', help='previous results file to compare against')
+    parser.add_argument('--max-slowdown', type=float, default=0.25, help='allowed throughput drop vs baseline')
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.tolerance)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for stage, stats in report['stages'].items():
+        print(f"{stage:14} {stats['per_sec']:>10}/s  p50 {stats['p50_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms")
+    print(f"peak memory    {report['peak_memory_kb']} KB")
+    print(f"accuracy       {report['accuracy']:.0%}")
+    for page in report['results']:
+        if not page['correct']:
+            print(f"  MISS {page['file']}: expected {page['expected']}, got {page['extracted']}")
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(report, json.load(f), args.max_slowdown)
+        if problems:
+            print("REGRESSIONS:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Benchmark of the in-memory tracker index against plain row lists.
+
+Generates --trackers synthetic trackers over --products products (a few
+products carry most trackers, as popular products do), then measures:
+
+  - memory per tracker, with tracemalloc, for the rows held as fetched
+    tuples, as dicts, and as a TrackerIndex;
+  - building the index from a tracker_changes log in SQLite;
+  - price updates per second and tracker evaluations per second when each
+    update checks the product's trackers for a target crossing, with a
+    Python loop over the product's rows versus TrackerIndex.set_price().
+    Both skip price rises, which cannot reach a target; evaluations count
+    the trackers actually compared.
+
+    python benchmarks/tracker_index.py
+    python benchmarks/tracker_index.py --trackers 1000000 --products 50000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tracker_index import TrackerIndex  # noqa: E402
+
+COLUMNS = ('id', 'user_id', 'product_id', 'target_price', 'current_price')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_database(trackers, products, users, seed):
+    """In-memory database with the app's trackers/products/tracker_changes columns"""
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE products (id INTEGER PRIMARY KEY, current_price REAL);
+        CREATE TABLE trackers (id INTEGER PRIMARY KEY, user_id INTEGER, product_id INTEGER, target_price REAL);
+        CREATE TABLE tracker_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, tracker_id INTEGER UNIQUE,
+                                      user_id INTEGER, deleted INTEGER DEFAULT 0);
+    """)
+    prices = np.round(rng.uniform(100, 50000, products), 2)
+    conn.executemany("INSERT INTO products VALUES (?, ?)", zip(range(1, products + 1), prices.tolist()))
+    # Zipf-like popularity: product k gets a share proportional to 1/k
+    weights = 1 / np.arange(1, products + 1)
+    product_ids = rng.choice(products, size=trackers, p=weights / weights.sum()) + 1
+    targets = np.round(prices[product_ids - 1] * rng.uniform(0.6, 1.0, trackers), 2)
+    user_ids = rng.integers(1, users + 1, trackers)
+    rows = list(zip(range(1, trackers + 1), user_ids.tolist(), product_ids.tolist(), targets.tolist()))
+    conn.executemany("INSERT INTO trackers VALUES (?, ?, ?, ?)", rows)
+    conn.execute("INSERT INTO tracker_changes (tracker_id, user_id) SELECT id, user_id FROM trackers ORDER BY id")
+    conn.commit()
+    return conn
+
+
+def fetch_rows(conn):
+    return conn.execute("""
+        SELECT t.id, t.user_id, t.product_id, t.target_price, p.current_price
+        FROM trackers t JOIN products p ON p.id = t.product_id
+    """).fetchall()
+
+
+def load_index(conn):
+    index = TrackerIndex()
+    index.refresh(conn)
+    return index
+
+
+def measure(build):
+    """(result, bytes allocated by build() that are still alive)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def price_updates(conn, count, seed):
+    """(product_id, new price) pairs: mostly small moves, some deep drops that cross many targets"""
+    rng = random.Random(seed)
+    prices = dict(conn.execute("SELECT id, current_price FROM products").fetchall())
+    product_ids = [product_id for product_id, in conn.execute("SELECT DISTINCT product_id FROM trackers")]
+    updates = []
+    for _ in range(count):
+        product_id = rng.choice(product_ids)
+        factor = rng.uniform(0.55, 0.8) if rng.random() < 0.1 else rng.uniform(0.97, 1.03)
+        prices[product_id] = round(prices[product_id] * factor, 2)
+        updates.append((product_id, prices[product_id]))
+    return updates
+
+
+def run_rows(rows, updates):
+    """Baseline: rows grouped by product, each update loops over the product's rows"""
+    by_product = {}
+    for row in rows:
+        by_product.setdefault(row[2], []).append(row)
+    prices = {product_id: group[0][4] for product_id, group in by_product.items()}
+    latencies, evaluated, crossed = [], 0, 0
+    for product_id, price in updates:
+        started = time.perf_counter()
+        old = prices[product_id]
+        prices[product_id] = price
+        hits = []
+        if old is None or price < old:
+            group = by_product[product_id]
+            hits = [row[0] for row in group if price <= row[3] and (old is None or row[3] < old)]
+            evaluated += len(group)
+        latencies.append(time.perf_counter() - started)
+        crossed += len(hits)
+    return latencies, evaluated, crossed
+
+
+def run_index(index, updates):
+    latencies, evaluated, crossed = [], 0, 0
+    for product_id, price in updates:
+        old = index.groups[product_id].price
+        started = time.perf_counter()
+        crossing = index.set_price(product_id, price)
+        latencies.append(time.perf_counter() - started)
+        if not price >= old:
+            evaluated += len(index.groups[product_id])
+        crossed += len(crossing.tracker_ids) if crossing is not None else 0
+    return latencies, evaluated, crossed
+
+
+def summarize(latencies, evaluated, crossed):
+    total = sum(latencies)
+    return {
+        'updates': len(latencies),
+        'updates_per_sec': round(len(latencies) / total, 1) if total else None,
+        'evaluations_per_sec': round(evaluated / total) if total else None,
+        'crossings': crossed,
+        'p50_us': round(percentile(latencies, 50) * 1e6, 2),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 2),
+    }
+
+
+def run(args):
+    conn = build_database(args.trackers, args.products, args.users, args.seed)
+    tuples, tuple_bytes = measure(lambda: fetch_rows(conn))
+    dicts, dict_bytes = measure(lambda: [dict(zip(COLUMNS, row)) for row in tuples])
+    del dicts
+
+    # Everything the index holds: columns, per-product records and the by-tracker-id arrays
+    index, index_bytes = measure(lambda: load_index(conn))
+    started = time.perf_counter()
+    load_index(conn)
+    load_seconds = time.perf_counter() - started
+
+    updates = price_updates(conn, args.updates, args.seed)
+    baseline = summarize(*run_rows(tuples, updates))
+    indexed = summarize(*run_index(index, updates))
+    if baseline['crossings'] != indexed['crossings']:
+        raise SystemExit(f"crossing counts differ: rows {baseline['crossings']}, index {indexed['crossings']}")
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'trackers': args.trackers,
+        'products': len(index.groups),
+        'memory_bytes_per_tracker': {
+            'tuples': round(tuple_bytes / args.trackers, 1),
+            'dicts': round((tuple_bytes + dict_bytes) / args.trackers, 1),
+            'index': round(index_bytes / args.trackers, 1),
+            'index_columns': round(index.nbytes / args.trackers, 1),
+        },
+        'index_load_per_sec': round(args.trackers / load_seconds),
+        'price_checks': {'rows': baseline, 'index': indexed},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trackers', type=int, default=200000)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--updates', type=int, default=50000, help='price updates to check')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'tracker_index_results.json'))
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{args.trackers} trackers over {report['products']} products")
+    for layout, size in report['memory_bytes_per_tracker'].items():
+        print(f"  {layout:14} {size:>8} bytes/tracker")
+    print(f"  index load     {report['index_load_per_sec']:>8} trackers/s")
+    for layout, stats in report['price_checks'].items():
+        print(f"{layout:6} {stats['updates_per_sec']:>10} updates/s {stats['evaluations_per_sec']:>12} evaluations/s  "
+              f"p50 {stats['p50_us']:>8} us  p99 {stats['p99_us']:>8} us")
+    print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
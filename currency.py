@@ -0,0 +1,136 @@
+"""Currency conversion over a cached matrix of FX rates.
+
+A provider loads rates as units of each currency per one unit of a base
+currency. RateTable turns them into a (currencies x currencies) matrix, so
+converting a whole array of amounts in mixed currencies is one gather and
+one multiply. app.py keeps a RateCache around its configured provider and
+uses it for dashboard totals, search sorting, and the rates the dashboard
+converts tracker prices with.
+"""
+import json
+import re
+import threading
+import time
+
+import numpy as np
+import requests
+
+CURRENCY_CODE = re.compile(r'^[A-Z]{3}$')
+
+
+class RateTable:
+    """Rates for a fixed set of currencies; matrix[i, j] is units of codes[j] per unit of codes[i]"""
+
+    def __init__(self, base, rates, as_of=None):
+        codes = sorted(set(rates) | {base})
+        for code in codes:
+            if not CURRENCY_CODE.match(code):
+                raise ValueError(f"Invalid currency code: {code!r}")
+        per_base = np.array([1.0 if code == base else float(rates[code]) for code in codes])
+        if not np.all(np.isfinite(per_base) & (per_base > 0)):
+            raise ValueError("Rates must be positive numbers")
+        self.base = base
+        self.as_of = as_of
+        self.codes = tuple(codes)
+        self.index = {code: position for position, code in enumerate(codes)}
+        self.per_base = per_base
+        self.matrix = per_base[None, :] / per_base[:, None]
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def indices(self, currencies):
+        """Positions of the currencies in the matrix; -1 for one without a rate (or None)"""
+        return np.array([self.index.get(code, -1) for code in currencies], dtype=np.int64)
+
+    def convert(self, amounts, currencies, target):
+        """Amounts in the parallel `currencies` expressed in `target`; NaN where a currency has no rate"""
+        if target not in self.index:
+            raise KeyError(target)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        rows = self.indices(currencies)
+        factors = self.matrix[rows, self.index[target]]
+        return np.where(rows >= 0, amounts * factors, np.nan)
+
+    def rate(self, source, target):
+        """Units of target per unit of source"""
+        return float(self.matrix[self.index[source], self.index[target]])
+
+    def to_dict(self):
+        return {"base": self.base, "asOf": self.as_of,
+                "rates": dict(zip(self.codes, self.per_base.tolist()))}
+
+    @classmethod
+    def from_dict(cls, data):
+        """A table from {"base": "USD", "asOf": "...", "rates": {"INR": 88.0, ...}}"""
+        return cls(data['base'], data['rates'], data.get('asOf'))
+
+
+class FileRateProvider:
+    """Rates from a local JSON file in RateTable.from_dict() form"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            return RateTable.from_dict(json.load(f))
+
+
+class HttpRateProvider:
+    """Rates from an HTTP endpoint answering with the same JSON as the rates file"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def load(self):
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return RateTable.from_dict(response.json())
+
+
+class StaticRateProvider:
+    """Fixed rates, for tests or a deployment that pins its own"""
+
+    def __init__(self, base, rates, as_of=None):
+        self.table = RateTable(base, rates, as_of)
+
+    def load(self):
+        return self.table
+
+
+class RateCache:
+    """The provider's latest RateTable, reloaded once `ttl` seconds old.
+
+    A failed reload keeps serving the previous table and is retried after
+    `retry` seconds; on_error(exception) is told about it. table() raises
+    LookupError only while no table has ever loaded.
+    """
+
+    def __init__(self, provider, ttl, retry=300, on_error=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.retry = retry
+        self.on_error = on_error
+        self.lock = threading.Lock()
+        self.current = None
+        self.expires = 0.0
+
+    def table(self):
+        if time.monotonic() >= self.expires:
+            with self.lock:
+                if time.monotonic() >= self.expires:
+                    try:
+                        self.current = self.provider.load()
+                        self.expires = time.monotonic() + self.ttl
+                    except Exception as e:
+                        self.expires = time.monotonic() + min(self.retry, self.ttl)
+                        if self.on_error is not None:
+                            self.on_error(e)
+        if self.current is None:
+            raise LookupError("No FX rates have been loaded")
+        return self.current
+
+    def invalidate(self):
+        self.expires = 0.0
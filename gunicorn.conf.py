@@ -0,0 +1,14 @@
+"""Gunicorn settings, picked up automatically from the working directory.
+
+With preload_app the master imports app.py once: config loading, schema
+setup and cache warmup run before any worker forks, and workers start
+serving with warm imports, compiled templates and compiled selectors.
+"""
+
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork; each worker starts its own maintenance and metrics threads
+    import app
+    app.start_worker_services()
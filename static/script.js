@@ -64,6 +64,7 @@ const celebrationColors = [
 
 document.addEventListener('DOMContentLoaded', () => {
     loadTrackers();
+    loadFxRates();
     setupNavigation();
     loadUserData();
     initTilt();
@@ -269,8 +270,9 @@ function buyNowFromCelebration() {
     openSafeUrl(trimmedUrl, true);
 }
 
+// A product with no price yet is still active (null <= target would be true)
 function checkPriceReached(tracker) {
-    return tracker && tracker.currentPrice <= tracker.targetPrice;
+    return Boolean(tracker) && tracker.currentPrice != null && tracker.currentPrice <= tracker.targetPrice;
 }
 
 // ==================== TILT EFFECT ====================
@@ -367,6 +369,7 @@ function switchView(viewName) {
     const targetView = document.getElementById('view-' + viewName);
     if (targetView) {
         targetView.classList.add('active');
+        if (targetView.querySelector('#trackers-list')) scheduleCardRender();
         console.log('View switched to:', viewName);
     } else {
         console.error('View element not found: view-' + viewName);
@@ -506,7 +509,7 @@ async function createTracker(url, targetPrice, currentPrice, productName, curren
         }
         
         const newTracker = {
-            id: Date.now(),
+            id: data.id,
             url: url,
             productName: productName,
             currentPrice: currentPrice,
@@ -517,7 +520,7 @@ async function createTracker(url, targetPrice, currentPrice, productName, curren
         };
         
         trackers.push(newTracker);
-        localStorage.setItem('trackers', JSON.stringify(trackers));
+        TrackerStore.put(newTracker);
         
         showToast('success', 'Tracker created successfully!');
         
@@ -540,74 +543,330 @@ async function createTracker(url, targetPrice, currentPrice, productName, curren
 
 // ==================== TRACKERS DISPLAY ====================
 
-function loadTrackers() {
-    trackers = JSON.parse(localStorage.getItem('trackers') || '[]');
+// Render straight away from the local store, then pull whatever changed on the server since last time
+async function loadTrackers() {
+    trackers = await TrackerStore.getAll();
     renderTrackers();
     updateStats();
+    syncTrackers();
+}
+
+async function syncTrackers() {
+    try {
+        const result = await TrackerStore.sync(API_BASE_URL);
+        if (result.status === 401) {
+            // The cached dashboard shell can outlive the session
+            window.location.href = '/login';
+            return;
+        }
+        if (result.changed) {
+            trackers = await TrackerStore.getAll();
+            renderTrackers();
+            updateStats();
+        }
+    } catch (error) {
+        console.log('Tracker sync unavailable, showing local data:', error);
+    }
+}
+
+// Mirrors local deletions to the account; the next sync brings back anything that was not deleted
+async function deleteOnServer(ids) {
+    try {
+        await fetchJsonWithTimeout(API_BASE_URL + '/api/trackers/bulk', {
+            method: 'DELETE',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: ids })
+        }, 30000);
+        updateStats();
+    } catch (error) {
+        console.error('Server delete failed:', error);
+    }
+}
+
+// The list is keyed by tracker id: each tracker keeps its card element, updates only rewrite the
+// cells whose values changed, and only the rows around the viewport are attached to the DOM.
+const CARD_GAP = 20;           // .trackers-grid gap
+const CARD_OVERSCAN_ROWS = 2;  // rows kept above and below the viewport
+const CARD_FALLBACK_COUNT = 24;
+const LOGO_SPRITE = '/static/img/site-logos.svg';
+const SITE_LOGOS = [
+    ['amazon', 'amazon'], ['flipkart', 'flipkart'], ['myntra', 'myntra'], ['ajio', 'ajio'],
+    ['meesho', 'meesho'], ['snapdeal', 'snapdeal'], ['tatacliq', 'tatacliq'], ['tata', 'tatacliq'],
+    ['reliance', 'reliance'], ['ebay', 'ebay']
+];
+const CARD_TEMPLATE = '<div class="tracker-header"><div class="tracker-info"><div class="tracker-logo"><svg class="company-logo" aria-hidden="true"><use></use></svg></div><h4 class="tracker-name"></h4></div><div class="tracker-checkbox" data-action="select"><i class="fa fa-check" style="display: none;"></i></div></div><div class="tracker-url"></div><div class="tracker-prices"><div class="price-info current"><span class="price-label">Current</span><span class="price-amount"></span></div><div class="price-info target"><span class="price-label">Target</span><span class="price-amount"></span></div><div class="price-status"></div></div><div class="tracker-actions"><button class="tracker-action" data-action="trends"><i class="fa fa-chart-line"></i> Trends</button><button class="tracker-action" data-action="refresh"><i class="fa fa-refresh"></i> Refresh</button><button class="tracker-action delete" data-action="delete"><i class="fa fa-trash"></i></button></div>';
+
+const trackerCards = new Map();
+const selectedTrackers = new Set();
+let visibleTrackers = [];
+let cardRowHeight = 0;
+let cardRenderPending = false;
+
+function siteLogoId(url) {
+    const urlLower = (url || '').toLowerCase();
+    const match = SITE_LOGOS.find(([needle]) => urlLower.includes(needle));
+    return match ? match[1] : 'generic';
+}
+
+function createTrackerCard(tracker) {
+    const el = document.createElement('div');
+    el.className = 'tracker-card';
+    el.dataset.id = tracker.id;
+    el.innerHTML = CARD_TEMPLATE;
+    return {
+        el: el,
+        logo: el.querySelector('use'),
+        name: el.querySelector('.tracker-name'),
+        url: el.querySelector('.tracker-url'),
+        current: el.querySelector('.current .price-amount'),
+        target: el.querySelector('.target .price-amount'),
+        status: el.querySelector('.price-status'),
+        check: el.querySelector('.tracker-checkbox'),
+        shown: {}
+    };
+}
+
+function patchCell(card, key, value, apply) {
+    if (card.shown[key] === value) return;
+    card.shown[key] = value;
+    apply(value);
+}
+
+function patchTrackerCard(card, tracker) {
+    const symbol = tracker.currencySymbol || '$';
+    patchCell(card, 'logo', siteLogoId(tracker.url), id => card.logo.setAttribute('href', LOGO_SPRITE + '#logo-' + id));
+    patchCell(card, 'name', tracker.productName || 'Product', name => { card.name.textContent = name; });
+    patchCell(card, 'url', tracker.url, url => { card.url.textContent = url; });
+    patchCell(card, 'current', symbol + tracker.currentPrice, text => { card.current.textContent = text; });
+    patchCell(card, 'target', symbol + tracker.targetPrice, text => { card.target.textContent = text; });
+    patchCell(card, 'reached', checkPriceReached(tracker), reached => {
+        card.status.className = 'price-status ' + (reached ? 'status-reached' : 'status-active');
+        card.status.textContent = reached ? 'Target Reached!' : 'Active';
+    });
+    patchCell(card, 'selected', selectedTrackers.has(tracker.id), selected => {
+        card.check.classList.toggle('checked', selected);
+        card.check.firstChild.style.display = selected ? 'block' : 'none';
+    });
 }
 
 function renderTrackers() {
     const container = document.getElementById('trackers-list');
     if (trackers.length === 0) {
+        trackerCards.clear();
+        selectedTrackers.clear();
+        visibleTrackers = [];
+        container.style.padding = '';
         container.innerHTML = '<div class="empty-state"><div class="empty-icon"><i class="fa fa-rocket"></i></div><h3>No trackers yet!</h3><p>Create your first price alert to start saving money</p><button class="action-btn" onclick="switchView(\'new-alert\')"><span class="btn-text">Create Tracker</span><span class="btn-icon"><i class="fa fa-plus"></i></span></button></div>';
         return;
     }
     
     let filteredTrackers = trackers;
-    if (currentFilter !== 'all') {
+    if (serverSearch && serverSearch.loaded) {
+        // The server picked and ordered the matches; the local store supplies the current data
+        const byId = new Map(trackers.map(t => [t.id, t]));
+        filteredTrackers = serverSearch.ids.map(id => byId.get(id)).filter(Boolean);
+    } else if (currentFilter !== 'all' || searchTerms.length > 0) {
         filteredTrackers = trackers.filter(t => {
-            if (currentFilter === 'active') return t.currentPrice > t.targetPrice;
-            if (currentFilter === 'reached') return t.currentPrice <= t.targetPrice;
+            if (!matchesSearch(t)) return false;
+            if (currentFilter === 'active') return !checkPriceReached(t);
+            if (currentFilter === 'reached') return checkPriceReached(t);
             return true;
         });
     }
+    visibleTrackers = filteredTrackers;
     
-    // Function to get company logo based on URL
-    function getCompanyLogo(url) {
-        if (!url) return '<i class="fa fa-shopping-bag"></i>';
-        const urlLower = url.toLowerCase();
-        if (urlLower.includes('amazon')) return '<img src="https://upload.wikimedia.org/wikipedia/commons/a/a9/Amazon_logo.svg" alt="Amazon" class="company-logo" onerror="this.style.display=\'none\'; this.parentElement.innerHTML=\'<i class=\\\'fa fa-amazon\\\'></i>\'">';
-        if (urlLower.includes('flipkart')) return '<img src="https://upload.wikimedia.org/wikipedia/commons/2/2f/Flipkart_logo.svg" alt="Flipkart" class="company-logo" onerror="this.style.display=\'none\'; this.parentElement.innerHTML=\'<i class=\\\'fa fa-shopping-cart\\\'></i>\'">';
-        if (urlLower.includes('myntra')) return '<img src="https://upload.wikimedia.org/wikipedia/commons/2/24/Myntra_logo.svg" alt="Myntra" class="company-logo" onerror="this.style.display=\'none\'; this.parentElement.innerHTML=\'<i class=\\\'fa fa-tag\\\'></i>\'">';
-        if (urlLower.includes('ajio')) return '<i class="fa fa-shopping-bag"></i>';
-        if (urlLower.includes('meesho')) return '<i class="fa fa-mobile"></i>';
-        if (urlLower.includes('snapdeal')) return '<i class="fa fa-shopping-cart"></i>';
-        if (urlLower.includes('tatacliq') || urlLower.includes('tata')) return '<i class="fa fa-store"></i>';
-        if (urlLower.includes('reliance') || urlLower.includes('reliancedigital')) return '<i class="fa fa-laptop"></i>';
-        if (urlLower.includes('ebay')) return '<i class="fa fa-shopping-bag"></i>';
-        return '<i class="fa fa-shopping-bag"></i>';
+    // Forget the cards and selections of deleted trackers
+    if (trackerCards.size > trackers.length || selectedTrackers.size > 0) {
+        const ids = new Set(trackers.map(t => t.id));
+        trackerCards.forEach((_, id) => { if (!ids.has(id)) trackerCards.delete(id); });
+        selectedTrackers.forEach(id => { if (!ids.has(id)) selectedTrackers.delete(id); });
     }
     
-    container.innerHTML = filteredTrackers.map(tracker => {
-        const status = tracker.currentPrice <= tracker.targetPrice ? 'reached' : 'active';
-        const statusClass = status === 'reached' ? 'status-reached' : 'status-active';
-        const statusText = status === 'reached' ? 'Target Reached!' : 'Active';
-        
-        return '<div class="tracker-card" data-id="' + tracker.id + '"><div class="tracker-header"><div class="tracker-info"><div class="tracker-logo">' + getCompanyLogo(tracker.url) + '</div><h4 class="tracker-name">' + (tracker.productName || 'Product') + '</h4></div><div class="tracker-checkbox" onclick="event.stopPropagation(); toggleSelect(' + tracker.id + ')"><i class="fa fa-check" style="display: none;"></i></div></div><div class="tracker-url">' + tracker.url + '</div><div class="tracker-prices"><div class="price-info current"><span class="price-label">Current</span><span class="price-amount">' + (tracker.currencySymbol || '$') + tracker.currentPrice + '</span></div><div class="price-info target"><span class="price-label">Target</span><span class="price-amount">' + (tracker.currencySymbol || '$') + tracker.targetPrice + '</span></div><div class="price-status ' + statusClass + '">' + statusText + '</div></div><div class="tracker-actions"><button class="tracker-action" onclick="viewTrends(' + tracker.id + ')"><i class="fa fa-chart-line"></i> Trends</button><button class="tracker-action" onclick="refreshPrice(' + tracker.id + ')"><i class="fa fa-refresh"></i> Refresh</button><button class="tracker-action delete" onclick="deleteTracker(' + tracker.id + ')"><i class="fa fa-trash"></i></button></div>';
-    }).join('');
-    
+    renderVisibleCards();
     updateCounts();
 }
 
-function updateStats() {
-    document.getElementById('sidebar-active-trackers').textContent = trackers.length;
-    document.getElementById('sidebar-deals').textContent = trackers.filter(t => t.currentPrice <= t.targetPrice).length;
-    document.getElementById('total-trackers').textContent = trackers.length;
-    document.getElementById('active-deals').textContent = trackers.filter(t => t.currentPrice <= t.targetPrice).length;
+function renderVisibleCards() {
+    cardRenderPending = false;
+    const container = document.getElementById('trackers-list');
+    if (!container || trackers.length === 0) return;
+    if (container.querySelector('.empty-state')) container.innerHTML = '';
+    
+    // Rows start at the container's top edge; padding stands in for the rows that are not attached.
+    // While the dashboard view is hidden there is nothing to measure, so attach the first few cards.
+    const scrollRoot = container.closest('.app-main');
+    const shown = container.offsetParent !== null && scrollRoot && scrollRoot.clientHeight > 0;
+    const columns = shown ? Math.max(1, getComputedStyle(container).gridTemplateColumns.split(' ').length) : 1;
+    const rowPitch = (cardRowHeight || 260) + CARD_GAP;
+    const rows = Math.ceil(visibleTrackers.length / columns);
+    let firstRow = 0;
+    let lastRow = Math.ceil(CARD_FALLBACK_COUNT / columns);
+    if (shown) {
+        const offset = scrollRoot.getBoundingClientRect().top - container.getBoundingClientRect().top;
+        firstRow = Math.max(0, Math.floor(offset / rowPitch) - CARD_OVERSCAN_ROWS);
+        lastRow = Math.ceil((offset + scrollRoot.clientHeight) / rowPitch) + CARD_OVERSCAN_ROWS;
+    }
+    lastRow = Math.min(rows, Math.max(lastRow, firstRow + 1));
+    firstRow = Math.min(firstRow, Math.max(0, lastRow - 1));
+    if (serverSearch && serverSearch.loaded && lastRow >= rows - CARD_OVERSCAN_ROWS) loadSearchPage();
+    container.style.paddingTop = (firstRow * rowPitch) + 'px';
+    container.style.paddingBottom = ((rows - lastRow) * rowPitch) + 'px';
+    
+    // Keyed reconcile: reuse each tracker's card, move it into place, detach whatever is left over
+    let next = container.firstChild;
+    for (const tracker of visibleTrackers.slice(firstRow * columns, lastRow * columns)) {
+        let card = trackerCards.get(tracker.id);
+        if (!card) {
+            card = createTrackerCard(tracker);
+            trackerCards.set(tracker.id, card);
+        }
+        patchTrackerCard(card, tracker);
+        if (card.el === next) {
+            next = next.nextSibling;
+        } else {
+            container.insertBefore(card.el, next);
+        }
+    }
+    while (next) {
+        const after = next.nextSibling;
+        container.removeChild(next);
+        next = after;
+    }
     
-    if (trackers.length > 0) {
-        const totalSavings = trackers
-            .filter(t => t.currentPrice <= t.targetPrice)
-            .reduce((sum, t) => sum + (t.targetPrice - t.currentPrice), 0);
-        const avgSavings = trackers.length > 0 ? Math.round((totalSavings / trackers.length) * 10) / 10 : 0;
-        document.getElementById('avg-savings').textContent = avgSavings + '%';
+    const measured = container.firstChild ? container.firstChild.offsetHeight : 0;
+    if (measured > 0 && measured !== cardRowHeight) {
+        cardRowHeight = measured;
+        scheduleCardRender();
+    }
+}
+
+function scheduleCardRender() {
+    if (cardRenderPending) return;
+    cardRenderPending = true;
+    requestAnimationFrame(renderVisibleCards);
+}
+
+// Listeners sit on the document: initTilt() replaces the dashboard markup with a clone, which drops
+// listeners attached to elements inside it
+document.addEventListener('scroll', scheduleCardRender, true);
+window.addEventListener('resize', scheduleCardRender);
+document.addEventListener('click', event => {
+    const action = event.target.closest('#trackers-list [data-action]');
+    if (!action) return;
+    event.stopPropagation();
+    const cardId = action.closest('.tracker-card').dataset.id;
+    const tracker = trackers.find(t => String(t.id) === cardId);
+    if (!tracker) return;
+    if (action.dataset.action === 'select') toggleSelect(tracker.id);
+    if (action.dataset.action === 'trends') viewTrends(tracker.id);
+    if (action.dataset.action === 'refresh') refreshPrice(tracker.id);
+    if (action.dataset.action === 'delete') deleteTracker(tracker.id);
+});
+
+// Exchange rates from /api/fx/rates (units of each currency per unit of the base currency), so
+// trackers priced in different currencies can be added up and sorted together
+let fxRates = null;
+
+async function loadFxRates() {
+    try {
+        const response = await fetch(API_BASE_URL + '/api/fx/rates');
+        if (!response.ok) return;
+        fxRates = (await response.json()).rates;
+        updateStats();
+    } catch (error) {
+        console.warn('Exchange rates unavailable:', error);
+    }
+}
+
+// amount (in currency `from`) in currency `to`; null when either has no rate
+function convertAmount(amount, from, to) {
+    if (from === to) return amount;
+    if (!fxRates || !fxRates[from] || !fxRates[to]) return null;
+    return amount / fxRates[from] * fxRates[to];
+}
+
+// Price in the rates' base currency for sorting; unconvertible prices compare as they are
+function comparablePrice(tracker) {
+    const converted = fxRates && fxRates[tracker.currency] ? tracker.currentPrice / fxRates[tracker.currency] : null;
+    return converted === null ? tracker.currentPrice : converted;
+}
+
+// The currency most of the user's trackers are priced in, and its symbol
+function displayCurrency() {
+    const counts = new Map();
+    let best = null;
+    for (const t of trackers) {
+        const entry = counts.get(t.currency) || { count: 0, symbol: t.currencySymbol };
+        entry.count++;
+        counts.set(t.currency, entry);
+        if (!best || entry.count > counts.get(best).count) best = t.currency;
+    }
+    return { currency: best, symbol: best ? counts.get(best).symbol || '' : '' };
+}
+
+// One pass over the trackers for every header and filter-tab count
+function trackerCounts() {
+    let reached = 0;
+    let active = 0;
+    let savings = 0;
+    const display = displayCurrency();
+    for (const t of trackers) {
+        if (checkPriceReached(t)) {
+            reached++;
+            // Savings in a currency without a rate are left out rather than added as the wrong amount
+            savings += convertAmount(t.targetPrice - t.currentPrice, t.currency, display.currency) || 0;
+        } else {
+            active++;
+        }
+    }
+    return { total: trackers.length, reached: reached, active: active, savings: savings, display: display };
+}
+
+function showStats(total, reached, savings, symbol) {
+    document.getElementById('sidebar-active-trackers').textContent = total;
+    document.getElementById('sidebar-deals').textContent = reached;
+    document.getElementById('total-trackers').textContent = total;
+    document.getElementById('active-deals').textContent = reached;
+    
+    if (total > 0 && savings !== null) {
+        const avgSavings = Math.round((savings / total) * 100) / 100;
+        document.getElementById('avg-savings').textContent = symbol + avgSavings.toLocaleString();
+    }
+}
+
+// The header shows /api/dashboard/summary; local counts fill in straight away and whenever it can't be reached
+const SUMMARY_DELAY = 250;  // ms; a burst of local changes makes one summary request
+let summaryTimer = null;
+let summaryRequest = 0;
+
+function updateStats() {
+    const counts = trackerCounts();
+    showStats(counts.total, counts.reached, counts.savings, counts.display.symbol);
+    clearTimeout(summaryTimer);
+    const request = ++summaryRequest;
+    summaryTimer = setTimeout(() => loadSummary(request), SUMMARY_DELAY);
+}
+
+async function loadSummary(request) {
+    const display = displayCurrency();
+    const query = display.currency ? '?currency=' + encodeURIComponent(display.currency) : '';
+    try {
+        const response = await fetch(API_BASE_URL + '/api/dashboard/summary' + query);
+        // An answer overtaken by a newer local change must not overwrite the header
+        if (!response.ok || request !== summaryRequest) return;
+        const summary = await response.json();
+        showStats(summary.totalTrackers, summary.reached,
+                  summary.totalSavings ? summary.totalSavings.amount : null, display.symbol);
+    } catch (error) {
+        console.log('Dashboard summary unavailable, showing local counts:', error);
     }
 }
 
 function updateCounts() {
-    document.getElementById('count-all').textContent = trackers.length;
-    document.getElementById('count-active').textContent = trackers.filter(t => t.currentPrice > t.targetPrice).length;
-    document.getElementById('count-reached').textContent = trackers.filter(t => t.currentPrice <= t.targetPrice).length;
+    const counts = trackerCounts();
+    document.getElementById('count-all').textContent = counts.total;
+    document.getElementById('count-active').textContent = counts.active;
+    document.getElementById('count-reached').textContent = counts.reached;
 }
 
 function setFilter(filter) {
@@ -616,15 +875,85 @@ function setFilter(filter) {
         tab.classList.remove('active');
         if (tab.dataset.filter === filter) tab.classList.add('active');
     });
-    renderTrackers();
+    startSearch();
+}
+
+// A search runs against /api/trackers/search, a page at a time as the list scrolls, with the filter
+// tab and sort order applied there too. Until the first page arrives (or if it can't), the local
+// trackers are matched the same way: every query word is a prefix of a word in the name or URL.
+const SEARCH_PAGE_SIZE = 50;
+const SEARCH_DELAY = 200;  // ms after the last keystroke
+let serverSearch = null;   // { params, ids, total, loaded, loading } for the query on screen
+let searchTimer = null;
+let searchTerms = [];
+const searchWords = new WeakMap();
+
+function splitWords(text) {
+    return text.toLowerCase().split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+}
+
+function matchesSearch(tracker) {
+    if (searchTerms.length === 0) return true;
+    const text = (tracker.productName || '') + ' ' + (tracker.url || '');
+    let cached = searchWords.get(tracker);
+    if (!cached || cached.text !== text) {
+        cached = { text: text, words: splitWords(text) };
+        searchWords.set(tracker, cached);
+    }
+    return searchTerms.every(term => cached.words.some(word => word.startsWith(term)));
 }
 
 function filterTrackers() {
-    const search = document.getElementById('tracker-search').value.toLowerCase();
-    const cards = document.querySelectorAll('.tracker-card');
-    cards.forEach(card => {
-        card.style.display = card.textContent.toLowerCase().includes(search) ? 'block' : 'none';
-    });
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(startSearch, SEARCH_DELAY);
+    searchTerms = splitWords(document.getElementById('tracker-search').value);
+    serverSearch = null;
+    renderTrackers();
+}
+
+function startSearch() {
+    clearTimeout(searchTimer);
+    searchTerms = splitWords(document.getElementById('tracker-search').value);
+    serverSearch = null;
+    if (searchTerms.length > 0) {
+        serverSearch = {
+            params: {
+                q: searchTerms.join(' '),
+                status: currentFilter,
+                sort: document.getElementById('sort-trackers').value
+            },
+            ids: [], total: Infinity, loaded: false, loading: false
+        };
+        loadSearchPage();
+    }
+    renderTrackers();
+}
+
+async function loadSearchPage() {
+    const search = serverSearch;
+    if (!search || search.loading || search.ids.length >= search.total) return;
+    search.loading = true;
+    const query = new URLSearchParams(Object.assign({ limit: SEARCH_PAGE_SIZE, offset: search.ids.length }, search.params));
+    try {
+        const response = await fetch(API_BASE_URL + '/api/trackers/search?' + query);
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        const page = await response.json();
+        if (search !== serverSearch) return;
+        search.ids.push(...page.trackers.map(t => t.id));
+        search.total = page.trackers.length < SEARCH_PAGE_SIZE ? search.ids.length : page.total;
+        search.loaded = true;
+        search.loading = false;
+        renderTrackers();
+    } catch (error) {
+        console.log('Tracker search unavailable, matching locally:', error);
+        if (search === serverSearch && !search.loaded) {
+            serverSearch = null;
+            renderTrackers();
+        }
+        // Keep the pages already shown rather than retrying on every scroll
+        search.total = search.ids.length;
+        search.loading = false;
+    }
 }
 
 function sortTrackers() {
@@ -632,10 +961,10 @@ function sortTrackers() {
     trackers.sort((a, b) => {
         if (sortBy === 'date') return new Date(b.createdAt) - new Date(a.createdAt);
         if (sortBy === 'name') return (a.productName || '').localeCompare(b.productName || '');
-        if (sortBy === 'price') return a.currentPrice - b.currentPrice;
+        if (sortBy === 'price') return comparablePrice(a) - comparablePrice(b);
         return 0;
     });
-    renderTrackers();
+    startSearch();
 }
 
 // ==================== PRICE REFRESH ====================
@@ -644,8 +973,8 @@ async function refreshPrice(trackerId) {
     const tracker = trackers.find(t => t.id === trackerId);
     if (!tracker) return;
     
-    const card = document.querySelector('.tracker-card[data-id="' + trackerId + '"]');
-    const refreshBtn = card?.querySelector('.tracker-action[onclick*="refreshPrice"]');
+    const card = trackerCards.get(trackerId);
+    const refreshBtn = card?.el.querySelector('[data-action="refresh"]');
     
     if (refreshBtn) {
         refreshBtn.disabled = true;
@@ -666,7 +995,10 @@ async function refreshPrice(trackerId) {
         
         const data = await response.json();
         
-        if (response.ok) {
+        if (response.ok && data.stale) {
+            // The store didn't answer in time; the server sent the last price it has
+            showToast('error', 'The store is responding slowly - showing the last known price');
+        } else if (response.ok) {
             const oldPrice = tracker.currentPrice;
             tracker.currentPrice = data.price;
             tracker.productName = data.productName || tracker.productName;
@@ -679,7 +1011,7 @@ async function refreshPrice(trackerId) {
                 }, 500);
             }
             
-            localStorage.setItem('trackers', JSON.stringify(trackers));
+            TrackerStore.put(tracker);
             showToast('success', 'Price updated: ' + (data.currency_symbol || '$') + data.price);
             renderTrackers();
             updateStats();
@@ -698,25 +1030,31 @@ async function refreshPrice(trackerId) {
 function deleteTracker(trackerId) {
     if (!confirm('Are you sure you want to delete this tracker?')) return;
     trackers = trackers.filter(t => t.id !== trackerId);
-    localStorage.setItem('trackers', JSON.stringify(trackers));
+    TrackerStore.remove(trackerId);
+    deleteOnServer([trackerId]);
     renderTrackers();
     updateStats();
     showToast('success', 'Tracker deleted');
 }
 
 function toggleSelect(trackerId) {
-    const checkbox = document.querySelector('.tracker-card[data-id="' + trackerId + '"] .tracker-checkbox');
-    checkbox.classList.toggle('checked');
-    const icon = checkbox.querySelector('i');
-    icon.style.display = checkbox.classList.contains('checked') ? 'block' : 'none';
+    if (!selectedTrackers.delete(trackerId)) selectedTrackers.add(trackerId);
+    const card = trackerCards.get(trackerId);
+    const tracker = trackers.find(t => t.id === trackerId);
+    if (card && tracker) patchTrackerCard(card, tracker);
 }
 
 // ==================== PRICE TRENDS ====================
 
-function viewTrends(trackerId) {
+let currentPeriod = '7d';
+let currentSummary = null;
+const PERIOD_DAYS = { '7d': 7, '30d': 30, '90d': 90 };
+
+async function viewTrends(trackerId) {
     const tracker = trackers.find(t => t.id === trackerId);
     if (!tracker) return;
     currentTracker = tracker;
+    currentSummary = null;
     switchView('price-trends');
     
     document.querySelector('.product-details h3').textContent = tracker.productName || 'Product';
@@ -729,36 +1067,56 @@ function viewTrends(trackerId) {
     
     generateChart(tracker);
     
-    const prediction = tracker.currentPrice <= tracker.targetPrice ? 'Price is at or below your target!' : 'Price may drop further';
-    document.getElementById('prediction-text').textContent = prediction;
-    document.getElementById('confidence').textContent = '85%';
+    // Stats and prediction come from the server's precomputed price-history summary
+    try {
+        const { response, data } = await fetchJsonWithTimeout(
+            API_BASE_URL + '/api/analytics/product?url=' + encodeURIComponent(tracker.url));
+        if (currentTracker !== tracker) return;
+        currentSummary = response.ok ? data : null;
+    } catch (e) {
+        currentSummary = null;
+    }
+    generateChart(tracker);
+}
+
+function predictionText(tracker, summary) {
+    if (!summary) {
+        return checkPriceReached(tracker) ? 'Price is at or below your target!' : 'Not enough price history yet';
+    }
+    const chance = Math.round(summary.dropProbability * 100);
+    if (summary.recommendation === 'wait') return 'Likely to drop soon (' + chance + '% chance within a week) - consider waiting';
+    if (summary.recommendation === 'buy') return 'Good time to buy - a drop within a week is unlikely (' + chance + '%)';
+    return 'Price is stable - ' + chance + '% chance of a drop within a week';
 }
 
 function generateChart(tracker) {
     const chartContainer = document.querySelector('.chart-main');
-    const days = 7;
-    const data = [];
-    let basePrice = tracker.currentPrice;
+    const symbol = tracker.currencySymbol || '$';
+    const summary = currentSummary;
+    const days = PERIOD_DAYS[currentPeriod] || 7;
+    // The series ends today; days before the first observation are null
+    const data = summary ? summary.series.slice(-days) : [tracker.currentPrice];
+    const prices = data.filter(price => price !== null);
+    const labelEvery = Math.ceil(data.length / 7);
     
-    for (let i = 0; i < days; i++) {
-        const variation = (Math.random() - 0.5) * basePrice * 0.1;
-        data.push(basePrice + variation);
-    }
-    data[days - 1] = tracker.currentPrice;
-    
-    const maxPrice = Math.max(...data);
+    const maxPrice = Math.max(...prices);
     chartContainer.innerHTML = '<div class="chart-placeholder"><div class="chart-line">' + 
-        data.map(price => '<div class="chart-bar" style="height: ' + ((price / maxPrice) * 150) + 'px;" title="' + price.toFixed(2) + '"></div>').join('') + 
+        data.map(price => price === null ? '<div class="chart-bar" style="height: 0px;"></div>' :
+            '<div class="chart-bar" style="height: ' + ((price / maxPrice) * 150) + 'px;" title="' + price.toFixed(2) + '"></div>').join('') + 
         '</div><div class="chart-labels">' + 
-        Array.from({length: days}, (_, i) => { 
+        Array.from({length: data.length}, (_, i) => { 
+            if ((data.length - 1 - i) % labelEvery !== 0) return '<span></span>';
             const date = new Date(); 
-            date.setDate(date.getDate() - (days - 1 - i)); 
+            date.setDate(date.getDate() - (data.length - 1 - i)); 
             return '<span>' + date.toLocaleDateString('en-US', {month: 'short', day: 'numeric'}) + '</span>'; 
         }).join('') + '</div>';
     
-    document.getElementById('trend-lowest').textContent = (tracker.currencySymbol || '$') + Math.min(...data).toFixed(2);
-    document.getElementById('trend-highest').textContent = (tracker.currencySymbol || '$') + Math.max(...data).toFixed(2);
+    const stats = summary ? summary.windows[currentPeriod] : null;
+    document.getElementById('trend-lowest').textContent = symbol + (stats && stats.min !== null ? stats.min : Math.min(...prices)).toFixed(2);
+    document.getElementById('trend-highest').textContent = symbol + (stats && stats.max !== null ? stats.max : Math.max(...prices)).toFixed(2);
     document.getElementById('trend-since').textContent = new Date(tracker.createdAt).toLocaleDateString();
+    document.getElementById('prediction-text').textContent = predictionText(tracker, summary);
+    document.getElementById('confidence').textContent = summary ? Math.round(summary.confidence * 100) + '%' : '-';
     
     // Only show buy now button if tracker has valid URL
     const buyNowBtn = document.getElementById('buy-now-btn');
@@ -768,7 +1126,7 @@ function generateChart(tracker) {
                            typeof tracker.url === 'string' && 
                            tracker.url.trim().length >= 10 &&
                            /^https?:\/\//i.test(tracker.url.trim());
-        buyNowBtn.style.display = (tracker.currentPrice <= tracker.targetPrice && hasValidUrl) ? 'flex' : 'none';
+        buyNowBtn.style.display = (checkPriceReached(tracker) && hasValidUrl) ? 'flex' : 'none';
         if (hasValidUrl) {
             buyNowBtn.onclick = () => openSafeUrl(tracker.url.trim(), true);
         }
@@ -776,9 +1134,9 @@ function generateChart(tracker) {
 }
 
 function setTimePeriod(period) {
+    currentPeriod = period;
     document.querySelectorAll('.time-btn').forEach(btn => {
-        btn.classList.remove('active');
-        if (btn.textContent.toLowerCase().includes(period)) btn.classList.add('active');
+        btn.classList.toggle('active', btn.textContent.trim().startsWith(String(PERIOD_DAYS[period]) + ' '));
     });
     if (currentTracker) generateChart(currentTracker);
 }
@@ -923,10 +1281,11 @@ function importData(input) {
             const imported = JSON.parse(e.target.result);
             if (Array.isArray(imported)) {
                 trackers = imported;
-                localStorage.setItem('trackers', JSON.stringify(trackers));
+                TrackerStore.replaceAll(imported);
                 renderTrackers();
                 updateStats();
                 showToast('success', 'Data imported successfully');
+                syncImportedTrackers(imported);
             }
         } catch (error) {
             showToast('error', 'Invalid file format');
@@ -935,10 +1294,33 @@ function importData(input) {
     reader.readAsText(file);
 }
 
+async function syncImportedTrackers(imported) {
+    // Mirror imported trackers to the server in one bulk request
+    try {
+        const { response, data } = await fetchJsonWithTimeout(API_BASE_URL + '/api/trackers/bulk', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(imported)
+        }, 30000);
+        if (response.ok && data.created) {
+            showToast('success', data.created + ' tracker(s) synced to your account');
+        }
+        if (response.ok) {
+            // The account now holds the imported trackers under its own ids; take its list as-is
+            await TrackerStore.resetSync();
+            syncTrackers();
+        }
+    } catch (error) {
+        console.error('Bulk sync failed:', error);
+    }
+}
+
 function clearAllData() {
     if (!confirm('Are you sure you want to delete all trackers? This cannot be undone.')) return;
+    const ids = trackers.map(t => t.id);
     trackers = [];
-    localStorage.setItem('trackers', JSON.stringify(trackers));
+    TrackerStore.removeMany(ids);
+    deleteOnServer(ids);
     renderTrackers();
     updateStats();
     showToast('success', 'All data cleared');
@@ -947,18 +1329,17 @@ function clearAllData() {
 function exportTrackers() { exportData(); }
 
 function deleteSelected() {
-    const selected = document.querySelectorAll('.tracker-checkbox.checked');
-    if (selected.length === 0) {
+    // Selection lives in selectedTrackers, so cards scrolled out of the DOM still count
+    if (selectedTrackers.size === 0) {
         showToast('error', 'No trackers selected');
         return;
     }
-    if (!confirm('Delete ' + selected.length + ' tracker(s)?')) return;
-    selected.forEach(checkbox => {
-        const card = checkbox.closest('.tracker-card');
-        const id = parseInt(card.dataset.id);
-        trackers = trackers.filter(t => t.id !== id);
-    });
-    localStorage.setItem('trackers', JSON.stringify(trackers));
+    if (!confirm('Delete ' + selectedTrackers.size + ' tracker(s)?')) return;
+    const ids = [...selectedTrackers];
+    trackers = trackers.filter(t => !selectedTrackers.has(t.id));
+    selectedTrackers.clear();
+    TrackerStore.removeMany(ids);
+    deleteOnServer(ids);
     renderTrackers();
     updateStats();
     document.getElementById('bulk-actions').style.display = 'none';
@@ -1074,6 +1455,7 @@ async function autoRefreshAllPrices() {
     lastRefreshTime = new Date();
     
     let updatedCount = 0;
+    const refreshed = [];
     try {
         for (const tracker of trackers) {
             try {
@@ -1083,8 +1465,9 @@ async function autoRefreshAllPrices() {
                     body: JSON.stringify({ url: tracker.url })
                 });
                 
-                if (response.ok) {
-                    const data = await response.json();
+                const data = response.ok ? await response.json() : null;
+                // A stale answer is the price we already have; it doesn't count as refreshed
+                if (data && !data.stale) {
                     const oldPrice = tracker.currentPrice;
                     tracker.currentPrice = data.price;
                     tracker.productName = data.productName || tracker.productName;
@@ -1094,6 +1477,7 @@ async function autoRefreshAllPrices() {
                         celebrationTracker = tracker;
                         showCelebration(tracker);
                     }
+                    refreshed.push(tracker);
                     updatedCount++;
                 }
             } catch (error) {
@@ -1101,8 +1485,10 @@ async function autoRefreshAllPrices() {
             }
         }
         
-        // Save updated trackers
-        localStorage.setItem('trackers', JSON.stringify(trackers));
+        // Save the refreshed records (skipping any deleted meanwhile), then pick up changes from other devices
+        const current = new Set(trackers.map(t => t.id));
+        await TrackerStore.putMany(refreshed.filter(t => current.has(t.id)));
+        await syncTrackers();
         
         // Update UI
         renderTrackers();
@@ -1199,6 +1585,13 @@ document.addEventListener('DOMContentLoaded', () => {
     addManualRefreshButton();
 });
 
+// Cache the dashboard shell so repeat visits render from local data before the network answers
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(error => console.log('Service worker not registered:', error));
+    });
+}
+
 // Stop auto-refresh when leaving the page
 window.addEventListener('beforeunload', () => {
     stopAutoRefresh();
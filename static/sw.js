@@ -0,0 +1,56 @@
+// Dashboard service worker - serves the app shell from cache and refreshes it in the background, so a
+// repeat visit renders straight away from the trackers in IndexedDB. API requests always go to the
+// network; the last known prices are the ones stored in IndexedDB.
+const SHELL_CACHE = 'price-alerter-shell-v1';
+const SHELL_URLS = [
+    '/dashboard',
+    '/static/script.js',
+    '/static/tracker-store.js',
+    '/static/style.css',
+    '/static/img/site-logos.svg'
+];
+
+// Only real pages go in the cache - never a redirect to the login page or an error
+function cacheable(response) {
+    return response && response.ok && !response.redirected && response.type === 'basic';
+}
+
+async function refresh(cache, url) {
+    const response = await fetch(url, { cache: 'no-cache' });
+    if (cacheable(response)) await cache.put(url, response.clone());
+    return response;
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        await Promise.all(SHELL_URLS.map(url => refresh(cache, url).catch(() => null)));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => name !== SHELL_CACHE).map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin || !SHELL_URLS.includes(url.pathname)) {
+        return;
+    }
+    // Stale-while-revalidate: answer from the cache, fetch the current version for next time
+    event.respondWith((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        const cached = await cache.match(url.pathname);
+        const network = refresh(cache, url.pathname);
+        if (cached) {
+            event.waitUntil(network.catch(() => null));
+            return cached;
+        }
+        return network;
+    })());
+});
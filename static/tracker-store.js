@@ -0,0 +1,148 @@
+// Tracker data layer - trackers live in IndexedDB, one record per tracker, and are kept in step with
+// the server through /api/trackers?since=<cursor>. Where IndexedDB is unavailable (some private
+// browsing modes) the same interface is backed by localStorage, as the dashboard used to be.
+const TrackerStore = (() => {
+    const DB_NAME = 'price-alerter';
+    const DB_VERSION = 1;
+    const SYNC_PAGE_SIZE = 500;
+    let dbPromise = null;
+    let syncPromise = null;
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                if (!window.indexedDB) {
+                    reject(new Error('IndexedDB is not available'));
+                    return;
+                }
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    const store = db.createObjectStore('trackers', { keyPath: 'id' });
+                    db.createObjectStore('meta');
+                    // Carry over the trackers the dashboard kept in localStorage
+                    JSON.parse(localStorage.getItem('trackers') || '[]').forEach(tracker => store.put(tracker));
+                };
+                request.onsuccess = () => {
+                    localStorage.removeItem('trackers');
+                    resolve(request.result);
+                };
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    // Runs work(stores) in one transaction and resolves with its request's result once committed
+    async function transaction(storeNames, mode, work) {
+        const db = await openDb();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(storeNames, mode);
+            const stores = storeNames.map(name => tx.objectStore(name));
+            const request = work(...stores);
+            tx.oncomplete = () => resolve(request ? request.result : undefined);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+
+    const indexedDbBackend = {
+        getAll: () => transaction(['trackers'], 'readonly', store => store.getAll()),
+        putMany: trackers => transaction(['trackers'], 'readwrite', store => { trackers.forEach(t => store.put(t)); }),
+        removeMany: ids => transaction(['trackers'], 'readwrite', store => { ids.forEach(id => store.delete(id)); }),
+        getMeta: key => transaction(['meta'], 'readonly', meta => meta.get(key)),
+        setMeta: (key, value) => transaction(['meta'], 'readwrite', meta => { meta.put(value, key); }),
+        // Changes, deletions and the new sync position are committed together or not at all
+        apply: (changes, deletedIds, metaUpdates, replace) =>
+            transaction(['trackers', 'meta'], 'readwrite', (store, meta) => {
+                if (replace) store.clear();
+                deletedIds.forEach(id => store.delete(id));
+                changes.forEach(t => store.put(t));
+                Object.entries(metaUpdates).forEach(([key, value]) => meta.put(value, key));
+            })
+    };
+
+    const localStorageBackend = {
+        read: () => JSON.parse(localStorage.getItem('trackers') || '[]'),
+        write: trackers => localStorage.setItem('trackers', JSON.stringify(trackers)),
+        meta: () => JSON.parse(localStorage.getItem('trackerSync') || '{}'),
+        async getAll() { return this.read(); },
+        async putMany(trackers) {
+            const byId = new Map(this.read().map(t => [t.id, t]));
+            trackers.forEach(t => byId.set(t.id, t));
+            this.write([...byId.values()]);
+        },
+        async removeMany(ids) {
+            const gone = new Set(ids);
+            this.write(this.read().filter(t => !gone.has(t.id)));
+        },
+        async getMeta(key) { return this.meta()[key]; },
+        async setMeta(key, value) {
+            localStorage.setItem('trackerSync', JSON.stringify({ ...this.meta(), [key]: value }));
+        },
+        async apply(changes, deletedIds, metaUpdates, replace) {
+            if (replace) this.write([]);
+            await this.removeMany(deletedIds);
+            await this.putMany(changes);
+            localStorage.setItem('trackerSync', JSON.stringify({ ...this.meta(), ...metaUpdates }));
+        }
+    };
+
+    let backendPromise = null;
+    function backend() {
+        if (!backendPromise) {
+            backendPromise = openDb().then(() => indexedDbBackend, error => {
+                console.warn('Falling back to localStorage for trackers:', error);
+                return localStorageBackend;
+            });
+        }
+        return backendPromise;
+    }
+
+    // Pulls every page of changes after the stored cursor. Starting from cursor 0 (first visit, or
+    // another account signed in on this browser) the server's list replaces the local one.
+    async function pull(apiBase) {
+        const store = await backend();
+        let cursor = (await store.getMeta('syncCursor')) || 0;
+        let userId = await store.getMeta('userId');
+        let changed = false;
+        let replace = cursor === 0;
+        for (;;) {
+            const response = await fetch(apiBase + '/api/trackers?since=' + cursor + '&limit=' + SYNC_PAGE_SIZE);
+            if (!response.ok) return { changed: changed, status: response.status };
+            const page = await response.json();
+            if (cursor !== 0 && page.userId !== userId) {
+                cursor = 0;
+                replace = true;
+                continue;
+            }
+            if (replace || page.trackers.length > 0 || page.deleted.length > 0) {
+                await store.apply(page.trackers, page.deleted, { syncCursor: page.cursor, userId: page.userId }, replace);
+                changed = true;
+            } else if (page.cursor !== cursor) {
+                await store.setMeta('syncCursor', page.cursor);
+            }
+            replace = false;
+            cursor = page.cursor;
+            userId = page.userId;
+            if (!page.more) return { changed: changed, status: response.status };
+        }
+    }
+
+    return {
+        async getAll() { return (await backend()).getAll(); },
+        async put(tracker) { return (await backend()).putMany([tracker]); },
+        async putMany(trackers) { return (await backend()).putMany(trackers); },
+        async remove(id) { return (await backend()).removeMany([id]); },
+        async removeMany(ids) { return (await backend()).removeMany(ids); },
+        async replaceAll(trackers) { return (await backend()).apply(trackers, [], {}, true); },
+        async resetSync() { return (await backend()).setMeta('syncCursor', 0); },
+        // Concurrent callers share one pull
+        sync(apiBase) {
+            if (!syncPromise) {
+                syncPromise = pull(apiBase).finally(() => { syncPromise = null; });
+            }
+            return syncPromise;
+        }
+    };
+})();
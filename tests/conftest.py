@@ -0,0 +1,47 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py reads its configuration at import time, so point it at a scratch directory first
+_workdir = tempfile.mkdtemp(prefix='price-alerter-tests-')
+os.environ.setdefault('DATABASE_PATH', os.path.join(_workdir, 'test.db'))
+os.environ.setdefault('METRICS_DIR', os.path.join(_workdir, 'metrics'))
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('MAINTENANCE_INTERVAL', '0')
+
+_users = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    # No background threads (scrape worker, schedulers): tests call what they need directly
+    app._services_pid = os.getpid()
+    return app
+
+
+def signed_in_client(app_module):
+    """A test client logged in as a fresh user"""
+    client = app_module.app.test_client()
+    number = next(_users)
+    email = f'user{number}@example.com'
+    response = client.post('/signup', json={'username': f'user{number}', 'email': email, 'password': 'password123'})
+    assert response.status_code == 201, response.get_json()
+    client.post('/login', json={'email': email, 'password': 'password123'})
+    return client
+
+
+@pytest.fixture
+def client(app_module):
+    return signed_in_client(app_module)
+
+
+@pytest.fixture
+def make_client(app_module):
+    return lambda: signed_in_client(app_module)
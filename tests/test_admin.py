@@ -0,0 +1,41 @@
+import pytest
+
+ADMIN_PATHS = ['/api/diagnostics/scraper', '/api/admin/profiles']
+
+
+@pytest.mark.parametrize('path', ADMIN_PATHS)
+def test_admin_endpoints_off_without_token(app_module, monkeypatch, path):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', None)
+    client = app_module.app.test_client()
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={'Authorization': 'Bearer '}).status_code == 404
+
+
+@pytest.mark.parametrize('path', ADMIN_PATHS)
+def test_admin_endpoints_require_token(app_module, monkeypatch, path):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    client = app_module.app.test_client()
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_profile_download_off_without_token(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', None)
+    assert app_module.app.test_client().get('/api/admin/profiles/missing').status_code == 404
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    assert app_module.app.test_client().get('/api/admin/profiles/missing').status_code == 401
+
+
+@pytest.mark.parametrize('token, configured, mode', [
+    ('secret', 'secret', 'cprofile'),
+    ('wrong', 'secret', None),
+    ('', 'secret', None),
+    ('', None, None),
+    ('secret', None, None),
+])
+def test_profile_header_needs_admin_token(app_module, monkeypatch, token, configured, mode):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', configured)
+    monkeypatch.setattr(app_module, 'PROFILE_SAMPLE_RATE', 0)
+    headers = {'X-Profile': 'cprofile', 'X-Profile-Token': token}
+    with app_module.app.test_request_context('/api/trackers', headers=headers):
+        assert app_module.requested_profile_mode() == mode
@@ -0,0 +1,115 @@
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import analytics
+from analytics import DAY
+
+nan = np.nan
+
+
+def test_daily_closes_fills_gaps_and_keeps_the_days_last_price():
+    end = 10 * DAY
+    # Product 0: seeded before the window, two prices on day 1 (given out of order), a gap, then day 4.
+    # Product 1 starts on day 3; product 2 has nothing; the observation after `end` is ignored.
+    product_index = np.array([0, 0, 0, 0, 1, 0])
+    timestamps = np.array([3 * DAY, 6 * DAY + 500, 6 * DAY + 10, 9 * DAY, 8 * DAY, 11 * DAY])
+    prices = np.array([100.0, 80.0, 90.0, 70.0, 50.0, 1.0])
+    closes, observed = analytics.daily_closes(product_index, timestamps, prices, 3, end, days=5)
+    np.testing.assert_array_equal(closes, [[100, 80, 80, 80, 70], [nan, nan, nan, 50, 50], [nan] * 5])
+    np.testing.assert_array_equal(observed, [[False, True, False, False, True],
+                                             [False, False, False, True, False], [False] * 5])
+
+
+def test_moving_average_on_short_series():
+    closes = np.array([[nan, 2.0, 4.0, 6.0]])
+    np.testing.assert_array_equal(analytics.moving_average(closes, 2), [[nan, 2, 3, 5]])
+    # A window longer than the series averages everything so far
+    np.testing.assert_array_equal(analytics.moving_average(closes, 7), [[nan, 2, 3, 4]])
+
+
+def test_volatility_on_short_series():
+    closes = np.array([[100.0, 110.0, nan], [100.0, 110.0, 99.0], [nan, nan, 5.0], [5.0, 5.0, 5.0]])
+    vols = analytics.volatility(closes)
+    # One return (or none) has no spread
+    assert np.isnan(vols[0]) and np.isnan(vols[2])
+    assert vols[1] == pytest.approx(abs(math.log(1.1) - math.log(0.9)) / math.sqrt(2))
+    assert vols[3] == 0
+
+
+def test_drop_probability():
+    closes = np.array([
+        [10, 10, 10, 10, 9, 9, 9, 9, 9, 9, 9],
+        [20, 20, 20, 20, 20, 20, 10, 10, 10, 10, 10],
+        [nan, nan, nan, nan, nan, nan, nan, nan, nan, 10, 9],
+    ])
+    probability, samples = analytics.drop_probability(closes, np.array([9.0, 20.0, 9.0]), horizon=1)
+    # Every start day is priced at or above today's 9, so all 10 count; one of them dropped
+    assert (probability[0], samples[0]) == (pytest.approx(2 / 12), 10)
+    # Only the 6 days priced at 20 count, and one of them dropped
+    assert (probability[1], samples[1]) == (pytest.approx(2 / 8), 6)
+    # Too few similar days falls back to every priced day; days without a price are not samples
+    assert (probability[2], samples[2]) == (pytest.approx(2 / 3), 1)
+
+
+def test_compute_summaries_against_hand_computed_values():
+    end = 200 * DAY
+    # Product 0 was 100 since before the window and dropped to 80 on the last day; product 1 has no history
+    summaries = analytics.compute_summaries(
+        np.array([0, 0]), np.array([end - 100 * DAY, end - DAY // 2]), np.array([100.0, 80.0]), 2, end)
+    assert summaries[1] is None
+
+    summary = summaries[0]
+    assert summary['current'] == 80.0
+    assert summary['observationDays'] == 1
+    assert summary['windows'] == {
+        '7d': {'min': 80.0, 'max': 100.0, 'avg': 97.14, 'change': -20.0},
+        '30d': {'min': 80.0, 'max': 100.0, 'avg': 99.33, 'change': -20.0},
+        '90d': {'min': 80.0, 'max': 100.0, 'avg': 99.78, 'change': -20.0},
+    }
+    # 30 daily returns: 29 flat and one of ln(0.8)
+    mean = math.log(0.8) / 30
+    std = math.sqrt((29 * mean ** 2 + (math.log(0.8) - mean) ** 2) / 29)
+    assert summary['volatility'] == round(std * 100, 3)
+    assert summary['bestWeekday'] is None
+    # 83 start days all priced at or above 80; only the last one sees the drop within 7 days
+    assert summary['dropProbability'] == round(2 / 85, 3)
+    assert summary['confidence'] == round(83 / 93, 3)
+    assert summary['recommendation'] == 'buy'
+    assert summary['series'] == [100.0] * 89 + [80.0]
+    assert summary['movingAverage7'][:7] == [100.0] * 7 and summary['movingAverage7'][-1] == 97.14
+
+
+def add_history(app_module, url, observations):
+    conn = app_module.connect_db()
+    product_id = conn.execute("SELECT id FROM products WHERE canonical_url = ?",
+                              (app_module.canonicalize_url(url),)).fetchone()[0]
+    conn.executemany("INSERT INTO price_history (product_id, price, observed_at) VALUES (?, ?, ?)",
+                     [(product_id, price, (datetime.now() - timedelta(days=days_ago)).isoformat(sep=' ', timespec='seconds'))
+                      for days_ago, price in observations])
+    conn.commit()
+    conn.close()
+
+
+def test_product_analytics_route(app_module, client):
+    url = 'https://www.amazon.in/dp/B0ANALYTIC1'
+    assert client.post('/api/trackers', json={'url': url, 'currentPrice': 500, 'targetPrice': 400}).status_code == 201
+    assert client.get('/api/analytics/product', query_string={'url': url}).status_code == 404
+
+    # An observation before the 90-day window seeds its first day
+    add_history(app_module, url, [(100, 700), (10, 600)])
+    assert app_module.refresh_price_summaries()['products'] >= 1
+    response = client.get('/api/analytics/product', query_string={'url': url + '?ref=share'})
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['current'] == 500
+    assert summary['observationDays'] == 2
+    assert summary['windows']['90d']['max'] == 700
+    assert summary['seriesEnd'] == summary['computedAt'][:10]
+
+    assert client.get('/api/analytics/product').status_code == 400
+    assert client.get('/api/analytics/product', query_string={'url': 'https://www.amazon.in/dp/B0MISSING00'}).status_code == 404
+    anonymous = app_module.app.test_client()
+    assert anonymous.get('/api/analytics/product', query_string={'url': url}).status_code == 401
@@ -0,0 +1,92 @@
+import csv
+import io
+
+
+def history_count(app_module, url):
+    conn = app_module.connect_db()
+    try:
+        return conn.execute("""
+            SELECT COUNT(*) FROM price_history h JOIN products p ON p.id = h.product_id
+            WHERE p.canonical_url = ?
+        """, (app_module.canonicalize_url(url),)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_json_import_creates_trackers_with_history(app_module, client):
+    items = [
+        {'url': 'https://www.amazon.in/dp/B0BULKJSON1', 'productName': 'Mixer', 'currentPrice': 2500, 'targetPrice': 2000},
+        {'url': 'https://www.amazon.in/dp/B0BULKJSON2', 'targetPrice': '1,499'},
+    ]
+    response = client.post('/api/trackers/bulk', json={'trackers': items})
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['created'] == 2 and data['skipped'] == []
+
+    listed = {t['id']: t for t in client.get('/api/trackers').get_json()}
+    assert sorted(data['ids']) == sorted(listed)
+    assert sorted(t['targetPrice'] for t in listed.values()) == [1499, 2000]
+    # A seeded price starts the product's chart like the single create does
+    assert history_count(app_module, items[0]['url']) == 1
+    assert history_count(app_module, items[1]['url']) == 0
+
+
+def test_import_skips_duplicates_and_invalid_rows(client):
+    url = 'https://www.amazon.in/dp/B0BULKDUP01'
+    assert client.post('/api/trackers', json={'url': url, 'targetPrice': 100}).status_code == 201
+    response = client.post('/api/trackers/bulk', json=[
+        {'url': url + '?tag=affiliate', 'targetPrice': 90},
+        {'url': 'https://www.amazon.in/dp/B0BULKDUP02', 'targetPrice': 50},
+        {'url': 'https://www.amazon.in/dp/B0BULKDUP02', 'targetPrice': 40},
+        {'url': 'https://www.amazon.in/dp/B0BULKDUP03'},
+        'not a tracker',
+    ])
+    data = response.get_json()
+    assert data['created'] == 1
+    assert [(s['index'], s['reason']) for s in data['skipped']] == [
+        (0, 'Duplicate URL'), (2, 'Duplicate URL'), (3, 'url and targetPrice are required'), (4, 'Invalid tracker')]
+    assert len(client.get('/api/trackers').get_json()) == 2
+
+
+def test_csv_import_from_upload_and_body(client):
+    upload = 'url,productName,currentPrice,targetPrice\nhttps://www.amazon.in/dp/B0BULKCSV01,Fan,1200,999\n'
+    response = client.post('/api/trackers/bulk', data={'file': (io.BytesIO(upload.encode()), 'trackers.csv')},
+                           content_type='multipart/form-data')
+    assert response.get_json()['created'] == 1
+    body = 'url,targetPrice\nhttps://www.amazon.in/dp/B0BULKCSV02,450\n'
+    response = client.post('/api/trackers/bulk', data=body, content_type='text/csv')
+    assert response.get_json()['created'] == 1
+    assert len(client.get('/api/trackers').get_json()) == 2
+
+
+def test_import_rejects_bad_bodies(app_module, client, monkeypatch):
+    assert client.post('/api/trackers/bulk', json={'nope': 1}).status_code == 400
+    monkeypatch.setattr(app_module, 'BULK_TRACKER_LIMIT', 2)
+    items = [{'url': f'https://www.amazon.in/dp/B0BULKMAX0{n}', 'targetPrice': 1} for n in range(3)]
+    assert client.post('/api/trackers/bulk', json=items).status_code == 413
+
+
+def test_export_round_trips(client):
+    client.post('/api/trackers/bulk', json=[{'url': 'https://www.amazon.in/dp/B0BULKEXP01', 'productName': 'Iron',
+                                             'currentPrice': 800, 'targetPrice': 700}])
+    exported = client.get('/api/trackers/export').get_json()
+    assert exported == [{'url': 'https://www.amazon.in/dp/B0BULKEXP01', 'productName': 'Iron', 'currentPrice': 800,
+                         'targetPrice': 700, 'currency': 'INR', 'currencySymbol': '₹'}]
+    response = client.get('/api/trackers/export?format=csv')
+    assert response.headers['Content-Type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row['url'], row['targetPrice']) for row in rows] == [('https://www.amazon.in/dp/B0BULKEXP01', '700.0')]
+
+
+def test_bulk_delete_by_id_and_url(client, make_client):
+    created = client.post('/api/trackers/bulk', json=[
+        {'url': f'https://www.amazon.in/dp/B0BULKDEL0{n}', 'targetPrice': 10} for n in range(3)]).get_json()['ids']
+    other = make_client()
+    other.post('/api/trackers', json={'url': 'https://www.amazon.in/dp/B0BULKDEL02', 'targetPrice': 10})
+
+    response = client.delete('/api/trackers/bulk', json={'ids': created[:1], 'urls': ['https://www.amazon.in/dp/B0BULKDEL02']})
+    assert response.get_json()['deleted'] == 2
+    assert [t['id'] for t in client.get('/api/trackers').get_json()] == [created[1]]
+    # Another user's tracker of the same URL stays
+    assert len(other.get('/api/trackers').get_json()) == 1
+    assert client.delete('/api/trackers/bulk', json={'ids': 'x'}).status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, app_module, tmp_path):
+    if request.param == 'memory':
+        return app_module.MemoryCoordinationBackend()
+    return app_module.SQLiteCoordinationBackend(str(tmp_path / 'coordination.db'))
+
+
+def test_enqueue_skips_queued_keys(backend):
+    assert backend.enqueue_jobs([('a', {'n': 1}), ('b', {'n': 2})]) == 2
+    assert backend.enqueue_jobs([('a', {'n': 3})]) == 0
+    assert backend.claim_jobs('node-1', 10, 60) == [('a', {'n': 1}), ('b', {'n': 2})]
+
+
+def test_claimed_jobs_are_not_handed_out_twice(backend):
+    backend.enqueue_jobs([('a', {'n': 1})])
+    assert backend.claim_jobs('node-1', 10, 60) == [('a', {'n': 1})]
+    assert backend.claim_jobs('node-2', 10, 60) == []
+    backend.complete_jobs('node-1', ['a'])
+    assert backend.claim_jobs('node-2', 10, 60) == []
+
+
+def test_completion_by_another_holder_is_ignored(backend):
+    backend.enqueue_jobs([('a', {'n': 1})])
+    backend.claim_jobs('node-1', 10, -1)
+    backend.complete_jobs('node-2', ['a'])
+    assert backend.claim_jobs('node-1', 10, 60) == [('a', {'n': 1})]
+
+
+def test_job_requeued_while_claimed_survives_completion(backend):
+    backend.enqueue_jobs([('a', {'n': 1})])
+    assert backend.claim_jobs('node-1', 10, 60) == [('a', {'n': 1})]
+    # Re-enqueued mid-scrape: the running attempt may have read the old state, so it must run again
+    assert backend.enqueue_jobs([('a', {'n': 2})]) == 0
+    backend.complete_jobs('node-1', ['a'])
+    assert backend.claim_jobs('node-2', 10, 60) == [('a', {'n': 2})]
+    backend.complete_jobs('node-2', ['a'])
+    assert backend.claim_jobs('node-3', 10, 60) == []
+
+
+def test_expired_lease_is_reclaimed(backend):
+    backend.enqueue_jobs([('a', {'n': 1})])
+    assert backend.claim_jobs('node-1', 10, -1) == [('a', {'n': 1})]
+    assert backend.claim_jobs('node-2', 10, 60) == [('a', {'n': 1})]
+
+
+def test_lease_has_one_holder(backend):
+    assert backend.acquire_lease('scheduler', 'node-1', 60)
+    assert not backend.acquire_lease('scheduler', 'node-2', 60)
+    assert backend.acquire_lease('scheduler', 'node-1', 60)
@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import pytest
+
+import currency
+from currency import RateCache, RateTable, StaticRateProvider
+
+RATES = {'INR': 88.0, 'EUR': 0.8, 'JPY': 150.0}
+
+
+def test_convert_mixed_currencies():
+    table = RateTable('USD', RATES)
+    converted = table.convert([10, 880, 8, 5], ['USD', 'INR', 'EUR', 'XYZ'], 'INR')
+    assert converted[:3].tolist() == pytest.approx([880, 880, 880])
+    assert math.isnan(converted[3])
+    assert table.convert([], [], 'EUR').shape == (0,)
+    assert table.rate('EUR', 'JPY') == pytest.approx(187.5)
+
+
+def test_convert_missing_currency_is_nan():
+    converted = RateTable('USD', RATES).convert(np.array([1.0, 2.0]), [None, 'USD'], 'USD')
+    assert math.isnan(converted[0]) and converted[1] == 2.0
+
+
+def test_convert_unknown_target():
+    with pytest.raises(KeyError):
+        RateTable('USD', RATES).convert([1], ['USD'], 'XYZ')
+
+
+@pytest.mark.parametrize('base, rates', [('USD', {'inr': 88}), ('USD', {'INR': 0}), ('USD', {'INR': float('nan')})])
+def test_invalid_rates_rejected(base, rates):
+    with pytest.raises(ValueError):
+        RateTable(base, rates)
+
+
+def test_round_trip_through_dict():
+    table = RateTable.from_dict(RateTable('USD', RATES, '2026-10-01').to_dict())
+    assert (table.base, table.as_of, table.codes) == ('USD', '2026-10-01', ('EUR', 'INR', 'JPY', 'USD'))
+    assert table.rate('USD', 'INR') == 88.0
+
+
+class FlakyProvider:
+    def __init__(self):
+        self.tables = [RateTable('USD', RATES), RateTable('USD', dict(RATES, INR=90.0))]
+        self.failing = False
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        if self.failing:
+            raise OSError("rates unavailable")
+        return self.tables[min(self.loads - 1, 1)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(currency.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_cache_reuses_table_until_ttl(clock):
+    provider = FlakyProvider()
+    cache = RateCache(provider, ttl=60)
+    first = cache.table()
+    clock[0] += 59
+    assert cache.table() is first and provider.loads == 1
+    clock[0] += 2
+    assert cache.table().rate('USD', 'INR') == 90.0
+
+
+def test_cache_keeps_last_table_when_reload_fails(clock):
+    provider, errors = FlakyProvider(), []
+    cache = RateCache(provider, ttl=60, retry=10, on_error=errors.append)
+    first = cache.table()
+    provider.failing = True
+    clock[0] += 61
+    assert cache.table() is first
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
+    # No reload attempt until the retry window has passed
+    clock[0] += 9
+    assert cache.table() is first and provider.loads == 2
+    provider.failing = False
+    clock[0] += 2
+    assert cache.table().rate('USD', 'INR') == 90.0
+
+
+def test_cache_without_any_table(clock):
+    provider = FlakyProvider()
+    provider.failing = True
+    cache = RateCache(provider, ttl=60, retry=10)
+    with pytest.raises(LookupError):
+        cache.table()
+    with pytest.raises(LookupError):
+        cache.table()
+    assert provider.loads == 1
+
+
+# ---- search sorting in a common currency ----
+
+@pytest.fixture
+def fixed_rates(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'fx_rates', RateCache(StaticRateProvider('USD', RATES), ttl=3600))
+
+
+def track(client, url, name, price, target, code):
+    response = client.post('/api/trackers', json={'url': url, 'productName': name, 'currentPrice': price,
+                                                  'targetPrice': target, 'currency': code})
+    assert response.status_code == 201
+
+
+def test_normalized_price_sql_params(app_module):
+    table = RateTable('USD', {'INR': 88.0})
+    sql, params = app_module.normalized_price_sql("p.current_price", table)
+    assert sql == "(p.current_price) / CASE p.currency WHEN ? THEN ? WHEN ? THEN ? ELSE 1 END"
+    assert params == ['INR', 88.0, 'USD', 1.0]
+
+
+def test_search_sorts_prices_across_currencies(client, fixed_rates):
+    # 880 INR = 10 USD, 12 EUR = 15 USD, 12 USD
+    track(client, 'https://www.amazon.in/dp/B0FXSORT001', 'Lamp rupee', 880, 1000, 'INR')
+    track(client, 'https://www.amazon.de/dp/B0FXSORT002', 'Lamp euro', 12, 10, 'EUR')
+    track(client, 'https://www.amazon.com/dp/B0FXSORT003', 'Lamp dollar', 12, 10, 'USD')
+    track(client, 'https://www.amazon.com/dp/B0FXSORT004', 'Desk', 1, 1, 'USD')
+
+    # q and status add WHERE parameters ahead of the ORDER BY ones, limit/offset come after
+    names = [t['productName'] for t in client.get('/api/trackers/search?q=lamp&sort=price&status=active')
+             .get_json()['trackers']]
+    assert names == ['Lamp dollar', 'Lamp euro']
+    page = client.get('/api/trackers/search?q=lamp&sort=price&limit=2&offset=1&currency=INR').get_json()
+    assert page['total'] == 3
+    assert [t['productName'] for t in page['trackers']] == ['Lamp dollar', 'Lamp euro']
+    assert [t['convertedPrice'] for t in page['trackers']] == [1056.0, 1320.0]
+    descending = client.get('/api/trackers/search?q=lamp&sort=price&order=desc').get_json()['trackers']
+    assert [t['productName'] for t in descending] == ['Lamp euro', 'Lamp dollar', 'Lamp rupee']
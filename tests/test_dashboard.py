@@ -0,0 +1,17 @@
+def track(client, url, price, target, currency='INR'):
+    response = client.post('/api/trackers', json={'url': url, 'productName': 'Item', 'currentPrice': price,
+                                                  'targetPrice': target, 'currency': currency})
+    assert response.status_code == 201
+
+
+def test_summary_counts_the_users_trackers(client):
+    track(client, 'https://www.amazon.in/dp/B0SUMMARY01', 900, 1000)
+    track(client, 'https://www.amazon.in/dp/B0SUMMARY02', 2000, 1500)
+    summary = client.get('/api/dashboard/summary?currency=INR').get_json()
+    assert (summary['totalTrackers'], summary['reached'], summary['active']) == (2, 1, 1)
+    assert summary['totalSavings']['currency'] == 'INR'
+    assert summary['totalSavings']['amount'] == 100
+
+
+def test_summary_rejects_unknown_currency(client):
+    assert client.get('/api/dashboard/summary?currency=XYZ').status_code == 400
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+import requests
+
+PAYLOAD = {"price": 799.0, "currency": "INR", "currency_symbol": "₹", "productName": "Kettle"}
+
+
+class StubFetch:
+    """Stands in for fetch_product_price: each call runs the next behaviour in line"""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.calls = []  # (started, cancelled event)
+        self.lock = threading.Lock()
+
+    def __call__(self, url, deadline=None, cancelled=None):
+        with self.lock:
+            self.calls.append((time.perf_counter(), cancelled))
+            behaviour = self.behaviours.pop(0)
+        return behaviour(cancelled)
+
+
+def slow(release=None, payload=PAYLOAD, limit=5):
+    """Answers once `release` is set, or reports cancellation, or times out after `limit` seconds"""
+    def run(cancelled):
+        started = time.perf_counter()
+        while time.perf_counter() - started < limit:
+            if cancelled.is_set():
+                return {"error": "Fetch cancelled"}, 499
+            if release is not None and release.is_set():
+                return dict(payload), 200
+            time.sleep(0.005)
+        return {"error": "Request timed out. Please try again."}, 504
+    return run
+
+
+def fast(payload=PAYLOAD):
+    return lambda cancelled: (dict(payload), 200)
+
+
+@pytest.fixture
+def hedging(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'SCRAPE_HEDGE', True)
+    monkeypatch.setattr(app_module, 'SCRAPE_HEDGE_DEFAULT_DELAY', 0.1)
+    monkeypatch.setattr(app_module, 'fetch_latencies', app_module.FetchLatencies())
+    monkeypatch.setattr(app_module, 'PRICE_CACHE_TTL', 0)
+
+
+def test_hedge_fires_after_the_delay_and_wins(app_module, monkeypatch, hedging):
+    stub = StubFetch(slow(), fast())
+    monkeypatch.setattr(app_module, 'fetch_product_price', stub)
+    fetch = app_module.HedgedFetch('https://www.amazon.in/dp/B0HEDGE0001', time.perf_counter() + 5)
+
+    assert fetch.wait(time.perf_counter() + 2) == (PAYLOAD, 200)
+    assert len(stub.calls) == 2
+    (primary_started, primary_cancelled), (hedge_started, _) = stub.calls
+    assert hedge_started - primary_started >= 0.1
+    # The losing primary is told to stop
+    assert primary_cancelled.is_set()
+
+
+def test_no_hedge_when_the_primary_is_quick(app_module, monkeypatch, hedging):
+    stub = StubFetch(fast())
+    monkeypatch.setattr(app_module, 'fetch_product_price', stub)
+    fetch = app_module.HedgedFetch('https://www.amazon.in/dp/B0HEDGE0002', time.perf_counter() + 5)
+    assert fetch.wait(time.perf_counter() + 2) == (PAYLOAD, 200)
+    time.sleep(0.15)
+    assert len(stub.calls) == 1
+
+
+def test_hedge_loses_to_a_primary_that_finishes_first(app_module, monkeypatch, hedging):
+    release = threading.Event()
+    stub = StubFetch(slow(release), slow())
+    monkeypatch.setattr(app_module, 'fetch_product_price', stub)
+    fetch = app_module.HedgedFetch('https://www.amazon.in/dp/B0HEDGE0003', time.perf_counter() + 5)
+    threading.Timer(0.2, release.set).start()
+    assert fetch.wait(time.perf_counter() + 2) == (PAYLOAD, 200)
+    assert stub.calls[1][1].is_set()
+
+
+def track(client, url, price):
+    response = client.post('/api/trackers', json={'url': url, 'productName': 'Kettle', 'currentPrice': price,
+                                                  'targetPrice': 500, 'currency': 'INR', 'currencySymbol': '₹'})
+    assert response.status_code == 201
+
+
+def stored_price(app_module, url):
+    conn = app_module.connect_db()
+    try:
+        return conn.execute("SELECT current_price FROM products WHERE canonical_url = ?",
+                            (app_module.canonicalize_url(url),)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_stale_price_served_at_the_margin_and_late_price_stored(app_module, client, monkeypatch, hedging):
+    monkeypatch.setattr(app_module, 'SCRAPE_HEDGE', False)
+    url = 'https://www.amazon.in/dp/B0HEDGE0004'
+    track(client, url, 999)
+    release = threading.Event()
+    monkeypatch.setattr(app_module, 'fetch_product_price', StubFetch(slow(release)))
+
+    started = time.perf_counter()
+    response = client.post('/get-price', json={'url': url}, headers={'X-Request-Timeout': '0.8'})
+    elapsed = time.perf_counter() - started
+    data = response.get_json()
+    assert response.status_code == 200
+    assert (data['price'], data['stale']) == (999, True)
+    # Answered STALE_PRICE_MARGIN before the 0.8 s deadline, not at it
+    assert elapsed < 0.8 - app_module.STALE_PRICE_MARGIN + 0.2
+
+    # The fetch carries on and its price is kept once it lands
+    release.set()
+    for _ in range(200):
+        if stored_price(app_module, url) == PAYLOAD['price']:
+            break
+        time.sleep(0.01)
+    assert stored_price(app_module, url) == PAYLOAD['price']
+
+
+def test_deadline_without_stored_price_is_a_timeout(app_module, client, monkeypatch, hedging):
+    monkeypatch.setattr(app_module, 'SCRAPE_HEDGE', False)
+    stub = StubFetch(slow())
+    monkeypatch.setattr(app_module, 'fetch_product_price', stub)
+    response = client.post('/get-price', json={'url': 'https://www.amazon.in/dp/B0HEDGE0005'},
+                           headers={'X-Request-Timeout': '0.3'})
+    assert response.status_code == 504
+    assert stub.calls[0][1].is_set()
+
+
+def test_fetch_timeouts_are_capped_by_the_budget(app_module, monkeypatch):
+    seen = []
+
+    def fake_get(url, **kwargs):
+        seen.append(kwargs['timeout'])
+        raise requests.exceptions.ConnectTimeout()
+    monkeypatch.setattr(app_module.requests, 'get', fake_get)
+
+    assert app_module.fetch_product_price('https://example.com/a', time.perf_counter() + 60)[1] == 504
+    assert seen[-1] == (app_module.SCRAPE_CONNECT_TIMEOUT, app_module.SCRAPE_READ_TIMEOUT)
+
+    app_module.fetch_product_price('https://example.com/a', time.perf_counter() + 1)
+    connect, read = seen[-1]
+    assert 0.9 < connect <= 1 and 0.9 < read <= 1
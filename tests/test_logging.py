@@ -0,0 +1,57 @@
+import atexit
+import logging
+import os
+
+import pytest
+
+SAMPLED = ('price_alerter.scrape', 'price_alerter.http')
+
+
+def sample_filters(app_module, name):
+    return [f for f in logging.getLogger(name).filters if isinstance(f, app_module.SampleFilter)]
+
+
+@pytest.fixture
+def restore_logging(app_module):
+    logger = logging.getLogger('price_alerter')
+    handlers = logger.handlers[:]
+    listeners = []
+    yield listeners
+    for listener in listeners:
+        atexit.unregister(listener.stop)
+        listener.stop()
+    logger.handlers[:] = handlers
+
+
+def test_reconfiguring_keeps_one_sample_filter(app_module, monkeypatch, restore_logging):
+    monkeypatch.setattr(app_module, 'LOG_SAMPLE_RATE', 0.5)
+    restore_logging.append(app_module.configure_logging())
+    restore_logging.append(app_module.configure_logging())
+    for name in SAMPLED:
+        filters = sample_filters(app_module, name)
+        assert len(filters) == 1 and filters[0].rate == 0.5
+
+    logger = logging.getLogger('price_alerter.scrape')
+    kept = sum(bool(logger.filter(logger.makeRecord(logger.name, logging.INFO, __file__, 0, 'x', (), None)))
+               for _ in range(4000))
+    assert 1700 < kept < 2300
+    # Put the configured rate back for the rest of the session
+    monkeypatch.undo()
+    restore_logging.append(app_module.configure_logging())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_worker_keeps_one_sample_filter(app_module):
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the at-fork hook has already run
+        counts = [len(sample_filters(app_module, name)) for name in SAMPLED]
+        alive = app_module.log_listener._thread is not None and app_module.log_listener._thread.is_alive()
+        os.write(write_end, f"{counts} {alive}".encode())
+        os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 100).decode()
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    assert result == '[1, 1] True'
@@ -0,0 +1,33 @@
+def free_pages(app_module):
+    conn = app_module.connect_db()
+    try:
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def make_free_pages(app_module):
+    conn = app_module.connect_db()
+    conn.execute("CREATE TABLE scratch (data BLOB)")
+    conn.executemany("INSERT INTO scratch (data) VALUES (?)", [(b'x' * 1024,) for _ in range(2000)])
+    conn.commit()
+    conn.execute("DROP TABLE scratch")
+    conn.commit()
+    conn.close()
+    return free_pages(app_module)
+
+
+def test_maintenance_reclaims_free_pages(app_module):
+    assert make_free_pages(app_module) > 100
+    report = app_module.run_maintenance()
+    assert free_pages(app_module) == 0
+    assert report['freeBytes'] == 0 and report['sizeAfter'] < report['sizeBefore']
+
+
+def test_maintenance_reclaims_a_bounded_batch(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'VACUUM_PAGES_PER_RUN', 50)
+    before = make_free_pages(app_module)
+    app_module.run_maintenance()
+    assert free_pages(app_module) == before - 50
+    app_module.run_maintenance()
+    assert free_pages(app_module) == before - 100
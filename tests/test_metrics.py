@@ -0,0 +1,27 @@
+def request_count(app_module, endpoint, status):
+    key = ('price_alerter_http_requests_total', (('endpoint', endpoint), ('method', 'GET'), ('status', status)))
+    return app_module._counters.get(key, 0)
+
+
+def test_unhandled_error_is_counted_once(app_module, monkeypatch):
+    def broken():
+        raise RuntimeError("boom")
+    monkeypatch.setitem(app_module.app.view_functions, 'home', broken)
+    before = request_count(app_module, 'home', '500')
+    response = app_module.app.test_client().get('/home')
+    assert response.status_code == 500
+    assert request_count(app_module, 'home', '500') == before + 1
+
+
+def test_metrics_closed_without_token(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', None)
+    assert app_module.app.test_client().get('/metrics').status_code == 401
+
+
+def test_metrics_requires_bearer_token(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 'secret')
+    client = app_module.app.test_client()
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert b'price_alerter_http_requests_total' in response.data
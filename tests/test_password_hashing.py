@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+
+def stored_hash(app_module, email):
+    conn = app_module.connect_db()
+    try:
+        return conn.execute("SELECT password FROM users WHERE email = ?", (email,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_saturated_pool_sheds_load(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, '_hash_slots', threading.BoundedSemaphore(1))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=app_module.run_hash_job, args=(slow_hash,))
+    holder.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(app_module.HashingBusyError):
+            app_module.hash_password('password123')
+        response = app_module.app.test_client().post(
+            '/signup', json={'username': 'busy', 'email': 'busy@example.com', 'password': 'password123'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '2'
+    finally:
+        release.set()
+        holder.join()
+    # The slot comes back once the running hash finishes
+    assert app_module.verify_password(app_module.hash_password('password123'), 'password123')
+
+
+def test_login_rehashes_outdated_hash(app_module, monkeypatch):
+    client = app_module.app.test_client()
+    credentials = {'email': 'rehash@example.com', 'password': 'password123'}
+    monkeypatch.setattr(app_module, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(app_module, '_hash_method_label', None)
+    assert client.post('/signup', json={'username': 'rehash', **credentials}).status_code == 201
+    old = stored_hash(app_module, credentials['email'])
+    assert old.startswith('pbkdf2:sha256:1000$')
+    client.get('/logout')
+
+    monkeypatch.setattr(app_module, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    monkeypatch.setattr(app_module, '_hash_method_label', None)
+    assert client.post('/login', json=credentials).status_code == 200
+    new = stored_hash(app_module, credentials['email'])
+    assert new.startswith('pbkdf2:sha256:2000$') and new != old
+    assert app_module.verify_password(new, 'password123')
+
+    # Current hashes are left alone
+    client.get('/logout')
+    assert client.post('/login', json=credentials).status_code == 200
+    assert stored_hash(app_module, credentials['email']) == new
+
+
+def test_wrong_password_does_not_rehash(app_module, monkeypatch):
+    client = app_module.app.test_client()
+    credentials = {'email': 'norehash@example.com', 'password': 'password123'}
+    monkeypatch.setattr(app_module, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setattr(app_module, '_hash_method_label', None)
+    client.post('/signup', json={'username': 'norehash', **credentials})
+    client.get('/logout')
+    old = stored_hash(app_module, credentials['email'])
+
+    monkeypatch.setattr(app_module, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    monkeypatch.setattr(app_module, '_hash_method_label', None)
+    assert client.post('/login', json={**credentials, 'password': 'wrong-password'}).status_code == 401
+    assert stored_hash(app_module, credentials['email']) == old
@@ -0,0 +1,12 @@
+def test_get_price_session_limit_is_tighter_than_ip_limit(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(app_module, 'rate_limit_store', app_module.MemoryRateLimitStore())
+    statuses = [client.post('/get-price', json={}).status_code for _ in range(31)]
+    assert statuses[:30] == [400] * 30
+    assert statuses[30] == 429
+
+
+def test_forwarded_for_is_not_trusted_by_default(app_module):
+    # A forged X-Forwarded-For must not pick the rate-limit identity unless a proxy is configured
+    assert app_module.PROXY_COUNT == 0
+    assert not isinstance(app_module.app.wsgi_app, app_module.ProxyFix)
@@ -0,0 +1,97 @@
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+_users = itertools.count(1)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app_module):
+    app_module._remember_cache.clear()
+
+
+@pytest.fixture
+def remembered(app_module):
+    """A remember-me token for a fresh user, as the login response set it"""
+    client = app_module.app.test_client()
+    number = next(_users)
+    email = f'remember{number}@example.com'
+    client.post('/signup', json={'username': f'remember{number}', 'email': email, 'password': 'password123'})
+    client.get('/logout')
+    response = client.post('/login', json={'email': email, 'password': 'password123', 'remember': True})
+    assert response.status_code == 200
+    return client.get_cookie('remember_token').value
+
+
+def cookie_client(app_module, token):
+    """A client with no session, only the remember-me cookie"""
+    client = app_module.app.test_client()
+    client.set_cookie('remember_token', token)
+    return client
+
+
+def expire(app_module, token):
+    conn = app_module.connect_db()
+    conn.execute("UPDATE remember_tokens SET expires_at = ? WHERE token_hash = ?",
+                 ((datetime.now() - timedelta(minutes=1)).isoformat(), app_module.hash_remember_token(token)))
+    conn.commit()
+    conn.close()
+
+
+def test_cookie_restores_session(app_module, remembered):
+    client = cookie_client(app_module, remembered)
+    assert client.get('/api/trackers').status_code == 200
+    with client.session_transaction() as session:
+        assert session['user_id'] and session.permanent
+    assert app_module.app.test_client().get('/api/trackers').status_code == 401
+
+
+def test_logout_revokes_token(app_module, remembered):
+    client = cookie_client(app_module, remembered)
+    assert client.get('/api/trackers').status_code == 200
+    response = client.get('/logout')
+    assert 'remember_token=;' in response.headers['Set-Cookie']
+    # Replaying the old cookie after logout doesn't log back in, even though it was cached
+    assert cookie_client(app_module, remembered).get('/api/trackers').status_code == 401
+    assert app_module.hash_remember_token(remembered) not in {
+        key for key, (user, _) in app_module._remember_cache.items() if user}
+
+
+def test_login_without_remember_revokes_all_tokens(app_module, remembered):
+    user_id = app_module.lookup_remember_token(remembered)[0]
+    conn = app_module.connect_db()
+    email = conn.execute("SELECT email FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+    conn.close()
+    app_module.app.test_client().post('/login', json={'email': email, 'password': 'password123'})
+    assert cookie_client(app_module, remembered).get('/api/trackers').status_code == 401
+
+
+def test_tampered_token_rejected(app_module, remembered):
+    tampered = remembered[:-1] + ('A' if remembered[-1] != 'A' else 'B')
+    assert cookie_client(app_module, tampered).get('/api/trackers').status_code == 401
+    assert cookie_client(app_module, '').get('/api/trackers').status_code == 401
+
+
+def test_expired_token_rejected(app_module, remembered):
+    expire(app_module, remembered)
+    assert cookie_client(app_module, remembered).get('/api/trackers').status_code == 401
+
+
+def test_lookup_cache(app_module, remembered, monkeypatch):
+    user = app_module.lookup_remember_token(remembered)
+    assert user is not None
+    # A cached hit answers without the database, until the entry's TTL runs out
+    expire(app_module, remembered)
+    assert app_module.lookup_remember_token(remembered) == user
+    monkeypatch.setattr(app_module, 'REMEMBER_CACHE_TTL', -1)
+    app_module._remember_cache.clear()
+    assert app_module.lookup_remember_token(remembered) is None
+
+    # Unknown tokens are cached as misses, and the cache stays bounded
+    monkeypatch.setattr(app_module, 'REMEMBER_CACHE_TTL', 300)
+    monkeypatch.setattr(app_module, 'REMEMBER_CACHE_SIZE', 3)
+    for n in range(5):
+        assert app_module.lookup_remember_token(f'unknown-{n}') is None
+    assert len(app_module._remember_cache) == 3
+    assert app_module._remember_cache[app_module.hash_remember_token('unknown-4')][0] is None
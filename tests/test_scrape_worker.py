@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def worker(app_module, monkeypatch):
+    """Scrape worker state with a private job queue, no network and recorded crossing passes"""
+    coordination = app_module.MemoryCoordinationBackend()
+    calls = {'crossings': 0, 'scheduled': 0, 'batch': lambda: None}
+
+    def schedule_stale_refreshes():
+        calls['scheduled'] += 1
+        return 0
+
+    def check_target_crossings():
+        calls['crossings'] += 1
+
+    def refresh_product_prices(product_urls):
+        calls['batch']()
+        return len(product_urls)
+
+    monkeypatch.setattr(app_module, 'coordination', coordination)
+    monkeypatch.setattr(app_module, 'PRICE_REFRESH_INTERVAL', 3600)
+    monkeypatch.setattr(app_module, 'schedule_stale_refreshes', schedule_stale_refreshes)
+    monkeypatch.setattr(app_module, 'check_target_crossings', check_target_crossings)
+    monkeypatch.setattr(app_module, 'refresh_product_prices', refresh_product_prices)
+    monkeypatch.setattr(app_module, '_tracker_index', object())
+    coordination.enqueue_jobs([('a', {'productId': 1, 'url': 'https://example.com/a'})])
+    return coordination, calls
+
+
+def test_lease_holder_checks_crossings(app_module, worker):
+    coordination, calls = worker
+    assert app_module.run_scrape_pass('node-1', 0) > time.time()
+    assert calls == dict(calls, crossings=1, scheduled=1)
+    assert coordination.claim_jobs('node-1', 10, 60) == []
+
+
+def test_lease_is_renewed_after_a_long_batch(app_module, worker):
+    coordination, calls = worker
+
+    def outlast_lease():
+        holder, _ = coordination.leases[app_module.CROSSING_LEASE]
+        coordination.leases[app_module.CROSSING_LEASE] = (holder, time.time() - 1)
+    calls['batch'] = outlast_lease
+
+    app_module.run_scrape_pass('node-1', 0)
+    assert calls['crossings'] == 1
+    holder, expires_at = coordination.leases[app_module.CROSSING_LEASE]
+    assert holder == 'node-1' and expires_at > time.time()
+
+
+def test_lease_lost_during_a_batch_skips_crossings(app_module, worker):
+    coordination, calls = worker
+
+    def taken_over():
+        coordination.leases[app_module.CROSSING_LEASE] = ('node-2', time.time() + 60)
+    calls['batch'] = taken_over
+
+    app_module.run_scrape_pass('node-1', 0)
+    assert calls['crossings'] == 0
+    assert app_module._tracker_index is None
+
+
+def test_crossings_are_checked_without_stale_refreshes(app_module, worker, monkeypatch):
+    coordination, calls = worker
+    monkeypatch.setattr(app_module, 'PRICE_REFRESH_INTERVAL', 0)
+    assert app_module.run_scrape_pass('node-1', 0) == 0
+    assert calls == dict(calls, crossings=1, scheduled=0)
+    assert app_module._tracker_index is not None
+    # Still one checker across nodes
+    assert app_module.run_scrape_pass('node-2', 0) == 0
+    assert calls['crossings'] == 1
+
+
+def test_crossing_and_scheduler_leases_are_independent(app_module, worker):
+    coordination, calls = worker
+    coordination.acquire_lease(app_module.SCHEDULER_LEASE, 'node-2', 60)
+    app_module.run_scrape_pass('node-1', 0)
+    assert calls == dict(calls, crossings=1, scheduled=0)
@@ -0,0 +1,38 @@
+def track(client, url, name, price, target):
+    response = client.post('/api/trackers', json={'url': url, 'productName': name, 'currentPrice': price,
+                                                  'targetPrice': target, 'currency': 'INR'})
+    assert response.status_code == 201
+
+
+def test_search_pages_through_prefix_matches(client):
+    for n in range(5):
+        track(client, f'https://www.amazon.in/dp/B0SEARCH{n:03}', f'Steel Kettle {n}', 1000 + n, 900)
+    track(client, 'https://www.amazon.in/dp/B0SEARCHTOA', 'Toaster', 500, 600)
+
+    first = client.get('/api/trackers/search?q=kett&sort=price&limit=2').get_json()
+    assert first['total'] == 5
+    assert [t['currentPrice'] for t in first['trackers']] == [1000, 1001]
+    last = client.get('/api/trackers/search?q=kett&sort=price&limit=2&offset=4').get_json()
+    assert [t['currentPrice'] for t in last['trackers']] == [1004]
+
+    reached = client.get('/api/trackers/search?q=toa&status=reached').get_json()
+    assert [t['productName'] for t in reached['trackers']] == ['Toaster']
+    assert client.get('/api/trackers/search?q=toa&status=active').get_json()['total'] == 0
+
+
+def test_search_rejects_unknown_sort(client):
+    assert client.get('/api/trackers/search?sort=color').status_code == 400
+
+
+def test_unpriced_tracker_counts_as_active(client):
+    response = client.post('/api/trackers', json={'url': 'https://www.amazon.in/dp/B0SEARCHNUL', 'productName': 'Blender',
+                                                  'targetPrice': 800})
+    assert response.status_code == 201
+    track(client, 'https://www.amazon.in/dp/B0SEARCHBLD', 'Blender Jar', 700, 800)
+
+    active = client.get('/api/trackers/search?q=blend&status=active').get_json()
+    assert [t['productName'] for t in active['trackers']] == ['Blender']
+    assert active['trackers'][0]['currentPrice'] is None
+    reached = client.get('/api/trackers/search?q=blend&status=reached').get_json()
+    assert [t['productName'] for t in reached['trackers']] == ['Blender Jar']
+    assert client.get('/api/trackers/search?q=blend').get_json()['total'] == active['total'] + reached['total']
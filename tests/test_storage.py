@@ -0,0 +1,211 @@
+import re
+import sqlite3
+import threading
+
+import pytest
+
+
+# ---- postgres_sql ----
+
+def test_placeholders_become_format_params(app_module):
+    sql, returns_id = app_module.postgres_sql("SELECT id FROM users WHERE email = ? AND username LIKE '%a'")
+    assert sql == "SELECT id FROM users WHERE email = %s AND username LIKE '%%a'"
+    assert not returns_id
+
+
+def test_percent_left_alone_without_params(app_module):
+    assert app_module.postgres_sql("SELECT 1 WHERE 'a' LIKE '%'")[0] == "SELECT 1 WHERE 'a' LIKE '%'"
+
+
+def test_insert_or_replace_becomes_upsert(app_module):
+    sql, returns_id = app_module.postgres_sql(
+        "INSERT OR REPLACE INTO password_resets (user_id, reset_token, reset_token_expiry) VALUES (?, ?, ?)")
+    assert sql == ("INSERT INTO password_resets (user_id, reset_token, reset_token_expiry) VALUES (%s, %s, %s) "
+                   "ON CONFLICT (reset_token) DO UPDATE SET user_id = EXCLUDED.user_id, "
+                   "reset_token_expiry = EXCLUDED.reset_token_expiry RETURNING id")
+    assert returns_id
+
+
+def test_insert_or_ignore_does_nothing_on_conflict(app_module):
+    sql, returns_id = app_module.postgres_sql("INSERT OR IGNORE INTO rate_limits (key, count) VALUES (?, ?);")
+    assert sql == "INSERT INTO rate_limits (key, count) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+    assert not returns_id
+
+
+def test_insert_returns_id_only_for_single_row_inserts(app_module):
+    assert app_module.postgres_sql("INSERT INTO trackers (user_id) VALUES (?)") == \
+        ("INSERT INTO trackers (user_id) VALUES (%s) RETURNING id", True)
+    assert not app_module.postgres_sql("INSERT INTO trackers (user_id) VALUES (?)", returning=False)[1]
+    assert not app_module.postgres_sql("INSERT INTO trackers (user_id) SELECT id FROM users")[1]
+
+
+def test_datetime_now_is_translated(app_module):
+    sql, _ = app_module.postgres_sql("DELETE FROM otp_verification WHERE email_otp_expiry < datetime('now', '-1 day')")
+    assert "datetime(" not in sql
+    assert "interval '-1 day'" in sql
+
+
+@pytest.mark.parametrize('name', ['POSTGRES_DASHBOARD_TRIGGERS', 'POSTGRES_CHANGE_TRIGGERS'])
+def test_postgres_trigger_sql_has_no_sqlite_syntax(app_module, name):
+    sql = getattr(app_module, name)
+    assert not re.search(r'INSERT OR (REPLACE|IGNORE)', sql)
+    assert '?' not in sql
+    assert '{' not in sql
+
+
+# ---- triggers (SQLite) ----
+
+@pytest.fixture
+def db(app_module):
+    conn = app_module.connect_db()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+def add_product(db, url, price, currency='INR'):
+    return db.execute("INSERT INTO products (canonical_url, current_price, currency) VALUES (?, ?, ?)",
+                      (url, price, currency)).lastrowid
+
+
+def add_tracker(db, user_id, product_id, target):
+    return db.execute("INSERT INTO trackers (user_id, product_id, target_price) VALUES (?, ?, ?)",
+                      (user_id, product_id, target)).lastrowid
+
+
+def stats(db, user_id):
+    return db.execute("SELECT currency, trackers, reached, savings FROM dashboard_stats WHERE user_id = ? "
+                      "ORDER BY currency", (user_id,)).fetchall()
+
+
+def rebuilt_stats(db, user_id):
+    return [row[1:] for row in db.execute(
+        "SELECT * FROM (" + DASHBOARD_REBUILD + ") WHERE user_id = ? ORDER BY currency", (user_id,)).fetchall()]
+
+
+DASHBOARD_REBUILD = """
+    SELECT t.user_id, COALESCE(p.currency, '') AS currency, COUNT(*),
+           SUM(CASE WHEN p.current_price <= t.target_price THEN 1 ELSE 0 END),
+           SUM(CASE WHEN p.current_price <= t.target_price THEN t.target_price - p.current_price ELSE 0 END)
+    FROM trackers t JOIN products p ON p.id = t.product_id
+    GROUP BY t.user_id, COALESCE(p.currency, '')
+"""
+
+
+def test_dashboard_stats_follow_trackers_and_prices(db):
+    user = 900001
+    phone = add_product(db, 'https://example.com/stats-phone', 1000)
+    shirt = add_product(db, 'https://example.com/stats-shirt', 50, 'USD')
+    first = add_tracker(db, user, phone, 1200)
+    add_tracker(db, user, phone, 800)
+    add_tracker(db, user, shirt, 40)
+    assert stats(db, user) == [('INR', 2, 1, 200.0), ('USD', 1, 0, 0.0)]
+
+    db.execute("UPDATE products SET current_price = 700 WHERE id = ?", (phone,))
+    db.execute("UPDATE products SET currency = 'EUR' WHERE id = ?", (shirt,))
+    db.execute("UPDATE trackers SET target_price = 600 WHERE id = ?", (first,))
+    assert stats(db, user) == rebuilt_stats(db, user)
+
+    db.execute("DELETE FROM trackers WHERE user_id = ?", (user,))
+    assert stats(db, user) == []
+
+
+def changes(db, tracker_ids):
+    marks = ','.join('?' * len(tracker_ids))
+    return db.execute(f"SELECT tracker_id, deleted FROM tracker_changes WHERE tracker_id IN ({marks}) ORDER BY seq",
+                      tracker_ids).fetchall()
+
+
+def test_tracker_changes_resequence_each_change(db):
+    user = 900002
+    product = add_product(db, 'https://example.com/changes', 500)
+    first = add_tracker(db, user, product, 400)
+    second = add_tracker(db, user, product, 300)
+    assert changes(db, [first, second]) == [(first, 0), (second, 0)]
+
+    db.execute("UPDATE trackers SET target_price = 450 WHERE id = ?", (first,))
+    assert changes(db, [first, second]) == [(second, 0), (first, 0)]
+
+    # A price change touches every tracker of the product
+    db.execute("UPDATE products SET current_price = 350 WHERE id = ?", (product,))
+    assert sorted(changes(db, [first, second])) == [(first, 0), (second, 0)]
+
+    db.execute("DELETE FROM trackers WHERE id = ?", (second,))
+    assert changes(db, [first, second]) == [(first, 0), (second, 1)]
+
+
+# ---- ConnectionPool ----
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(app_module, size):
+    opened = []
+
+    def factory():
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+    return app_module.ConnectionPool(factory, size), opened
+
+
+def test_pool_reuses_most_recently_returned(app_module):
+    pool, opened = make_pool(app_module, 3)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire() is second
+    assert pool.acquire() is first
+    assert len(opened) == 2
+
+
+def test_pool_waits_for_a_free_slot(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'DB_POOL_TIMEOUT', 0.05)
+    pool, _ = make_pool(app_module, 1)
+    held = pool.acquire()
+    with pytest.raises(app_module.DatabaseBusyError):
+        pool.acquire()
+    threading.Timer(0.01, pool.release, (held,)).start()
+    monkeypatch.setattr(app_module, 'DB_POOL_TIMEOUT', 5)
+    assert pool.acquire() is held
+
+
+def test_pool_closes_unusable_connections(app_module):
+    pool, opened = make_pool(app_module, 1)
+    broken = pool.acquire()
+    pool.release(broken, reusable=False)
+    assert broken.closed
+    assert pool.acquire() is not broken
+    assert len(opened) == 2
+
+
+def test_pool_frees_slot_when_open_fails(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'DB_POOL_TIMEOUT', 0.05)
+
+    def factory():
+        raise sqlite3.OperationalError("unable to open database file")
+    pool = app_module.ConnectionPool(factory, 1)
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+
+
+def test_closing_a_connection_rolls_back_and_returns_it(app_module, tmp_path):
+    storage = app_module.SQLiteStorage(str(tmp_path / 'pool.db'))
+    conn = storage.connect()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    raw = conn.raw
+    conn.close()
+    conn.close()
+    assert storage.pool.idle == [raw]
+    again = storage.connect()
+    assert again.raw is raw
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+    again.close()
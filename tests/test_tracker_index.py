@@ -0,0 +1,103 @@
+import random
+import sqlite3
+
+import numpy as np
+
+from tracker_index import TrackerIndex
+
+
+def check(index, model):
+    """The index holds exactly the model's trackers, each findable at its recorded position"""
+    assert len(index) == len(model)
+    assert sum(len(group) for group in index.groups.values()) == len(model)
+    for tracker_id, (user_id, product_id, target) in model.items():
+        assert index.location(tracker_id) == product_id
+        group = index.groups[product_id]
+        position = index.positions[tracker_id]
+        assert (group.tracker_ids[position], group.user_ids[position], group.targets[position]) == \
+            (tracker_id, user_id, target)
+
+
+def test_upserts_and_removals_match_a_plain_model():
+    rng = random.Random(7)
+    index, model = TrackerIndex(), {}
+    for _ in range(5000):
+        tracker_id = rng.randint(1, 300)
+        if rng.random() < 0.3:
+            assert index.remove(tracker_id) == (model.pop(tracker_id, None) is not None)
+        else:
+            entry = (rng.randint(1, 20), rng.randint(1, 5), float(rng.randint(1, 100)))
+            index.upsert(tracker_id, entry[0], entry[1], entry[2])
+            model[tracker_id] = entry
+    check(index, model)
+    assert all(len(group) for group in index.groups.values())
+
+
+def test_set_price_reports_newly_reached_targets():
+    index = TrackerIndex()
+    index.upsert(1, 10, 5, 100.0)
+    index.upsert(2, 11, 5, 80.0)
+    index.upsert(3, 12, 5, 60.0)
+    index.groups[5].price = 120.0
+    crossing = index.set_price(5, 90.0)
+    assert crossing.tracker_ids.tolist() == [1]
+    assert index.set_price(5, 95.0) is None
+    # Tracker 1 was already reached at 90, so only tracker 2 is new
+    crossing = index.set_price(5, 70.0)
+    assert crossing.tracker_ids.tolist() == [2]
+    assert sorted(index.reached(5, 70.0).tolist()) == [1, 2]
+
+
+def changes_db():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE products (id INTEGER PRIMARY KEY, current_price REAL);
+        CREATE TABLE trackers (id INTEGER PRIMARY KEY, user_id INTEGER, product_id INTEGER, target_price REAL);
+        CREATE TABLE tracker_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, tracker_id INTEGER UNIQUE,
+                                      user_id INTEGER, deleted INTEGER DEFAULT 0);
+    """)
+    return conn
+
+
+def log_change(conn, tracker_id, user_id, deleted=0):
+    conn.execute("DELETE FROM tracker_changes WHERE tracker_id = ?", (tracker_id,))
+    conn.execute("INSERT INTO tracker_changes (tracker_id, user_id, deleted) VALUES (?, ?, ?)",
+                 (tracker_id, user_id, deleted))
+
+
+def test_refresh_applies_the_change_log():
+    conn = changes_db()
+    conn.execute("INSERT INTO products VALUES (1, 500), (2, 300)")
+    for tracker_id, product_id, target in [(1, 1, 450), (2, 1, 400), (3, 2, 250)]:
+        conn.execute("INSERT INTO trackers VALUES (?, ?, ?, ?)", (tracker_id, tracker_id * 10, product_id, target))
+        log_change(conn, tracker_id, tracker_id * 10)
+
+    index = TrackerIndex()
+    assert index.refresh(conn) == []
+    assert len(index) == 3
+
+    conn.execute("UPDATE products SET current_price = 420 WHERE id = 1")
+    log_change(conn, 1, 10)
+    log_change(conn, 2, 20)
+    conn.execute("DELETE FROM trackers WHERE id = 3")
+    log_change(conn, 3, 30, deleted=1)
+    crossings = index.refresh(conn)
+    assert [(c.product_id, c.old_price, c.new_price, c.tracker_ids.tolist()) for c in crossings] == \
+        [(1, 500.0, 420.0, [1])]
+    assert index.location(3) is None
+    assert 2 not in index.groups
+
+
+def test_popular_product_updates_in_place():
+    # Every tracker of one product changing must not cost a scan of the product per tracker
+    index = TrackerIndex()
+    count = 50000
+    for tracker_id in range(1, count + 1):
+        index.upsert(tracker_id, tracker_id, 1, 100.0)
+    for tracker_id in range(1, count + 1, 2):
+        index.upsert(tracker_id, tracker_id, 1, 90.0)
+    for tracker_id in range(2, count + 1, 2):
+        index.remove(tracker_id)
+    targets = np.frombuffer(index.groups[1].targets, dtype=np.float64)
+    assert len(index) == count // 2
+    assert (targets == 90.0).all()
@@ -0,0 +1,55 @@
+def product_row(app_module, url):
+    conn = app_module.connect_db()
+    try:
+        return conn.execute("""
+            SELECT p.id, p.current_price, COUNT(h.product_id) FROM products p
+            LEFT JOIN price_history h ON h.product_id = p.id
+            WHERE p.canonical_url = ? GROUP BY p.id
+        """, (app_module.canonicalize_url(url),)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_client_price_only_seeds_new_product(app_module, make_client):
+    url = 'https://www.amazon.in/dp/B0SEEDONLY1'
+    first, second = make_client(), make_client()
+
+    response = first.post('/api/trackers', json={'url': url, 'productName': 'Kettle', 'currentPrice': 1999,
+                                                 'targetPrice': 1500, 'currency': 'INR', 'currencySymbol': '₹'})
+    assert response.status_code == 201
+    product_id, price, observations = product_row(app_module, url)
+    assert (price, observations) == (1999, 1)
+
+    # Another user's client claims a different price: the shared row and its history keep the scraped one
+    response = second.post('/api/trackers', json={'url': url, 'productName': 'Kettle', 'currentPrice': 1,
+                                                  'targetPrice': 1500, 'currency': 'INR', 'currencySymbol': '₹'})
+    assert response.status_code == 201
+    assert product_row(app_module, url) == (product_id, 1999, 1)
+    assert [t['currentPrice'] for t in second.get('/api/trackers').get_json()] == [1999]
+
+
+def test_second_tracker_filling_in_product_price(app_module, make_client):
+    # The upsert updates a product that already has trackers, which fires the tracker_changes trigger
+    url = 'https://www.amazon.in/dp/B0UPSERT001'
+    first, second = make_client(), make_client()
+    assert first.post('/api/trackers', json={'url': url, 'targetPrice': 500}).status_code == 201
+    cursor = first.get('/api/trackers?since=0').get_json()['cursor']
+
+    response = second.post('/api/trackers', json={'url': url, 'productName': 'Blender', 'currentPrice': 450,
+                                                  'targetPrice': 400, 'currency': 'INR'})
+    assert response.status_code == 201
+    assert product_row(app_module, url)[1] == 450
+
+    # The first user's tracker changed with the product, so their next sync picks it up
+    changes = first.get(f'/api/trackers?since={cursor}').get_json()
+    assert [(t['productName'], t['currentPrice']) for t in changes['trackers']] == [('Blender', 450)]
+
+
+def test_bulk_create_filling_in_product_price(app_module, make_client):
+    url = 'https://www.flipkart.com/blender/p/itmUPSERT002'
+    first, second = make_client(), make_client()
+    assert first.post('/api/trackers/bulk', json=[{'url': url, 'targetPrice': 500}]).status_code == 201
+    response = second.post('/api/trackers/bulk', json=[{'url': url, 'currentPrice': 450, 'targetPrice': 400}])
+    assert response.status_code == 201
+    assert response.get_json()['created'] == 1
+    assert product_row(app_module, url)[1] == 450
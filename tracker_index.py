@@ -0,0 +1,217 @@
+"""In-memory index of trackers grouped by product, for target-price checks.
+
+Each product's trackers are stored column-wise in array.array buffers
+(tracker id, user id, target price), so the index costs a few dozen bytes
+per tracker instead of a row tuple or dict each, and finding the trackers a
+new price reaches is one NumPy comparison over a zero-copy view of the
+product's targets. Two flat arrays indexed by tracker id record which
+product each tracker is under and where in that product's columns, so
+updating or removing a tracker touches one slot however popular its
+product is. app.py keeps the index current with refresh(), which
+applies the tracker_changes log from the last sequence number it has seen.
+"""
+from array import array
+
+import numpy as np
+
+REFRESH_BATCH = 5000  # tracker_changes rows per query
+
+CHANGES_SQL = """
+    SELECT c.seq, c.tracker_id, c.deleted, t.user_id, t.product_id, t.target_price, p.current_price
+    FROM tracker_changes c
+    LEFT JOIN trackers t ON t.id = c.tracker_id
+    LEFT JOIN products p ON p.id = t.product_id
+    WHERE c.seq > ?{live}
+    ORDER BY c.seq LIMIT ?
+"""
+
+
+class ProductTrackers:
+    """One product's trackers as parallel columns, plus the last price the index saw for it"""
+    __slots__ = ('price', 'tracker_ids', 'user_ids', 'targets')
+
+    def __init__(self, price=float('nan')):
+        self.price = price
+        self.tracker_ids = array('q')
+        self.user_ids = array('q')
+        self.targets = array('d')
+
+    def __len__(self):
+        return len(self.tracker_ids)
+
+    @property
+    def nbytes(self):
+        return sum(column.buffer_info()[1] * column.itemsize
+                   for column in (self.tracker_ids, self.user_ids, self.targets))
+
+    def add(self, tracker_id, user_id, target):
+        """Append a tracker; returns its position"""
+        self.tracker_ids.append(tracker_id)
+        self.user_ids.append(user_id)
+        self.targets.append(target)
+        return len(self.tracker_ids) - 1
+
+    def remove_at(self, position):
+        """Drop one tracker by moving the last one into its slot; returns the moved tracker's id, or None.
+
+        Order within a product doesn't matter.
+        """
+        for column in (self.tracker_ids, self.user_ids, self.targets):
+            column[position] = column[-1]
+            column.pop()
+        return self.tracker_ids[position] if position < len(self.tracker_ids) else None
+
+    def reached(self, price):
+        """Boolean mask of the trackers whose target `price` is at or under"""
+        return price <= np.frombuffer(self.targets, dtype=np.float64)
+
+    def crossed(self, old_price, new_price):
+        """Boolean mask of the trackers `new_price` reaches that `old_price` did not (NaN: no old price)"""
+        targets = np.frombuffer(self.targets, dtype=np.float64)
+        if old_price != old_price:
+            return new_price <= targets
+        return (new_price <= targets) & (targets < old_price)
+
+
+class Crossing:
+    """Trackers of one product that reached their target when its price moved"""
+    __slots__ = ('product_id', 'old_price', 'new_price', 'tracker_ids', 'user_ids')
+
+    def __init__(self, product_id, old_price, new_price, tracker_ids, user_ids):
+        self.product_id = product_id
+        self.old_price = old_price
+        self.new_price = new_price
+        self.tracker_ids = tracker_ids
+        self.user_ids = user_ids
+
+    def __repr__(self):
+        return (f"Crossing(product_id={self.product_id}, old_price={self.old_price}, "
+                f"new_price={self.new_price}, trackers={len(self.tracker_ids)})")
+
+
+class TrackerIndex:
+    """Trackers by product, kept up to date from the tracker_changes log.
+
+    Not thread-safe; callers sharing an index serialize refresh() and reads.
+    """
+    __slots__ = ('groups', 'locations', 'positions', 'size', 'cursor')
+
+    def __init__(self):
+        self.groups = {}            # product_id -> ProductTrackers
+        self.locations = array('q')  # product_id of tracker n at position n, 0 if not indexed
+        self.positions = array('q')  # where tracker n sits in its product's columns
+        self.size = 0
+        self.cursor = 0             # last tracker_changes seq applied
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Bytes held by the tracker columns, locations and positions (the per-product records are not counted)"""
+        return (sum(group.nbytes for group in self.groups.values())
+                + sum(column.buffer_info()[1] * column.itemsize for column in (self.locations, self.positions)))
+
+    def location(self, tracker_id):
+        """Product the tracker is indexed under, or None"""
+        if tracker_id < len(self.locations):
+            return self.locations[tracker_id] or None
+        return None
+
+    def upsert(self, tracker_id, user_id, product_id, target):
+        """Add a tracker or update its target; returns the product's group"""
+        current = self.location(tracker_id)
+        if current is not None:
+            group = self.groups[current]
+            position = self.positions[tracker_id]
+            if current == product_id:
+                group.user_ids[position] = user_id
+                group.targets[position] = target
+                return group
+            self._remove_at(current, group, position)
+        else:
+            self.size += 1
+            if tracker_id >= len(self.locations):
+                # Tracker ids are handed out in sequence, so growing to the new id wastes little
+                grow = max(tracker_id + 1 - len(self.locations), len(self.locations) // 4)
+                for column in (self.locations, self.positions):
+                    column.frombytes(bytes(grow * column.itemsize))
+        group = self.groups.get(product_id)
+        if group is None:
+            group = self.groups[product_id] = ProductTrackers()
+        self.positions[tracker_id] = group.add(tracker_id, user_id, target)
+        self.locations[tracker_id] = product_id
+        return group
+
+    def remove(self, tracker_id):
+        product_id = self.location(tracker_id)
+        if product_id is None:
+            return False
+        self.locations[tracker_id] = 0
+        self.size -= 1
+        self._remove_at(product_id, self.groups[product_id], self.positions[tracker_id])
+        return True
+
+    def _remove_at(self, product_id, group, position):
+        moved = group.remove_at(position)
+        if moved is not None:
+            self.positions[moved] = position
+        elif not len(group):
+            del self.groups[product_id]
+
+    def reached(self, product_id, price):
+        """Ids of the product's trackers whose target `price` is at or under"""
+        group = self.groups.get(product_id)
+        if group is None:
+            return np.empty(0, dtype=np.int64)
+        return np.frombuffer(group.tracker_ids, dtype=np.int64)[group.reached(price)]
+
+    def set_price(self, product_id, price):
+        """Record the product's new price; returns a Crossing for the trackers it newly reaches, or None"""
+        group = self.groups.get(product_id)
+        if group is None or price is None:
+            return None
+        old_price, group.price = group.price, float(price)
+        # Only a drop (or a first price) can reach a target the old price didn't
+        if price >= old_price:
+            return None
+        mask = group.crossed(old_price, price)
+        if not mask.any():
+            return None
+        return Crossing(product_id, None if old_price != old_price else old_price, group.price,
+                        np.frombuffer(group.tracker_ids, dtype=np.int64)[mask],
+                        np.frombuffer(group.user_ids, dtype=np.int64)[mask])
+
+    def refresh(self, conn, batch=REFRESH_BATCH):
+        """Apply tracker_changes rows after the cursor; returns the Crossings the new prices caused.
+
+        A product first seen in this refresh takes its price without reporting
+        crossings, so building the index from cursor 0 reports nothing.
+        """
+        crossings = []
+        while True:
+            # From scratch there is nothing to delete, so the tombstones can be skipped
+            live = "" if self.cursor else " AND c.deleted = 0"
+            rows = conn.execute(CHANGES_SQL.format(live=live), (self.cursor, batch)).fetchall()
+            prices, fresh = {}, set()
+            for seq, tracker_id, deleted, user_id, product_id, target, price in rows:
+                if deleted or product_id is None:
+                    self.remove(tracker_id)
+                    continue
+                if product_id not in self.groups:
+                    fresh.add(product_id)
+                self.upsert(tracker_id, user_id, product_id, target)
+                prices[product_id] = price
+            for product_id, price in prices.items():
+                if product_id in fresh:
+                    group = self.groups.get(product_id)
+                    if group is not None:
+                        group.price = float('nan') if price is None else float(price)
+                    continue
+                crossing = self.set_price(product_id, price)
+                if crossing is not None:
+                    crossings.append(crossing)
+            if rows:
+                self.cursor = rows[-1][0]
+            if len(rows) < batch:
+                return crossings